@@ -1,7 +1,50 @@
+import io
+import logging
+import os
+import tempfile
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+
+from mvt_analyzer import analyze
+from mvt_analyzer.cache import content_key
+from mvt_analyzer.dataset import DatasetStore
+from mvt_analyzer.derivatives import DEFAULT_WINDOW
+from mvt_analyzer.ingest import read_upload, table_format
+from mvt_analyzer.metrics import Metrics, active, stage
+from mvt_analyzer.plotting import figure_to_png, plot_mvt
+from mvt_analyzer.rateindex import RateIndex
+from mvt_analyzer.stream import analyze_csv_stream
+from mvt_analyzer.timeaxis import resolve_time_axis
+from mvt_analyzer.windows import WindowAnalysis
+from mvt_analyzer.workers import ComputePool, PoolBusy
+
+# file lớn hơn ngưỡng này được đọc và phân tích theo từng phần
+STREAM_THRESHOLD = 50 * 1024 * 1024
+# đo hiệu năng: file JSON-lines cho số liệu từng bước, và có đo bộ nhớ cấp phát hay không
+METRICS_FILE = os.environ.get("MVT_METRICS_FILE")
+TRACE_MEMORY = os.environ.get("MVT_TRACE_MEMORY") == "1"
+# số luồng tính toán dùng chung cho mọi phiên; file từ HEAVY_SIZE trở lên chạy ở làn riêng
+# (MVT_HEAVY_WORKERS luồng) để không chiếm hết luồng của người dùng khác
+WORKERS = int(os.environ.get("MVT_WORKERS", min(4, os.cpu_count() or 1)))
+HEAVY_WORKERS = int(os.environ.get("MVT_HEAVY_WORKERS", 1))
+HEAVY_SIZE = 8 * 1024 * 1024
+# số việc chưa xong tối đa mỗi làn; vượt quá thì báo bận thay vì xếp hàng thêm
+MAX_PENDING = int(os.environ.get("MVT_MAX_PENDING", 8))
+# bộ nhớ tối đa (MB) cho kết quả dùng chung đã tính (bảng, biểu đồ, chỉ mục cửa sổ, ...)
+CACHE_MB = int(os.environ.get("MVT_CACHE_MB", 1024))
+# thư mục lưu dữ liệu đã làm sạch dạng nhị phân (map vào bộ nhớ khi mở lại); "" = tắt
+DATASET_DIR = os.environ.get("MVT_DATASET_DIR", os.path.join(tempfile.gettempdir(), "mvt-datasets"))
+
+SAMPLE_CSV = """Kỳ,Giá trị
+Q1 2024,120.5
+Q2 2024,138.2
+Q3 2024,142.8
+Q4 2024,135.6
+Q1 2025,150.3
+Q2 2025,155.9
+""".encode("utf-8")
 
 st.set_page_config(page_title="MVT Analyzer - Detailed MVT Steps", layout="wide")
 
@@ -16,393 +59,307 @@ st.markdown("""
 
 # --- Input dữ liệu ---
 st.header("1. Nhập dữ liệu")
-st.markdown("Upload CSV (cột Kỳ, Giá trị) hoặc dùng dữ liệu mẫu để thử.")
+st.markdown("Upload CSV, Parquet hoặc Arrow/Feather (cột Kỳ, Giá trị) hoặc dùng dữ liệu mẫu để thử.")
 
-uploaded_file = st.file_uploader("Tải lên file CSV (Kỳ, Giá trị)", type=["csv"])
+uploaded_file = st.file_uploader(
+    "Tải lên file dữ liệu (Kỳ, Giá trị)", type=["csv", "parquet", "pq", "feather", "arrow", "ipc"]
+)
 if uploaded_file:
-    df = pd.read_csv(uploaded_file)
+    raw = uploaded_file.getvalue()
+    file_format = table_format(uploaded_file.name)
 else:
     st.write("Dữ liệu mẫu (công ty giả định):")
-    sample = {
-        "Kỳ": ["Q1 2024", "Q2 2024", "Q3 2024", "Q4 2024", "Q1 2025", "Q2 2025"],
-        "Giá trị": [120.5, 138.2, 142.8, 135.6, 150.3, 155.9]
-    }
-    df = pd.DataFrame(sample)
-
-# sanitize
-if "Giá trị" not in df.columns or "Kỳ" not in df.columns:
-    st.error("CSV phải có cột 'Kỳ' và 'Giá trị'.")
+    raw = SAMPLE_CSV
+    file_format = "csv"
+
+TIME_AXES = {
+    "Mỗi kỳ = 1 đơn vị (mặc định)": None,
+    "Thời gian thực từ cột Kỳ (tự nhận dạng)": "auto",
+    "Thời gian thực, đơn vị ngày": "D",
+    "Thời gian thực, đơn vị tháng": "M",
+    "Thời gian thực, đơn vị quý": "Q",
+    "Thời gian thực, đơn vị năm": "Y",
+}
+time_axis = TIME_AXES[st.selectbox(
+    "Trục thời gian",
+    list(TIME_AXES),
+    help="Dùng khoảng cách thực giữa các kỳ (ngày, 'Q1 2024', số) khi dữ liệu có kỳ bị thiếu hoặc không đều.",
+)]
+
+SOLVER_OPTIONS = {
+    "Nội suy tuyến tính giữa các đạo hàm (mặc định)": "linear",
+    "Spline bậc ba – giải đúng f'(c) = slope": "spline",
+}
+solver = SOLVER_OPTIONS[st.selectbox("Cách tìm điểm c", list(SOLVER_OPTIONS))]
+
+DERIVATIVE_OPTIONS = {
+    "Sai phân trung tâm (mặc định)": "central",
+    "Sai phân 5 điểm (bậc cao, không làm trơn)": "stencil",
+    "Savitzky–Golay (làm trơn, bậc 2)": "savgol",
+    "Hồi quy cục bộ (LOESS, trọng số tricube)": "local",
+}
+derivative = DERIVATIVE_OPTIONS[st.selectbox(
+    "Cách ước lượng đạo hàm f'",
+    list(DERIVATIVE_OPTIONS),
+    help="Dữ liệu theo ngày/tuần thường nhiễu: sai phân làm nhiễu lớn thêm, các cách làm trơn cho f' ổn định hơn.",
+)]
+window = DEFAULT_WINDOW
+if derivative in ("savgol", "local"):
+    window = st.slider("Độ rộng cửa sổ làm trơn (số kỳ, lẻ)", 3, 51, DEFAULT_WINDOW, step=2)
+
+
+@st.cache_resource
+def compute_pool():
+    # dùng chung giữa các phiên: việc giống nhau chỉ tính một lần; bộ nhớ đệm có giới hạn
+    return ComputePool(
+        workers=WORKERS, heavy_workers=HEAVY_WORKERS, heavy_size=HEAVY_SIZE,
+        max_pending=MAX_PENDING, cache_size=256, cache_bytes=CACHE_MB << 20, memory=TRACE_MEMORY,
+    )
+
+
+@st.cache_resource
+def dataset_store():
+    return DatasetStore(DATASET_DIR) if DATASET_DIR else None
+
+
+# tùy chọn của lần tính; việc trên pool chỉ dùng những gì được truyền vào, không đọc
+# biến toàn cục của script hay st.* (luồng của pool không có ngữ cảnh Streamlit)
+options = {"file_format": file_format, "time_axis": time_axis, "solver": solver,
+           "derivative": derivative, "window": window}
+
+
+def build_entry(raw, store, stream_threshold, file_format, time_axis, solver, derivative, window):
+    # dữ liệu đã làm sạch từ lần tải trước: map file nhị phân, không đọc lại CSV
+    data_key = content_key(raw, file_format)
+    dataset = store.get(data_key) if store else None
+    if dataset is not None:
+        with stage("time_axis", rows=len(dataset)):
+            t = dataset.time_axis(time_axis)
+        return analyzed_entry(dataset.labels, dataset.values, dataset.dropped, t, solver, derivative, window)
+    # đọc theo từng phần chỉ dùng sai phân trung tâm (chỉ cần 1 điểm kề giữa các phần)
+    if len(raw) > stream_threshold and file_format == "csv" and derivative == "central":
+        entry = build_streamed_entry(raw, time_axis, solver)
+    else:
+        df, dropped = read_upload(raw, file_format)
+        labels = df["Kỳ"].to_numpy(dtype=object)
+        y = df["Giá trị"].to_numpy(dtype=float)
+        t = None
+        if len(y) >= 2:
+            with stage("time_axis", rows=len(labels)):
+                t = resolve_time_axis(labels, time_axis)
+        entry = analyzed_entry(labels, y, dropped, t, solver, derivative, window)
+    if store:
+        try:
+            store.put(data_key, entry["labels"], entry["values"], entry["dropped"])
+        except OSError as exc:  # hết chỗ / không có quyền ghi: vẫn dùng kết quả đã tính
+            logging.getLogger(__name__).warning("could not cache dataset: %s", exc)
+    return entry
+
+
+def analyzed_entry(labels, y, dropped, t, solver, derivative, window):
+    entry = {"labels": labels, "values": y, "dropped": dropped, "dropped_rows": [], "analysis": None, "chart": None}
+    if len(y) >= 2:
+        entry["analysis"] = analyze(labels, y, t, solver, derivative, window)
+        with stage("chart", rows=len(y)):
+            entry["chart"] = figure_to_png(plot_mvt(labels, y, entry["analysis"]["mvt"], t))
+    return entry
+
+
+def build_streamed_entry(raw, time_axis, solver):
+    analysis = analyze_csv_stream(io.BytesIO(raw), time_axis=time_axis, solver=solver)
+    labels, y = analysis.pop("labels"), analysis.pop("values")
+    t = None if time_axis is None else analysis["t"]
+    with stage("chart", rows=len(y)):
+        chart = figure_to_png(plot_mvt(labels, y, analysis["mvt"], t))
+    dropped = analysis.pop("dropped")
+    return {"labels": labels, "values": y, "dropped": dropped.count, "dropped_rows": dropped.rows,
+            "analysis": analysis, "chart": chart}
+
+
+def report_metrics(metrics, kind, n_bytes, options, metrics_file):
+    context = {"kind": kind, "bytes": n_bytes, **options}
+    context["format"] = context.pop("file_format")
+    metrics.log(**context)
+    if metrics_file:
+        metrics.write(metrics_file, **context)
+
+
+def compute_entry(raw, store, settings, options):
+    # chạy trên luồng của pool, trong Metrics riêng của việc này
+    entry = build_entry(raw, store, settings["stream_threshold"], **options)
+    entry["metrics"] = active()
+    report_metrics(entry["metrics"], "compute", len(raw), options, settings["metrics_file"])
+    return entry
+
+
+def progress_text(p):
+    if p["state"] == "queued":
+        return f"Đang chờ tới lượt ({p['waited']:.0f} s)…"
+    return f"Đang tính: {p['stage'] or '…'} ({p['stages_done']} bước xong, {p['running']:.1f} s)"
+
+
+def pool_result(key, fn, *args, size=0):
+    """Gửi việc vào pool chung và chờ, hiện tiến độ; trả về ``(giá trị, vừa_tính)``.
+
+    Tiến độ ước lượng theo số bước mà lần chạy trước của cùng hàm đã ghi.
+    """
+    try:
+        job, created = compute_pool().submit(key, fn, *args, size=size)
+    except PoolBusy:
+        st.warning("Máy chủ đang bận với nhiều file lớn — vui lòng thử lại sau ít phút.")
+        st.stop()
+    if not job.done():
+        bar = st.progress(0.0, text="Đang chờ tới lượt…")
+        while not job.wait(0.25):
+            p = job.progress()
+            bar.progress(p["fraction"] or 0.0, text=progress_text(p))
+        bar.empty()
+    return job.result(), created
+
+
+# sanitize + phân tích (chỉ chạy lại khi dữ liệu hoặc tùy chọn thay đổi)
+entry_key = content_key(raw, file_format, time_axis, solver, derivative, window)
+try:
+    entry, computed = pool_result(
+        entry_key, compute_entry, raw, dataset_store(),
+        {"stream_threshold": STREAM_THRESHOLD, "metrics_file": METRICS_FILE}, options,
+        size=len(raw),
+    )
+except ValueError as exc:
+    st.error(str(exc))
     st.stop()
+from_cache = not computed
+# các bước hiển thị của lần chạy lại này (bảng, giải thích, ...)
+render_metrics = Metrics()
+
+PAGE_SIZE = 50
+
+
+def show_table(frame, key, fmt=None, n_rows=None):
+    """st.dataframe cho một trang của bảng; chỉ trang đó được định dạng và gửi đi.
+
+    ``frame`` là DataFrame, hoặc hàm dựng DataFrame cho một slice dòng
+    (kèm ``n_rows``) để chỉ trang đang xem được tạo ra.
+    """
+    if n_rows is None:
+        n_rows = len(frame)
+    pages = max(1, -(-n_rows // PAGE_SIZE))
+    page = 1
+    if pages > 1:
+        page = st.number_input(
+            f"Trang (1–{pages}, {n_rows} dòng)", min_value=1, max_value=pages, value=1, key=key
+        )
+    rows = slice((page - 1) * PAGE_SIZE, page * PAGE_SIZE)
+    part = frame(rows) if callable(frame) else frame.iloc[rows]
+    with render_metrics.stage("render_table", rows=len(part)):
+        st.dataframe(part.style.format(fmt) if fmt else part)
+
+
+def explain_segment(rec, dt):
+    """Giải thích từng bước cho một đoạn (chỉ dựng khi đoạn được chọn)."""
+    st.markdown(f"*Bước 1 – Dữ liệu đầu vào:* a = {rec['a_label']} = {rec['a_val']:.3f}, b = {rec['b_label']} = {rec['b_val']:.3f}")
+    st.markdown(f"*Bước 2 – Tính tốc độ thay đổi trung bình (slope):*")
+    st.markdown(f"> slope = (f(b) - f(a)) / (t_b - t_a) = ({rec['b_val']:.3f} - {rec['a_val']:.3f}) / {dt:g} = *{rec['slope']:+.3f}*")
+    st.markdown(f"*Bước 3 – Ước lượng đạo hàm tại hai đầu đoạn:*")
+    st.markdown(f"> f'({rec['a_label']}) ≈ {rec['deriv_a']:+.3f},  f'({rec['b_label']}) ≈ {rec['deriv_b']:+.3f}")
+    st.markdown(f"*Bước 4 – Kiểm tra tính trung gian (Intermediate Value):*")
+    if solver == "spline" and rec["n_roots"] > 0:
+        st.markdown(f"> Trên spline bậc ba đi qua dữ liệu (f' tại mỗi kỳ bằng đạo hàm xấp xỉ ở Bước 3), f' liên tục và trung bình của f' trên đoạn đúng bằng slope, nên phương trình f'(c) = slope luôn có nghiệm; ở đây có *{rec['n_roots']}* nghiệm.")
+        st.markdown(f"*Bước 5 – Giải f'(c) = slope:* phương pháp: {rec['method']}")
+        st.markdown(f"> c ≈ *{rec['c_pos']:.3f}*, f(c) trên spline ≈ *{rec['y_c']:.3f}*, f'(c) ≈ *{rec['deriv_c']:+.3f}*, sai khác = *{rec['residual']:.3e}*.")
+        if rec["n_roots"] > 1:
+            st.markdown(f"> Nghiệm thứ hai: c ≈ *{rec['c_pos_2']:.3f}*, f(c) ≈ *{rec['y_c_2']:.3f}*, sai khác = *{rec['residual_2']:.3e}*.")
+    elif rec["bracket"]:
+        st.markdown(f"> Vì slope = *{rec['slope']:+.3f}* nằm giữa f'({rec['a_label']}) và f'({rec['b_label']}), theo tính chất trung gian có tồn tại c ∈ ({rec['a_label']}, {rec['b_label']}).")
+        st.markdown(f"*Bước 5 – Tìm c ước lượng:* phương pháp: {rec['method']}")
+        st.markdown(f"> Vị trí ước lượng c ≈ *{rec['c_pos']:.3f}* (tức nằm cách {rec['a_label']} khoảng {rec['c_frac']:.3f} phần của khoảng đến {rec['b_label']}).")
+        st.markdown(f"> Ước lượng f(c) bằng nội suy tuyến tính ≈ *{rec['y_c']:.3f}*.")
+        st.markdown(f"> Ước lượng f'(c) bằng nội suy giữa f'({rec['a_label']}) và f'({rec['b_label']}) ≈ *{rec['deriv_c']:+.3f}*.")
+        st.markdown(f"> Sai khác |f'(c) - slope| = *{rec['residual']:.3e}* (mong muốn nhỏ).")
+    else:
+        st.markdown(f"> slope = *{rec['slope']:+.3f}* không nằm giữa f'({rec['a_label']}) và f'({rec['b_label']}).")
+        st.markdown(f"> Chúng tôi chọn điểm có f' gần nhất theo phương pháp: {rec['method']}, ước lượng c = *{rec['c_pos']:.3f}*.")
+        st.markdown(f"> Giá trị f(c) ước lượng = *{rec['y_c']:.3f}, f'(c) ≈ *{rec['deriv_c']:+.3f}*, sai khác = *{rec['residual']:.3e}**.")
+    # Interpretation
+    st.markdown("*Diễn giải ý nghĩa kinh doanh (gợi ý):*")
+    if rec["slope"] > 0:
+        st.markdown("- slope > 0: doanh thu (hoặc chỉ tiêu) tăng trung bình trong khoảng này.")
+        st.markdown(f"- Điểm c ước lượng cho thấy giai đoạn mà doanh nghiệp có tốc độ tăng đúng bằng tốc độ trung bình (thời điểm có 'momentum' nhất).")
+    elif rec["slope"] < 0:
+        st.markdown("- slope < 0: doanh thu giảm trung bình trong khoảng này.")
+        st.markdown(f"- Điểm c ước lượng có thể là thời điểm cảnh báo quản trị (nên xem chi tiết nguyên nhân tại khoảng này).")
+    else:
+        st.markdown("- slope = 0: không thay đổi tổng thể trong khoảng này.")
+
 
-df["Kỳ"] = df["Kỳ"].astype(str)
-df["Giá trị"] = pd.to_numeric(df["Giá trị"], errors="coerce")
-if df["Giá trị"].isna().any():
-    st.warning("Có giá trị không phải số trong cột 'Giá trị' — những hàng đó sẽ bị bỏ.")
-    df = df.dropna(subset=["Giá trị"]).reset_index(drop=True)
+labels, y = entry["labels"], entry["values"]
+if entry["dropped"]:
+    note = f"Đã bỏ {entry['dropped']:,} hàng có giá trị không phải số trong cột 'Giá trị'."
+    if entry["dropped_rows"]:
+        # số thứ tự hàng dữ liệu, đếm từ 1 (không tính dòng tiêu đề)
+        sample = ", ".join(str(r + 1) for r in entry["dropped_rows"])
+        more = ", …" if entry["dropped"] > len(entry["dropped_rows"]) else ""
+        note += f" Các hàng dữ liệu: {sample}{more}."
+    st.warning(note)
 
-st.dataframe(df)
+n = len(y)
+show_table(lambda rows: pd.DataFrame({"Kỳ": labels[rows], "Giá trị": y[rows]}), "page_input", n_rows=n)
 
-n = len(df)
 if n < 2:
     st.warning("Cần ít nhất 2 kỳ để phân tích.")
     st.stop()
 
-# --- Tính slope giữa từng cặp ---
-#2. Tính toán cơ bản")
-t = np.arange(n)  # đơn vị thời gian giả định đều (mỗi kỳ = 1)
-y = df["Giá trị"].to_numpy()
-
-slopes = np.diff(y) / np.diff(t)  # dt = 1 -> chỉ là diff
-periods = [f"{df.loc[i,'Kỳ']} → {df.loc[i+1,'Kỳ']}" for i in range(n-1)]
-
-# hiển thị bảng slopes
-#slopes_df = pd.DataFrame({
- #   "Khoảng thời gian": periods,
-  #  "Giá trị tại a": [y[i] for i in range(n-1)],
-   # "Giá trị tại b": [y[i+1] for i in range(n-1)],
-    #"Slope (Δ = b - a)": slopes
-#})
-#st.subheader("Slope (tốc độ thay đổi trung bình) giữa các kỳ")
-#st.dataframe(slopes_df.style.format({"Slope (Δ = b - a)": "{:+.3f}"}))
-
-# --- Ước lượng đạo hàm tại mỗi điểm (forward/backward/central) ---
-deriv = np.zeros(n)
-if n == 2:
-    # trivial: forward/backward same
-    deriv[0] = slopes[0]
-    deriv[1] = slopes[0]
-else:
-    deriv[0] = (y[1] - y[0]) / (t[1] - t[0])  # forward diff
-    deriv[-1] = (y[-1] - y[-2]) / (t[-1] - t[-2])  # backward diff
-    for i in range(1, n-1):
-        deriv[i] = (y[i+1] - y[i-1]) / (t[i+1] - t[i-1])  # central difference
-
-#deriv_df = pd.DataFrame({
-#    "Kỳ": df["Kỳ"],
- #   "Giá trị": df["Giá trị"],
-  #  "Đạo hàm xấp xỉ f'(t) (tốc độ tức thời)": deriv
-#})
-#st.subheader("Đạo hàm xấp xỉ tại từng điểm (tốc độ tức thời)")
-#st.dataframe(deriv_df.style.format({"Đạo hàm xấp xỉ f'(t) (tốc độ tức thời)": "{:+.3f}"}))
-
-# --- Phân tích MVT cho từng đoạn ---
-#st.header("2. Phân tích MVT – từng bước cho mỗi đoạn")
-
-records = []
-plot_mvt_points = []  # (c, y_c, slope, segment_index)
-for i in range(n - 1):
-    a_idx, b_idx = i, i + 1
-    a_label, b_label = df.loc[a_idx, "Kỳ"], df.loc[b_idx, "Kỳ"]
-    a_val, b_val = float(y[a_idx]), float(y[b_idx])
-    slope = float(slopes[i])
-
-    # đạo hàm tại hai đầu điểm (ước lượng)
-    deriv_a = float(deriv[a_idx])
-    deriv_b = float(deriv[b_idx])
-
-    # B1: Tính slope (đã có)
-    # B2: Tính đạo hàm tại đầu và cuối (deriv_a, deriv_b)
-    # B3: Kiểm tra điều kiện trung gian: slope nằm giữa deriv_a và deriv_b?
-    bracket = (min(deriv_a, deriv_b) <= slope <= max(deriv_a, deriv_b))
-
-    # B4: ước lượng vị trí c trong (i, i+1)
-    if deriv_b != deriv_a and bracket:
-        # nội suy tuyến tính để tìm c fractional trong (i, i+1)
-        frac = (slope - deriv_a) / (deriv_b - deriv_a)  # t position fraction within interval
-        c = i + frac
-        method = "internal linear interpolation between derivative estimates"
-    elif deriv_b == deriv_a and abs(deriv_a - slope) < 1e-9 and bracket:
-        c = i + 0.5
-        method = "derivatives equal to slope (any point works) -> choose midpoint"
-    else:
-        # không bracket: chọn điểm có derivative gần nhất (i hoặc i+1)
-        if abs(deriv_a - slope) <= abs(deriv_b - slope):
-            c = float(i)
-            method = "no sign change -> choose left endpoint (closest derivative)"
-        else:
-            c = float(i + 1)
-            method = "no sign change -> choose right endpoint (closest derivative)"
-
-    # nội suy giá trị hàm tại c bằng nội suy tuyến tính giữa a và b
-    y_c = a_val + (c - i) * (b_val - a_val)  # since t spacing = 1
-
-    # đạo hàm ước lượng tại c (linear interp between deriv_a and deriv_b)
-    deriv_c = deriv_a + ( (c - i) * (deriv_b - deriv_a) )
-
-    residual = abs(deriv_c - slope)
-
-    records.append({
-        "Segment": f"{a_label} → {b_label}",
-        "a_label": a_label,
-        "b_label": b_label,
-        "a_val": a_val,
-        "b_val": b_val,
-        "slope": slope,
-        "deriv_a": deriv_a,
-        "deriv_b": deriv_b,
-        "bracket": bracket,
-        "c_pos": c,
-        "c_loc_text": f"{(a_label)} -- {(b_label)} (c ≈ {c:.3f})" if (i != int(c)) else f"{df.loc[int(c),'Kỳ']} (exact index)",
-        "y_c": y_c,
-        "deriv_c": deriv_c,
-        "residual": residual,
-        "method": method
-    })
-
-    plot_mvt_points.append((c, y_c, slope, i))
-
-mvt_table = pd.DataFrame(records)
-# hiển thị bảng tóm tắt
-#st.subheader("Bảng tóm tắt MVT ước lượng cho từng đoạn")
-#display_cols = ["Segment", "a_val", "b_val", "slope", "deriv_a", "deriv_b", "y_c", "deriv_c"]
-#st.dataframe(mvt_table[display_cols].rename(columns={
- #   "a_val": "Giá trị a",
-  #  "b_val": "Giá trị b",
-   # "slope": "Slope (Δ)",
-    #"deriv_a": "Đạo hàm tại a",
-    #"deriv_b": "Đạo hàm tại b",
-    #"y_c": "Giá trị f(c) ước lượng",
-    #"deriv_c": "Đạo hàm ước lượng tại c",
-
-#}).style.format({
- #   "Giá trị a": "{:.3f}",
- #   "Giá trị b": "{:.3f}",
- #   "Slope (Δ)": "{:+.3f}",
- #   "Đạo hàm tại a": "{:+.3f}",
- #   "Đạo hàm tại b": "{:+.3f}",
- #   "Giá trị f(c) ước lượng": "{:.3f}",
- #   "Đạo hàm ước lượng tại c": "{:+.3f}",
-
-#}))
-
-# --- Chi tiết từng bước: dùng expander cho mỗi đoạn ---
-#st.header("2. Giải thích chi tiết theo từng bước (cho mỗi đoạn)")
-#tinh slope giua tung cap#
-t = np.arange(n)  # đơn vị thời gian giả định đều (mỗi kỳ = 1)
-y = df["Giá trị"].to_numpy()
-
-slopes = np.diff(y) / np.diff(t)  # dt = 1 -> chỉ là diff
-periods = [f"{df.loc[i,'Kỳ']} → {df.loc[i+1,'Kỳ']}" for i in range(n-1)]
-
-# --- Ước lượng đạo hàm tại mỗi điểm (forward/backward/central) ---
-deriv = np.zeros(n)
-if n == 2:
-    # trivial: forward/backward same
-    deriv[0] = slopes[0]
-    deriv[1] = slopes[0]
-else:
-    deriv[0] = (y[1] - y[0]) / (t[1] - t[0])  # forward diff
-    deriv[-1] = (y[-1] - y[-2]) / (t[-1] - t[-2])  # backward diff
-    for i in range(1, n-1):
-        deriv[i] = (y[i+1] - y[i-1]) / (t[i+1] - t[i-1])  # central difference
-
-
-#for rec in records:
-#    seg = rec["Segment"]
- #   with st.expander(f"Giải thích: {seg}", expanded=False):
-   #     st.markdown(f"*Bước 1 – Dữ liệu đầu vào:* a = {rec['a_label']} = {rec['a_val']:.3f}, b = {rec['b_label']} = {rec['b_val']:.3f}")
-   #     st.markdown(f"*Bước 2 – Tính tốc độ thay đổi trung bình (slope):*")
-   #     st.markdown(f"> slope = (f(b) - f(a)) / (t_b - t_a) = ({rec['b_val']:.3f} - {rec['a_val']:.3f}) / 1 = *{rec['slope']:+.3f}*")
-   #     st.markdown(f"*Bước 3 – Ước lượng đạo hàm tại hai đầu đoạn:*")
-   #     st.markdown(f"> f'({rec['a_label']}) ≈ {rec['deriv_a']:+.3f},  f'({rec['b_label']}) ≈ {rec['deriv_b']:+.3f}")
-   #     st.markdown(f"*Bước 4 – Kiểm tra tính trung gian (Intermediate Value):*")
-#    if rec["bracket"]:
-#            st.markdown(f"> Vì slope = *{rec['slope']:+.3f}* nằm giữa f'({rec['a_label']}) và f'({rec['b_label']}), theo tính chất trung gian có tồn tại c ∈ ({rec['a_label']}, {rec['b_label']}).")
-#            st.markdown(f"*Bước 5 – Tìm c ước lượng:* phương pháp: {rec['method']}")
-#            st.markdown(f"> Vị trí ước lượng c ≈ *{rec['c_pos']:.3f}* (tức nằm cách {rec['a_label']} khoảng {(rec['c_pos']-int(rec['c_pos'])):.3f} phần của khoảng đến {rec['b_label']}).")
-#            st.markdown(f"> Ước lượng f(c) bằng nội suy tuyến tính ≈ *{rec['y_c']:.3f}*.")
-#            st.markdown(f"> Ước lượng f'(c) bằng nội suy giữa f'({rec['a_label']}) và f'({rec['b_label']}) ≈ *{rec['deriv_c']:+.3f}*.")
-#            st.markdown(f"> Sai khác |f'(c) - slope| = *{rec['residual']:.3e}* (mong muốn nhỏ).")
- #       else:
- #           st.markdown(f"> slope = *{rec['slope']:+.3f}* không nằm giữa f'({rec['a_label']}) và f'({rec['b_label']}).")
- #           st.markdown(f"> Chúng tôi chọn điểm có f' gần nhất theo phương pháp: {rec['method']}, ước lượng c = *{rec['c_pos']:.3f}*.")
- #           st.markdown(f"> Giá trị f(c) ước lượng = *{rec['y_c']:.3f}, f'(c) ≈ *{rec['deriv_c']:+.3f}*, sai khác = *{rec['residual']:.3e}**.")
-        # Interpretation
- #       st.markdown("*Diễn giải ý nghĩa kinh doanh (gợi ý):*")
- #       if rec["slope"] > 0:
- #           st.markdown("- slope > 0: doanh thu (hoặc chỉ tiêu) tăng trung bình trong khoảng này.")
- #           st.markdown(f"- Điểm c ước lượng cho thấy giai đoạn mà doanh nghiệp có tốc độ tăng đúng bằng tốc độ trung bình (thời điểm có 'momentum' nhất).")
- #       elif rec["slope"] < 0:
- #           st.markdown("- slope < 0: doanh thu giảm trung bình trong khoảng này.")
- #           st.markdown(f"- Điểm c ước lượng có thể là thời điểm cảnh báo quản trị (nên xem chi tiết nguyên nhân tại khoảng này).")
- #       else:
- #           st.markdown("- slope = 0: không thay đổi tổng thể trong khoảng này.")
- #       st.markdown("---")
+analysis = entry["analysis"]
+slopes = analysis["slopes"]
+deriv = analysis["deriv"]
+mvt = analysis["mvt"]
 
 # --- Vẽ biểu đồ với điểm c và tiếp tuyến ước lượng ---
 st.header("2. Biểu đồ minh họa (các điểm MVT & tiếp tuyến ước lượng)")
-fig, ax = plt.subplots(figsize=(10, 4))
-x = t
-ax.plot(x, y, marker="o", linestyle="-", label="Giá trị thực tế")
-# vẽ các secant line
-for i in range(n-1):
-    ax.plot([i, i+1], [y[i], y[i+1]], color="gray", linestyle="--", alpha=0.6)
-# đánh dấu các điểm c và vẽ tiếp tuyến (tangent) ước lượng
-colors = ["orange", "red", "green", "purple", "brown", "cyan"]
-for idx, (c, y_c, slope, seg_i) in enumerate(plot_mvt_points):
-    ax.scatter(c, y_c, color=colors[idx % len(colors)], s=80, zorder=5)
-    # vẽ tiếp tuyến khoảng nhỏ quanh c
-    x_line = np.linspace(max(0, c-0.8), min(n-1, c+0.8), 50)
-    y_line = y_c + slope * (x_line - c)
-    ax.plot(x_line, y_line, color=colors[idx % len(colors)], linestyle='-', linewidth=1.5, alpha=0.8,
-            label=f"Tangent approx seg {seg_i} ({slope:+.2f})")
-    # chú thích
-    ax.text(c, y_c, f" c≈{c:.2f}", fontsize=8, verticalalignment="bottom")
-
-ax.set_xticks(x)
-ax.set_xticklabels(df["Kỳ"], rotation=30)
-ax.set_xlabel("Kỳ")
-ax.set_ylabel("Giá trị")
-ax.set_title("Dữ liệu & các điểm MVT ước lượng (với các tiếp tuyến ước lượng)")
-ax.legend(loc='upper left', bbox_to_anchor=(1.02, 1))
-st.pyplot(fig)
-
-if len(df) < 2:
-    st.warning("⚠️ Cần ít nhất 2 kỳ để tính toán.")
-else:
-    slopes, comments, periods = [], [], []
-
-    for i in range(len(df) - 1):
-        a, b = df.iloc[i, 1], df.iloc[i + 1, 1]
-        slope = b - a
-        slopes.append(slope)
-        periods.append(f"{df.iloc[i, 0]} → {df.iloc[i + 1, 0]}")
-
-        if slope > 0:
-            comments.append("🔼 Tăng trưởng")
-        elif slope < 0:
-            comments.append("🔻 Suy giảm")
-        else:
-            comments.append("⏸ Ổn định")
-
-    results = pd.DataFrame({
-        "Kỳ": periods,
-        "Tốc độ thay đổi (Δ)": slopes,
-        "Nhận xét": comments
-    })
+st.image(entry["chart"])
+
+results = lambda rows: pd.DataFrame({
+    "Kỳ": mvt[rows]["Segment"],
+    "Tốc độ thay đổi (Δ)": slopes[rows],
+    "Nhận xét": mvt[rows]["comment"]
+})
 
-    st.dataframe(results)
+show_table(results, "page_results", n_rows=len(mvt))
 
 # 🔹 Tổng kết định tính toàn giai đoạn dựa trên slope trung bình
-avg_slope = np.mean(slopes)
-if avg_slope > 0:
-    overall = "✅ Doanh nghiệp đang tăng trưởng trung bình ổn định."
-elif avg_slope < 0:
-    overall = "⚠️ Doanh nghiệp có xu hướng suy giảm nhẹ trong giai đoạn này."
-else:
-    overall = "ℹ️ Doanh nghiệp ổn định, không thay đổi đáng kể."
+avg_slope = analysis["avg_slope"]
+overall = analysis["overall"]
 
 st.success(overall)
 
 # --- Tính slope giữa từng cặp ---
 st.header("3. Tính toán cơ bản")
-t = np.arange(n)  # đơn vị thời gian giả định đều (mỗi kỳ = 1)
-y = df["Giá trị"].to_numpy()
-
-slopes = np.diff(y) / np.diff(t)  # dt = 1 -> chỉ là diff
-periods = [f"{df.loc[i,'Kỳ']} → {df.loc[i+1,'Kỳ']}" for i in range(n-1)]
 
 # hiển thị bảng slopes
-slopes_df = pd.DataFrame({
-    "Khoảng thời gian": periods,
-    "Giá trị tại a": [y[i] for i in range(n-1)],
-    "Giá trị tại b": [y[i+1] for i in range(n-1)],
-    "Slope (Δ = b - a)": slopes
+slopes_df = lambda rows: pd.DataFrame({
+    "Khoảng thời gian": mvt[rows]["Segment"],
+    "Giá trị tại a": mvt[rows]["a_val"],
+    "Giá trị tại b": mvt[rows]["b_val"],
+    "Slope (Δ = b - a)": slopes[rows]
 })
 st.subheader("Slope (tốc độ thay đổi trung bình) giữa các kỳ")
-st.dataframe(slopes_df.style.format({"Slope (Δ = b - a)": "{:+.3f}"}))
-
-# --- Ước lượng đạo hàm tại mỗi điểm (forward/backward/central) ---
-deriv = np.zeros(n)
-if n == 2:
-    # trivial: forward/backward same
-    deriv[0] = slopes[0]
-    deriv[1] = slopes[0]
-else:
-    deriv[0] = (y[1] - y[0]) / (t[1] - t[0])  # forward diff
-    deriv[-1] = (y[-1] - y[-2]) / (t[-1] - t[-2])  # backward diff
-    for i in range(1, n-1):
-        deriv[i] = (y[i+1] - y[i-1]) / (t[i+1] - t[i-1])  # central difference
-
-deriv_df = pd.DataFrame({
-    "Kỳ": df["Kỳ"],
-    "Giá trị": df["Giá trị"],
-    "Đạo hàm xấp xỉ f'(t) (tốc độ tức thời)": deriv
+show_table(slopes_df, "page_slopes", {"Slope (Δ = b - a)": "{:+.3f}"}, n_rows=len(mvt))
+
+deriv_df = lambda rows: pd.DataFrame({
+    "Kỳ": labels[rows],
+    "Giá trị": y[rows],
+    "Đạo hàm xấp xỉ f'(t) (tốc độ tức thời)": deriv[rows]
 })
 st.subheader("Đạo hàm xấp xỉ tại từng điểm (tốc độ tức thời)")
-st.dataframe(deriv_df.style.format({"Đạo hàm xấp xỉ f'(t) (tốc độ tức thời)": "{:+.3f}"}))
+show_table(deriv_df, "page_deriv", {"Đạo hàm xấp xỉ f'(t) (tốc độ tức thời)": "{:+.3f}"}, n_rows=n)
 
 # --- Phân tích MVT cho từng đoạn ---
 st.header("4. Phân tích theo MVT")
 
-records = []
-plot_mvt_points = []  # (c, y_c, slope, segment_index)
-for i in range(n - 1):
-    a_idx, b_idx = i, i + 1
-    a_label, b_label = df.loc[a_idx, "Kỳ"], df.loc[b_idx, "Kỳ"]
-    a_val, b_val = float(y[a_idx]), float(y[b_idx])
-    slope = float(slopes[i])
-
-    # đạo hàm tại hai đầu điểm (ước lượng)
-    deriv_a = float(deriv[a_idx])
-    deriv_b = float(deriv[b_idx])
-
-    # B1: Tính slope (đã có)
-    # B2: Tính đạo hàm tại đầu và cuối (deriv_a, deriv_b)
-    # B3: Kiểm tra điều kiện trung gian: slope nằm giữa deriv_a và deriv_b?
-    bracket = (min(deriv_a, deriv_b) <= slope <= max(deriv_a, deriv_b))
-
-    # B4: ước lượng vị trí c trong (i, i+1)
-    if deriv_b != deriv_a and bracket:
-        # nội suy tuyến tính để tìm c fractional trong (i, i+1)
-        frac = (slope - deriv_a) / (deriv_b - deriv_a)  # t position fraction within interval
-        c = i + frac
-        method = "internal linear interpolation between derivative estimates"
-    elif deriv_b == deriv_a and abs(deriv_a - slope) < 1e-9 and bracket:
-        c = i + 0.5
-        method = "derivatives equal to slope (any point works) -> choose midpoint"
-    else:
-        # không bracket: chọn điểm có derivative gần nhất (i hoặc i+1)
-        if abs(deriv_a - slope) <= abs(deriv_b - slope):
-            c = float(i)
-            method = "no sign change -> choose left endpoint (closest derivative)"
-        else:
-            c = float(i + 1)
-            method = "no sign change -> choose right endpoint (closest derivative)"
-
-    # nội suy giá trị hàm tại c bằng nội suy tuyến tính giữa a và b
-    y_c = a_val + (c - i) * (b_val - a_val)  # since t spacing = 1
-
-    # đạo hàm ước lượng tại c (linear interp between deriv_a and deriv_b)
-    deriv_c = deriv_a + ( (c - i) * (deriv_b - deriv_a) )
-
-    residual = abs(deriv_c - slope)
-
-    records.append({
-        "Segment": f"{a_label} → {b_label}",
-        "a_label": a_label,
-        "b_label": b_label,
-        "a_val": a_val,
-        "b_val": b_val,
-        "slope": slope,
-        "deriv_a": deriv_a,
-        "deriv_b": deriv_b,
-        "bracket": bracket,
-        "c_pos": c,
-        "c_loc_text": f"{(a_label)} -- {(b_label)} (c ≈ {c:.3f})" if (i != int(c)) else f"{df.loc[int(c),'Kỳ']} (exact index)",
-        "y_c": y_c,
-        "deriv_c": deriv_c,
-        "residual": residual,
-        "method": method
-    })
-
-    plot_mvt_points.append((c, y_c, slope, i))
-
-mvt_table = pd.DataFrame(records)
 # hiển thị bảng tóm tắt
 st.subheader("Bảng tóm tắt ước lượng cho từng đoạn")
 display_cols = ["Segment", "a_val", "b_val", "slope", "deriv_a", "deriv_b", "y_c", "deriv_c"]
-st.dataframe(mvt_table[display_cols].rename(columns={
+show_table(lambda rows: mvt[rows].to_frame()[display_cols].rename(columns={
     "Segment": " Kỳ",
     "a_val": "Giá trị a",
     "b_val": "Giá trị b",
@@ -412,7 +369,7 @@ st.dataframe(mvt_table[display_cols].rename(columns={
     "y_c": "Giá trị f(c) ước lượng",
     "deriv_c": "Đạo hàm ước lượng tại c",
 
-}).style.format({
+}), "page_mvt", {
     "Giá trị a": "{:.3f}",
     "Giá trị b": "{:.3f}",
     "Slope (Δ)": "{:+.3f}",
@@ -421,68 +378,127 @@ st.dataframe(mvt_table[display_cols].rename(columns={
     "Giá trị f(c) ước lượng": "{:.3f}",
     "Đạo hàm ước lượng tại c": "{:+.3f}",
 
-}))
+}, n_rows=len(mvt))
 
-# --- Chi tiết từng bước: dùng expander cho mỗi đoạn ---
+# --- Chi tiết từng bước: chỉ dựng cho đoạn được chọn ---
 st.header("5. Giải thích chi tiết theo từng bước (cho mỗi giai đoạn)")
-#tinh slope giua tung cap#
-t = np.arange(n)  # đơn vị thời gian giả định đều (mỗi kỳ = 1)
-y = df["Giá trị"].to_numpy()
-
-slopes = np.diff(y) / np.diff(t)  # dt = 1 -> chỉ là diff
-periods = [f"{df.loc[i,'Kỳ']} → {df.loc[i+1,'Kỳ']}" for i in range(n-1)]
-
-# --- Ước lượng đạo hàm tại mỗi điểm (forward/backward/central) ---
-deriv = np.zeros(n)
-if n == 2:
-    # trivial: forward/backward same
-    deriv[0] = slopes[0]
-    deriv[1] = slopes[0]
+
+n_seg = len(mvt)
+period_name = lambda i: f"{labels[i]} → {labels[i + 1]}"
+if n_seg <= 500:
+    seg_i = st.selectbox("Chọn giai đoạn", range(n_seg), format_func=period_name)
 else:
-    deriv[0] = (y[1] - y[0]) / (t[1] - t[0])  # forward diff
-    deriv[-1] = (y[-1] - y[-2]) / (t[-1] - t[-2])  # backward diff
-    for i in range(1, n-1):
-        deriv[i] = (y[i+1] - y[i-1]) / (t[i+1] - t[i-1])  # central difference
-
-
-for rec in records:
-    seg = rec["Segment"]
-    with st.expander(f"Giải thích: {seg}", expanded=False):
-        st.markdown(f"*Bước 1 – Dữ liệu đầu vào:* a = {rec['a_label']} = {rec['a_val']:.3f}, b = {rec['b_label']} = {rec['b_val']:.3f}")
-        st.markdown(f"*Bước 2 – Tính tốc độ thay đổi trung bình (slope):*")
-        st.markdown(f"> slope = (f(b) - f(a)) / (t_b - t_a) = ({rec['b_val']:.3f} - {rec['a_val']:.3f}) / 1 = *{rec['slope']:+.3f}*")
-        st.markdown(f"*Bước 3 – Ước lượng đạo hàm tại hai đầu đoạn:*")
-        st.markdown(f"> f'({rec['a_label']}) ≈ {rec['deriv_a']:+.3f},  f'({rec['b_label']}) ≈ {rec['deriv_b']:+.3f}")
-        st.markdown(f"*Bước 4 – Kiểm tra tính trung gian (Intermediate Value):*")
-        if rec["bracket"]:
-            st.markdown(f"> Vì slope = *{rec['slope']:+.3f}* nằm giữa f'({rec['a_label']}) và f'({rec['b_label']}), theo tính chất trung gian có tồn tại c ∈ ({rec['a_label']}, {rec['b_label']}).")
-            st.markdown(f"*Bước 5 – Tìm c ước lượng:* phương pháp: {rec['method']}")
-            st.markdown(f"> Vị trí ước lượng c ≈ *{rec['c_pos']:.3f}* (tức nằm cách {rec['a_label']} khoảng {(rec['c_pos']-int(rec['c_pos'])):.3f} phần của khoảng đến {rec['b_label']}).")
-            st.markdown(f"> Ước lượng f(c) bằng nội suy tuyến tính ≈ *{rec['y_c']:.3f}*.")
-            st.markdown(f"> Ước lượng f'(c) bằng nội suy giữa f'({rec['a_label']}) và f'({rec['b_label']}) ≈ *{rec['deriv_c']:+.3f}*.")
-            st.markdown(f"> Sai khác |f'(c) - slope| = *{rec['residual']:.3e}* (mong muốn nhỏ).")
-        else:
-            st.markdown(f"> slope = *{rec['slope']:+.3f}* không nằm giữa f'({rec['a_label']}) và f'({rec['b_label']}).")
-            st.markdown(f"> Chúng tôi chọn điểm có f' gần nhất theo phương pháp: {rec['method']}, ước lượng c = *{rec['c_pos']:.3f}*.")
-            st.markdown(f"> Giá trị f(c) ước lượng = *{rec['y_c']:.3f}, f'(c) ≈ *{rec['deriv_c']:+.3f}*, sai khác = *{rec['residual']:.3e}**.")
-        # Interpretation
-        st.markdown("*Diễn giải ý nghĩa kinh doanh (gợi ý):*")
-        if rec["slope"] > 0:
-            st.markdown("- slope > 0: doanh thu (hoặc chỉ tiêu) tăng trung bình trong khoảng này.")
-            st.markdown(f"- Điểm c ước lượng cho thấy giai đoạn mà doanh nghiệp có tốc độ tăng đúng bằng tốc độ trung bình (thời điểm có 'momentum' nhất).")
-        elif rec["slope"] < 0:
-            st.markdown("- slope < 0: doanh thu giảm trung bình trong khoảng này.")
-            st.markdown(f"- Điểm c ước lượng có thể là thời điểm cảnh báo quản trị (nên xem chi tiết nguyên nhân tại khoảng này).")
-        else:
-            st.markdown("- slope = 0: không thay đổi tổng thể trong khoảng này.")
-            
+    seg_i = st.number_input(f"Số thứ tự giai đoạn (1–{n_seg})", min_value=1, max_value=n_seg, value=1) - 1
+    st.caption(f"Giai đoạn: {period_name(seg_i)}")
+with st.container(border=True), render_metrics.stage("explanation", rows=1):
+    explain_segment(mvt.record(seg_i), float(analysis["t"][seg_i + 1] - analysis["t"][seg_i]))
+
+# --- MVT trên khoảng rộng hơn một kỳ ---
+st.header("6. Phân tích theo cửa sổ / khoảng tùy chọn")
+with render_metrics.stage("window_index", rows=n):
+    windows, _ = pool_result((entry_key, "windows"), WindowAnalysis, y, analysis["t"], deriv, labels, size=len(raw))
+window_cols = {
+    "a_label": "Từ kỳ",
+    "b_label": "Đến kỳ",
+    "slope": "Slope (Δ)",
+    "avg_deriv": "Trung bình f'",
+    "c_pos": "Vị trí c",
+    "y_c": "Giá trị f(c) ước lượng",
+    "residual": "Sai khác",
+}
+window_fmt = {"Slope (Δ)": "{:+.3f}", "Trung bình f'": "{:+.3f}", "Vị trí c": "{:.3f}",
+              "Giá trị f(c) ước lượng": "{:.3f}", "Sai khác": "{:.3e}"}
+
+k = st.number_input(f"Độ rộng cửa sổ (số kỳ, 1–{n - 1})", min_value=1, max_value=n - 1, value=min(4, n - 1))
+
+
+def window_table(windows, k, columns):
+    return windows.windows(k)[list(columns)].rename(columns=columns)
+
+
+# bảng theo k cũng chạy trên nhóm luồng: k lớn không chặn phiên, các phiên dùng chung kết quả
+with render_metrics.stage("windows", rows=n - k):
+    table, _ = pool_result((entry_key, "windows", k), window_table, windows, k, window_cols, size=len(raw))
+show_table(table, "page_windows", window_fmt)
+
+st.subheader("Khoảng tùy chọn [a, b]")
+col_a, col_b = st.columns(2)
+a = col_a.number_input(f"Kỳ bắt đầu (1–{n - 1})", min_value=1, max_value=n - 1, value=1) - 1
+b = col_b.number_input(f"Kỳ kết thúc ({a + 2}–{n})", min_value=a + 2, max_value=n, value=n) - 1
+rec = windows.interval(a, b)
+st.markdown(f"> {rec['a_label']} → {rec['b_label']}: slope = *{rec['slope']:+.3f}*, trung bình f' = {rec['avg_deriv']:+.3f}")
+if rec["bracket"]:
+    st.markdown(f"> c ≈ *{rec['c_pos']:.3f}* (kỳ thứ {rec['c_pos'] + 1:.2f}), f(c) ≈ *{rec['y_c']:.3f}*, sai khác = {rec['residual']:.3e}.")
+else:
+    st.markdown(f"> Không có đoạn nào trong khoảng có f' bao slope; điểm có f' gần nhất: c = *{rec['c_pos']:.0f}*, sai khác = {rec['residual']:.3e}.")
+
+# --- Tra cứu nhanh theo tốc độ tức thời ---
+st.header("7. Tra cứu: khi nào tốc độ tức thời bằng v?")
+with render_metrics.stage("rate_index", rows=n - 1):
+    rate_index, _ = pool_result((entry_key, "rate_index"), RateIndex, deriv, analysis["t"], y, labels, size=len(raw))
+v = st.number_input("Tốc độ tức thời v (cùng đơn vị với slope)", value=float(round(avg_slope, 3)), format="%.3f")
+with render_metrics.stage("rate_query") as rec:
+    hits = rate_index.crossings(v)
+    rec["rows"] = len(hits)
+if len(hits):
+    st.markdown(f"f'(c) = {v:+.3f} tại *{len(hits)}* điểm (f' nội suy tuyến tính giữa các kỳ):")
+    show_table(hits.drop(columns=["segment", "flat"]).rename(columns={
+        "a_label": "Từ kỳ",
+        "b_label": "Đến kỳ",
+        "c_pos": "Vị trí c",
+        "c_time": "Thời điểm c",
+        "y_c": "Giá trị f(c) ước lượng",
+    }), "page_rate", {"Vị trí c": "{:.3f}", "Thời điểm c": "{:.3f}", "Giá trị f(c) ước lượng": "{:.3f}"})
+else:
+    st.info(f"Không có đoạn nào mà đạo hàm xấp xỉ đạt {v:+.3f}.")
+
+# --- Phát hiện thay đổi tốc độ ---
+st.header("8. Phát hiện thay đổi tốc độ (change-point)")
+changes = analysis["changes"]
+regimes = changes["regimes"]
+shifts = changes["changes"]
+outliers = changes["outliers"]
+current = regimes.iloc[-1]
+st.markdown(
+    f"Chuỗi slope được chia thành *{len(regimes)}* giai đoạn có tốc độ ổn định (CUSUM hai phía). "
+    f"Giai đoạn hiện tại bắt đầu từ *{labels[int(current['start'])]}*, tốc độ trung bình *{current['avg_slope']:+.3f}* "
+    f"(trung bình toàn chuỗi: {avg_slope:+.3f})."
+)
+show_table(lambda rows: pd.DataFrame({
+    "Từ kỳ": labels[regimes["start"].to_numpy()[rows]],
+    "Đến kỳ": labels[regimes["stop"].to_numpy()[rows]],
+    "Số đoạn": regimes["n_segments"].to_numpy()[rows],
+    "Tốc độ trung bình": regimes["avg_slope"].to_numpy()[rows],
+    "Nhận xét": regimes["comment"].to_numpy()[rows],
+}), "page_regimes", {"Tốc độ trung bình": "{:+.3f}"}, n_rows=len(regimes))
+if len(shifts):
+    st.subheader("Các điểm thay đổi tốc độ")
+    show_table(lambda rows: pd.DataFrame({
+        "Bắt đầu từ kỳ": labels[shifts["segment"].to_numpy()[rows]],
+        "Phát hiện tại kỳ": labels[shifts["detected_at"].to_numpy()[rows] + 1],
+        "Hướng": np.where(shifts["direction"].to_numpy()[rows] > 0, "🔼 Tăng tốc", "🔻 Giảm tốc"),
+        "Tốc độ trước": shifts["rate_before"].to_numpy()[rows],
+        "Tốc độ sau": shifts["rate_after"].to_numpy()[rows],
+    }), "page_shifts", {"Tốc độ trước": "{:+.3f}", "Tốc độ sau": "{:+.3f}"}, n_rows=len(shifts))
+else:
+    st.info("Không phát hiện thay đổi tốc độ đáng kể: một tốc độ trung bình mô tả được cả chuỗi.")
+if len(outliers):
+    st.subheader(f"Đoạn bất thường theo MVT ({len(outliers)})")
+    show_table(lambda rows: pd.DataFrame({
+        "Kỳ": [period_name(i) for i in outliers[rows]],
+        "Slope (Δ)": slopes[outliers[rows]],
+        "Sai khác |f'(c) - slope|": [mvt[i:i + 1]["residual"][0] for i in outliers[rows]],
+    }), "page_outliers", {"Slope (Δ)": "{:+.3f}", "Sai khác |f'(c) - slope|": "{:.3e}"}, n_rows=len(outliers))
+
 st.markdown("""
 *Ghi chú về phương pháp:*  
 - Bởi dữ liệu thực là rời rạc (theo quý/năm), ta dùng các xấp xỉ đạo hàm (forward/backward/central) để mô phỏng f'(t).  
 - Khi f' tại hai đầu bao lấy slope trung bình, ta nội suy tuyến tính giữa hai giá trị đạo hàm để tìm vị trí c ước lượng (giả thiết đạo hàm biến đổi đều trong khoảng nhỏ).  
 - Phương pháp này gần đúng; nếu cần chính xác hơn có thể:
-  - Dùng nội suy spline để có hàm mượt hơn rồi giải f'(t)=slope trong khoảng
-  - Dùng dữ liệu có phân giải cao hơn (theo ngày/tuần).
+  - Dùng nội suy spline để có hàm mượt hơn rồi giải f'(t)=slope trong khoảng (chọn "Spline bậc ba" ở mục *Cách tìm điểm c*)
+  - Dùng dữ liệu có phân giải cao hơn (theo ngày/tuần); khi đó nên chọn một cách ước lượng đạo hàm có làm trơn (Savitzky–Golay hoặc hồi quy cục bộ) ở mục *Cách ước lượng đạo hàm f'*.
+- Với đạo hàm đã làm trơn, slope giữa hai kỳ vẫn lấy từ dữ liệu gốc: trên dữ liệu nhiễu, sai khác (residual) phản ánh mức nhiễu; spline bậc ba luôn tìm được c.
+- Mục 8 so sánh mỗi slope với trung bình của giai đoạn hiện tại (theo đơn vị nhiễu ước lượng từ hiệu các slope liên tiếp) và cộng dồn độ lệch (CUSUM); khi tổng vượt ngưỡng, một giai đoạn mới bắt đầu từ chỗ độ lệch bắt đầu tích lũy. Đoạn bất thường là đoạn có sai khác |f'(c) - slope| lớn hơn nhiều lần mức nhiễu đó.
 """)
 
 st.markdown("""
@@ -492,3 +508,29 @@ st.markdown("""
     Điều này có nghĩa là, trong khoảng giữa hai quý, có một giai đoạn thực tế mà công ty đang hoạt động  
     với đúng mức "động lượng" trung bình đó – phản ánh xu hướng tăng trưởng hoặc suy giảm bền vững.
     """)
+
+# --- Chẩn đoán hiệu năng ---
+report_metrics(render_metrics, "render", len(raw), options, METRICS_FILE)
+
+
+def metrics_frame(metrics):
+    summary = metrics.summary()
+    return pd.DataFrame({
+        "Bước": summary["stage"],
+        "Số lần": summary["calls"],
+        "Thời gian (ms)": summary["seconds"] * 1000,
+        "Bộ nhớ cấp phát đỉnh (MB)": summary["peak_bytes"] / 2**20,
+        "Số dòng": summary["rows"],
+    })
+
+
+with st.expander("🔧 Chẩn đoán hiệu năng"):
+    compute = entry["metrics"]
+    note = "lấy từ bộ nhớ đệm, số liệu của lần tính gốc" if from_cache else "vừa tính"
+    st.markdown(f"*Tính toán* ({note}): tổng {compute.total_seconds * 1000:.1f} ms")
+    fmt = {"Thời gian (ms)": "{:.1f}", "Bộ nhớ cấp phát đỉnh (MB)": "{:.2f}"}
+    st.dataframe(metrics_frame(compute).style.format(fmt, na_rep="—"))
+    st.markdown(f"*Hiển thị lần chạy này:* tổng {render_metrics.total_seconds * 1000:.1f} ms")
+    st.dataframe(metrics_frame(render_metrics).style.format(fmt, na_rep="—"))
+    if not TRACE_MEMORY:
+        st.caption("Đặt MVT_TRACE_MEMORY=1 để đo bộ nhớ cấp phát (chậm hơn); MVT_METRICS_FILE=đường_dẫn để ghi số liệu ra file JSON-lines.")
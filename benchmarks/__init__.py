@@ -0,0 +1,8 @@
+"""Benchmarks and numeric regression checks for the MVT pipeline.
+
+Run from the repository root::
+
+    python -m benchmarks                      # all generators, 10 .. 10^7 points
+    python -m benchmarks --sizes 10,1e4,1e6 --save-baseline bench.json
+    python -m benchmarks --sizes 10,1e4,1e6 --baseline bench.json
+"""
@@ -0,0 +1,260 @@
+"""Time the analysis pipeline stage by stage and check numeric equivalence.
+
+For every generator and size the pipeline of the app is run on a
+synthetic CSV: ingest -> slope -> derivative -> MVT table -> change
+points -> batch (the same values as entities of ``BATCH_PERIODS``
+periods) -> chart -> explanation (one segment's record plus one rendered
+table page).  Each
+stage reports its best wall time over ``--repeat`` runs and, in a
+separate traced run, its peak Python/NumPy allocation.  Up to
+``--ref-max`` points the MVT columns of every vectorised path are
+compared against the original loop in :mod:`benchmarks.reference`.
+"""
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from mvt_analyzer import compute_slopes, estimate_derivatives, mvt_result
+from mvt_analyzer.batch import analyze_batch
+from mvt_analyzer.changepoint import detect_changes
+from mvt_analyzer.incremental import IncrementalAnalysis
+from mvt_analyzer.ingest import PERIOD_COL, VALUE_COL, read_csv_bytes
+from mvt_analyzer.plotting import figure_to_png, plot_mvt
+from mvt_analyzer.stream import analyze_csv_stream
+from mvt_analyzer.windows import WindowAnalysis
+
+from .generators import GENERATORS, make_series, to_csv_bytes
+from .reference import reference_mvt
+
+DEFAULT_SIZES = "10,100,1e3,1e4,1e5,1e6,1e7"
+CHECKED_COLUMNS = ("c_pos", "y_c", "residual")
+PAGE_SIZE = 50  # như trong app
+BATCH_PERIODS = 40  # số kỳ mỗi thực thể ở bước batch
+# thời gian/bộ nhớ dưới ngưỡng này bị nhiễu, không so với baseline
+MIN_SECONDS = 0.005
+MIN_BYTES = 1 << 20
+
+
+# --- các bước của pipeline ---
+
+def _ingest(ctx):
+    df, _ = read_csv_bytes(ctx["raw"])
+    return {"labels": df[PERIOD_COL].to_numpy(dtype=object), "y": df[VALUE_COL].to_numpy(dtype=float)}
+
+
+def _slope(ctx):
+    return {"slopes": compute_slopes(ctx["y"])}
+
+
+def _derivative(ctx):
+    return {"deriv": estimate_derivatives(ctx["y"])}
+
+
+def _mvt_table(ctx):
+    return {"table": mvt_result(ctx["labels"], ctx["y"], ctx["slopes"], ctx["deriv"])}
+
+
+def _changepoints(ctx):
+    return {"changes": detect_changes(ctx["slopes"], ctx["table"]["residual"])}
+
+
+def _batch_entities(ctx):
+    # cùng dữ liệu, chia thành nhiều thực thể ngắn: trường hợp "hàng nghìn chuỗi"
+    n = len(ctx["y"])
+    df = pd.DataFrame({"entity": np.arange(n) // BATCH_PERIODS, PERIOD_COL: ctx["labels"], VALUE_COL: ctx["y"]})
+    return {"batch": analyze_batch(df, "entity")}
+
+
+def _chart(ctx):
+    return {"png": figure_to_png(plot_mvt(ctx["labels"], ctx["y"], ctx["table"]))}
+
+
+def _explanation(ctx):
+    table = ctx["table"]
+    rec = table.record(len(table) // 2)
+    text = (
+        f"slope = ({rec['b_val']:.3f} - {rec['a_val']:.3f}) = {rec['slope']:+.3f}; "
+        f"f'(a) ≈ {rec['deriv_a']:+.3f}, f'(b) ≈ {rec['deriv_b']:+.3f}; "
+        f"c ≈ {rec['c_pos']:.3f}, f(c) ≈ {rec['y_c']:.3f} ({rec['method']})"
+    )
+    page = table[:PAGE_SIZE].to_frame().style.format({"slope": "{:+.3f}", "y_c": "{:.3f}"}).to_html()
+    return {"text": text, "page": page}
+
+
+STAGES = (
+    ("ingest", _ingest),
+    ("slope", _slope),
+    ("derivative", _derivative),
+    ("mvt_table", _mvt_table),
+    ("changepoints", _changepoints),
+    ("batch", _batch_entities),
+    ("chart", _chart),
+    ("explanation", _explanation),
+)
+
+
+def measure(fn, ctx, repeat=3, memory=True):
+    """``(output, best_seconds, peak_bytes)`` for one stage."""
+    best, out = float("inf"), None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        out = fn(ctx)
+        best = min(best, time.perf_counter() - start)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            fn(ctx)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return out, best, peak
+
+
+def run_case(kind, n, repeat=3, memory=True, seed=0):
+    """Stage timings for one generated series; also returns the context."""
+    labels, y = make_series(kind, n, seed)
+    ctx = {"raw": to_csv_bytes(labels, y)}
+    stages = {}
+    for name, fn in STAGES:
+        # chuỗi lớn: mỗi lần chạy đã đủ dài, không cần lặp
+        out, seconds, peak = measure(fn, ctx, repeat if n < 1_000_000 else 1, memory)
+        ctx.update(out)
+        stages[name] = {"seconds": seconds, "peak_bytes": peak}
+    return stages, ctx
+
+
+# --- kiểm tra tương đương số ---
+
+def _incremental(ctx):
+    inc = IncrementalAnalysis()
+    for part in np.array_split(np.arange(len(ctx["y"])), 4):
+        inc.extend(ctx["labels"][part], ctx["y"][part])
+    return inc.mvt_table()
+
+
+def _batch(ctx):
+    df = pd.DataFrame({"entity": "A", PERIOD_COL: ctx["labels"], VALUE_COL: ctx["y"]})
+    return analyze_batch(df, "entity", workers=1)[0]
+
+
+PATHS = {
+    "engine": lambda ctx: ctx["table"],
+    "stream": lambda ctx: analyze_csv_stream(
+        io.BytesIO(ctx["raw"]), chunksize=max(2, len(ctx["y"]) // 3)
+    )["mvt"],
+    "incremental": _incremental,
+    "windows": lambda ctx: WindowAnalysis(ctx["y"], deriv=ctx["deriv"]).windows(1),
+    "batch": _batch,
+}
+
+
+def check_equivalence(ctx, rtol=1e-9, atol=1e-9):
+    """Max abs difference per path and column against the reference loop."""
+    ref = reference_mvt(ctx["y"])
+    report = {}
+    for name, path in PATHS.items():
+        table = path(ctx)
+        diffs = {}
+        for col in CHECKED_COLUMNS:
+            got = np.asarray(table[col], dtype=float)
+            ok = got.shape == ref[col].shape and np.allclose(got, ref[col], rtol=rtol, atol=atol)
+            diff = float(np.max(np.abs(got - ref[col]), initial=0.0)) if got.shape == ref[col].shape else float("inf")
+            diffs[col] = {"max_abs_diff": diff, "ok": bool(ok)}
+        report[name] = diffs
+    return report
+
+
+# --- baseline ---
+
+def compare(results, baseline, tolerance=0.25):
+    """Regressions: stages slower or bigger than ``1 + tolerance`` x baseline."""
+    found = []
+    for case, stages in results["cases"].items():
+        base_stages = baseline.get("cases", {}).get(case, {})
+        for stage, cur in stages["stages"].items():
+            base = base_stages.get("stages", {}).get(stage)
+            if not base:
+                continue
+            for key, floor in (("seconds", MIN_SECONDS), ("peak_bytes", MIN_BYTES)):
+                old, new = base.get(key), cur.get(key)
+                if old is None or new is None or max(old, new) < floor:
+                    continue
+                ratio = new / old if old else float("inf")
+                cur.setdefault("vs_baseline", {})[key] = ratio
+                if ratio > 1 + tolerance:
+                    found.append(f"{case} {stage} {key}: {old:.4g} -> {new:.4g} (x{ratio:.2f})")
+    return found
+
+
+def parse_sizes(text):
+    return [int(float(s)) for s in text.split(",") if s.strip()]
+
+
+def build_parser():
+    p = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[0])
+    p.add_argument("--sizes", default=DEFAULT_SIZES, help=f"số điểm, phân cách bằng dấu phẩy (mặc định {DEFAULT_SIZES})")
+    p.add_argument("--kinds", default=",".join(GENERATORS), help="các bộ sinh dữ liệu")
+    p.add_argument("--repeat", type=int, default=3, help="số lần chạy mỗi bước (lấy thời gian tốt nhất)")
+    p.add_argument("--no-memory", action="store_true", help="bỏ đo bộ nhớ đỉnh (tracemalloc)")
+    p.add_argument("--ref-max", type=float, default=1e5, help="kiểm tra tương đương với vòng lặp gốc tới số điểm này")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("-o", "--output", help="ghi kết quả JSON")
+    p.add_argument("--baseline", help="so với file baseline JSON")
+    p.add_argument("--save-baseline", help="lưu kết quả làm baseline")
+    p.add_argument("--tolerance", type=float, default=0.25, help="mức chậm hơn cho phép so với baseline")
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    kinds = [k for k in args.kinds.split(",") if k]
+    unknown = set(kinds) - set(GENERATORS)
+    if unknown:
+        build_parser().error(f"unknown generator(s): {', '.join(sorted(unknown))}")
+
+    results = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "cases": {},
+    }
+    mismatches = []
+    for n in parse_sizes(args.sizes):
+        if n < 2:
+            continue
+        for kind in kinds:
+            stages, ctx = run_case(kind, n, args.repeat, not args.no_memory, args.seed)
+            case = {"n": n, "kind": kind, "stages": stages}
+            if n <= args.ref_max:
+                case["equivalence"] = check_equivalence(ctx)
+                mismatches += [
+                    f"{kind}/{n} {path}.{col}: max |diff| = {d['max_abs_diff']:.3g}"
+                    for path, cols in case["equivalence"].items()
+                    for col, d in cols.items() if not d["ok"]
+                ]
+            results["cases"][f"{kind}/{n}"] = case
+            for stage, m in stages.items():
+                mem = "" if m["peak_bytes"] is None else f"{m['peak_bytes'] / 2**20:10.1f} MB"
+                print(f"{kind:8} {n:>9} {stage:12} {m['seconds']:10.4f} s {mem}", flush=True)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            regressions = compare(results, json.load(fh), args.tolerance)
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=1)
+
+    for line in mismatches:
+        print("MISMATCH", line, file=sys.stderr)
+    for line in regressions:
+        print("REGRESSION", line, file=sys.stderr)
+    return 1 if mismatches or regressions else 0
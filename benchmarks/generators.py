@@ -0,0 +1,44 @@
+"""Synthetic "Kỳ, Giá trị" series for benchmarks.
+
+Values are rounded to 3 decimals so they survive a CSV round trip
+unchanged, which lets every path (CSV ingest, in-memory, streaming) be
+compared on identical inputs.
+"""
+import numpy as np
+import pandas as pd
+
+
+def trend(n, rng):
+    """Linear growth with small noise: mostly bracketed segments."""
+    return 100 + 0.5 * np.arange(n) + rng.normal(0, 1, n)
+
+
+def noise(n, rng):
+    """Random walk: many segments where slope is not bracketed."""
+    return 100 + np.cumsum(rng.normal(0, 1, n))
+
+
+def plateau(n, rng):
+    """Flat runs with jumps: long stretches of zero slopes and derivatives."""
+    run = rng.integers(5, 40, n // 5 + 1)
+    level = np.cumsum(rng.normal(0, 5, len(run)))
+    return 100 + np.repeat(level, run)[:n]
+
+
+def linear(n, rng):
+    """Exact straight line: deriv_a == deriv_b == slope on every segment."""
+    return 7 + 3 * np.arange(n, dtype=float)
+
+
+GENERATORS = {"trend": trend, "noise": noise, "plateau": plateau, "linear": linear}
+
+
+def make_series(kind, n, seed=0):
+    """``(labels, values)`` for generator ``kind`` with ``n`` periods."""
+    y = np.round(GENERATORS[kind](n, np.random.default_rng(seed)), 3)
+    labels = np.char.add("P", np.arange(n).astype(str)).astype(object)
+    return labels, y
+
+
+def to_csv_bytes(labels, y):
+    return pd.DataFrame({"Kỳ": labels, "Giá trị": y}).to_csv(index=False).encode("utf-8")
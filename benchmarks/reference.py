@@ -0,0 +1,47 @@
+"""The original per-segment MVT loop from app.py, kept as ground truth.
+
+Numeric output only (no label strings) so it can be compared with the
+vectorised paths; the logic is unchanged, including the 1e-9 midpoint
+test and the left-endpoint tie break.
+"""
+import numpy as np
+
+
+def reference_mvt(y):
+    """Arrays ``c_pos``, ``y_c`` and ``residual`` for each segment."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    t = np.arange(n)
+    slopes = np.diff(y) / np.diff(t)
+
+    deriv = np.zeros(n)
+    if n == 2:
+        deriv[0] = slopes[0]
+        deriv[1] = slopes[0]
+    else:
+        deriv[0] = (y[1] - y[0]) / (t[1] - t[0])  # forward diff
+        deriv[-1] = (y[-1] - y[-2]) / (t[-1] - t[-2])  # backward diff
+        for i in range(1, n - 1):
+            deriv[i] = (y[i + 1] - y[i - 1]) / (t[i + 1] - t[i - 1])  # central difference
+
+    c_pos = np.empty(n - 1)
+    y_c = np.empty(n - 1)
+    residual = np.empty(n - 1)
+    for i in range(n - 1):
+        a_val, b_val = float(y[i]), float(y[i + 1])
+        slope = float(slopes[i])
+        deriv_a = float(deriv[i])
+        deriv_b = float(deriv[i + 1])
+        bracket = (min(deriv_a, deriv_b) <= slope <= max(deriv_a, deriv_b))
+        if deriv_b != deriv_a and bracket:
+            c = i + (slope - deriv_a) / (deriv_b - deriv_a)
+        elif deriv_b == deriv_a and abs(deriv_a - slope) < 1e-9 and bracket:
+            c = i + 0.5
+        elif abs(deriv_a - slope) <= abs(deriv_b - slope):
+            c = float(i)
+        else:
+            c = float(i + 1)
+        c_pos[i] = c
+        y_c[i] = a_val + (c - i) * (b_val - a_val)
+        residual[i] = abs(deriv_a + ((c - i) * (deriv_b - deriv_a)) - slope)
+    return {"c_pos": c_pos, "y_c": y_c, "residual": residual}
@@ -0,0 +1,19 @@
+"""MVT Analyzer – phân tích Định lý Giá trị Trung bình trên dữ liệu kinh doanh."""
+from .engine import (
+    METHODS,
+    RECORD_COLUMNS,
+    SOLVERS,
+    analyze,
+    classify_slopes,
+    compute_slopes,
+    estimate_derivatives,
+    locate_mvt_points,
+    mvt_records,
+    mvt_result,
+    mvt_table,
+    overall_verdict,
+)
+from .changepoint import ChangeDetector, detect_changes
+from .derivatives import ESTIMATORS
+from .result import MVTResult
+from .timeaxis import parse_time_axis, resolve_time_axis, time_axis_style
@@ -0,0 +1,295 @@
+"""MVT analysis over many series at once (one per entity: store, SKU, ...).
+
+The long-format input is sorted by entity once and the values (and time
+axis) are placed in shared memory.  Each worker process analyses a
+contiguous block of entities in a single vectorized pass: slopes and
+derivatives are computed over the whole block, the first/last point of
+every entity gets its forward/backward difference, and the segments that
+straddle two entities are dropped.  Workers write their results straight
+into shared output arrays, so nothing but block offsets is pickled.
+
+The per-entity summary also runs :mod:`mvt_analyzer.changepoint` over
+each entity's slopes: number of rate shifts, the rate of the current
+regime and since when it holds, and the count of residual outliers.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .changepoint import series_changes
+from .engine import METHODS, SOLVERS, SPLINE_COLUMNS, VERDICTS, mvt_columns
+from .ingest import PERIOD_COL, VALUE_COL, read_table, sanitize_frame
+from .timeaxis import parse_time_axis
+
+# dưới ngưỡng này chạy ngay trong tiến trình hiện tại (khởi động pool tốn hơn)
+INLINE_ROWS = 200_000
+
+_FLOAT_COLUMNS = ["slope", "deriv_a", "deriv_b", "c_frac", "c_pos", "c_time", "y_c", "deriv_c", "residual"]
+_SPLINE_FLOAT_COLUMNS = ["c_frac_2", "c_pos_2", "c_time_2", "y_c_2", "residual_2"]
+# theo thực thể, thứ tự như kết quả của series_changes
+_CHANGE_COLUMNS = [("n_changes", np.int64), ("current_rate", np.float64),
+                   ("current_start", np.int64), ("n_outliers", np.int64)]
+
+
+def block_columns(y, t, starts, solver="linear"):
+    """MVT columns for consecutive entities stored back to back.
+
+    ``starts`` holds the first row of each entity plus a final end offset;
+    every entity must have at least 2 rows.  ``c_pos``/``c_time_2`` etc.
+    are relative to each entity's own first period.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    first, last = starts[:-1], starts[1:] - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dy = np.diff(y)
+        dt = np.ones(len(dy)) if t is None else np.diff(t)
+        slopes = dy / dt
+        deriv = np.empty(len(y))
+        if len(y) > 2:
+            span = 2.0 if t is None else t[2:] - t[:-2]
+            deriv[1:-1] = (y[2:] - y[:-2]) / span  # central difference
+        deriv[first] = slopes[first]  # forward diff
+        deriv[last] = slopes[last - 1]  # backward diff
+        cols = mvt_columns(y, slopes, deriv, t=t, solver=solver)
+
+    # bỏ các đoạn nối hai thực thể khác nhau
+    keep = np.ones(len(slopes), dtype=bool)
+    keep[last[:-1]] = False
+    cols = {k: v[keep] for k, v in cols.items()}
+    if t is not None and not (dt[keep] > 0).all():
+        raise ValueError("Các 'Kỳ' của mỗi thực thể phải tăng dần và không trùng nhau.")
+
+    # vị trí c tính từ kỳ đầu tiên của từng thực thể: số thứ tự đoạn (nguyên) + c_frac
+    seg_counts = np.diff(starts) - 1
+    seg = np.arange(len(cols["slope"])) - np.repeat(np.cumsum(seg_counts) - seg_counts, seg_counts)
+    cols["c_pos"] = seg + cols["c_frac"]
+    if "c_frac_2" in cols:
+        cols["c_pos_2"] = seg + cols["c_frac_2"]
+    if t is None:  # không có trục thời gian: c_time trùng c_pos
+        cols["c_time"] = cols["c_pos"]
+        if "c_time_2" in cols:
+            cols["c_time_2"] = cols["c_pos_2"]
+    return cols
+
+
+class _Shared:
+    """Named shared-memory arrays; created in the parent, attached in workers."""
+
+    def __init__(self):
+        self.blocks = {}
+        self.specs = {}
+
+    def create(self, name, shape, dtype, fill=None):
+        dtype = np.dtype(dtype)
+        nbytes = max(int(np.prod(shape)) * dtype.itemsize, 1)
+        shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        self.blocks[name] = shm
+        self.specs[name] = (shm.name, shape, dtype.str)
+        arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        if fill is not None:
+            arr[...] = fill
+        return arr
+
+    def array(self, name):
+        shm_name, shape, dtype = self.specs[name]
+        return np.ndarray(shape, dtype=np.dtype(dtype), buffer=self.blocks[name].buf)
+
+    @classmethod
+    def attach(cls, specs):
+        self = cls()
+        self.specs = specs
+        for name, (shm_name, _, _) in specs.items():
+            self.blocks[name] = shared_memory.SharedMemory(name=shm_name)
+        return self
+
+    def close(self, unlink=False):
+        for shm in self.blocks.values():
+            shm.close()
+            if unlink:
+                shm.unlink()
+        self.blocks.clear()
+
+
+_worker = {}
+
+
+def _init_worker(specs, solver):
+    _worker["shared"] = _Shared.attach(specs)
+    _worker["solver"] = solver
+
+
+def _run_block(task, shared=None, solver=None):
+    """Analyse entities ``e0 .. e1-1`` and write their rows of the output."""
+    e0, e1 = task
+    shared = shared or _worker["shared"]
+    solver = solver or _worker["solver"]
+    starts = shared.array("starts")[e0:e1 + 1]
+    r0, r1 = int(starts[0]), int(starts[-1])
+    y = shared.array("y")[r0:r1]
+    t = shared.array("t")[r0:r1] if "t" in shared.specs else None
+    cols = block_columns(y, t, starts - r0, solver)
+    o0 = r0 - e0  # mỗi thực thể có ít hơn số kỳ một đoạn
+    for name, values in cols.items():
+        shared.array("out_" + name)[o0:o0 + len(values)] = values
+    # thay đổi tốc độ của từng thực thể, ngay trong tiến trình đã có slope của khối
+    changes = series_changes(cols["slope"], cols["residual"], np.diff(starts) - 1)
+    for (name, _), values in zip(_CHANGE_COLUMNS, changes):
+        shared.array("ent_" + name)[e0:e1] = values
+    return r1 - r0
+
+
+def _plan_blocks(starts, n_blocks):
+    """Split entities into ``n_blocks`` runs with roughly equal row counts."""
+    n_entities = len(starts) - 1
+    targets = np.linspace(0, starts[-1], n_blocks + 1)[1:-1]
+    cuts = np.unique(np.searchsorted(starts, targets).clip(1, n_entities - 1))
+    bounds = np.concatenate([[0], cuts, [n_entities]]) if n_entities > 1 else np.array([0, n_entities])
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def analyze_batch(df, entity_col, time_axis=None, solver="linear", workers=None):
+    """Analyse every entity of a long-format (entity, Kỳ, Giá trị) frame.
+
+    Returns ``(mvt_table, summary)``.  ``mvt_table`` has one row per
+    segment of every entity with at least two periods; ``summary`` has one
+    row per entity (``n_periods``, ``avg_slope``, ``min_slope``,
+    ``max_slope``, ``overall``).  Rows keep their file order within an
+    entity, or are sorted by time when ``time_axis`` is given.
+    ``workers`` defaults to the CPU count; small inputs are processed in
+    the calling process.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"unknown solver {solver!r}; expected one of {SOLVERS}")
+    if entity_col not in df.columns:
+        raise ValueError(f"Không có cột thực thể {entity_col!r}.")
+    df, _ = sanitize_frame(df[[entity_col, PERIOD_COL, VALUE_COL]])
+
+    codes, entities = pd.factorize(df[entity_col], sort=False)
+    if (codes < 0).any():  # bỏ các hàng không có mã thực thể
+        df, codes = df[codes >= 0], codes[codes >= 0]
+    labels = df[PERIOD_COL].to_numpy(dtype=object)
+    t = None
+    if time_axis is None:
+        order = np.argsort(codes, kind="stable")
+    else:
+        # có trục thời gian thật: sắp xếp theo thời gian trong từng thực thể
+        t = parse_time_axis(labels, None if time_axis == "auto" else time_axis)
+        order = np.lexsort((t, codes))
+    counts = np.bincount(codes, minlength=len(entities))
+    valid = counts >= 2
+    order = order[valid[codes[order]]]
+    n_valid = counts[valid]
+    starts = np.concatenate([[0], np.cumsum(n_valid)])
+    n_rows, n_ent = int(starts[-1]), int(valid.sum())
+
+    labels = labels[order]
+    y = df[VALUE_COL].to_numpy(dtype=float)[order]
+    if t is not None:
+        t = t[order]
+
+    out_cols = _FLOAT_COLUMNS + (_SPLINE_FLOAT_COLUMNS if solver == "spline" else [])
+    n_seg = n_rows - n_ent
+    workers = workers or os.cpu_count() or 1
+    shared = _Shared()
+    try:
+        shared.create("y", (n_rows,), np.float64)[:] = y
+        if t is not None:
+            shared.create("t", (n_rows,), np.float64)[:] = t
+        shared.create("starts", (n_ent + 1,), np.int64)[:] = starts
+        for name in out_cols:
+            shared.create("out_" + name, (n_seg,), np.float64)
+        shared.create("out_bracket", (n_seg,), np.bool_)
+        shared.create("out_method", (n_seg,), np.int8)
+        if solver == "spline":
+            shared.create("out_n_roots", (n_seg,), np.int8)
+        for name, dtype in _CHANGE_COLUMNS:
+            shared.create("ent_" + name, (n_ent,), dtype)
+
+        if n_ent:
+            if workers == 1 or n_rows < INLINE_ROWS:
+                _run_block((0, n_ent), shared, solver)
+            else:
+                tasks = _plan_blocks(starts, workers * 4)
+                with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                         initargs=(shared.specs, solver)) as pool:
+                    list(pool.map(_run_block, tasks))
+
+        results = {name: shared.array("out_" + name).copy() for name in
+                   out_cols + ["bracket", "method"] + (["n_roots"] if solver == "spline" else [])}
+        changes = tuple(shared.array("ent_" + name).copy() for name, _ in _CHANGE_COLUMNS)
+    finally:
+        shared.close(unlink=True)
+
+    ent_codes = np.repeat(np.arange(n_ent), n_valid - 1)
+    valid_entities = entities[valid]
+    is_seg = np.ones(n_rows, dtype=bool)
+    is_seg[starts[1:] - 1] = False  # kỳ cuối của mỗi thực thể không mở đoạn mới
+    seg_rows = np.flatnonzero(is_seg)
+    table = pd.DataFrame({
+        entity_col: pd.Categorical.from_codes(ent_codes, valid_entities),
+        "a_label": labels[seg_rows],
+        "b_label": labels[seg_rows + 1],
+        "a_val": y[seg_rows],
+        "b_val": y[seg_rows + 1],
+    })
+    for name in ["slope", "deriv_a", "deriv_b", "bracket", "c_pos", "c_time", "y_c", "deriv_c", "residual"]:
+        table[name] = results[name]
+    table["method"] = pd.Categorical.from_codes(results["method"], METHODS)
+    for name in SPLINE_COLUMNS:
+        if name in results:
+            table[name] = results[name]
+
+    summary = entity_summary(entities, counts, valid, results["slope"], n_valid, entity_col, changes, labels)
+    return table, summary
+
+
+def entity_summary(entities, counts, valid, slopes, n_valid, entity_col, changes, labels=None):
+    """Per-entity slope statistics, the growth/decline verdict and rate shifts.
+
+    ``changes`` is the :func:`series_changes` output for the valid
+    entities, in order; ``labels`` (sorted like the slopes) gives
+    ``current_since``, the first period of each entity's current regime.
+    """
+    n = len(entities)
+    avg = np.full(n, np.nan)
+    lo = np.full(n, np.nan)
+    hi = np.full(n, np.nan)
+    n_changes = np.zeros(n, dtype=np.int64)
+    n_outliers = np.zeros(n, dtype=np.int64)
+    current = np.full(n, np.nan)
+    since = np.full(n, None, dtype=object)
+    if len(slopes):
+        seg_starts = np.concatenate([[0], np.cumsum(n_valid - 1)[:-1]])
+        avg[valid] = np.add.reduceat(slopes, seg_starts) / (n_valid - 1)
+        lo[valid] = np.minimum.reduceat(slopes, seg_starts)
+        hi[valid] = np.maximum.reduceat(slopes, seg_starts)
+        n_chg, rate, start, outliers = changes
+        n_changes[valid], current[valid], n_outliers[valid] = n_chg, rate, outliers
+        if labels is not None:
+            # đoạn thứ k của thực thể bắt đầu ở kỳ thứ k của nó
+            since[valid] = labels[np.concatenate([[0], np.cumsum(n_valid)[:-1]]) + start]
+    overall = np.select(
+        [avg > 0, avg < 0, avg == 0],
+        [VERDICTS[1], VERDICTS[-1], VERDICTS[0]],
+        default="Không đủ dữ liệu (cần ít nhất 2 kỳ).",
+    )
+    return pd.DataFrame({
+        entity_col: entities,
+        "n_periods": counts,
+        "avg_slope": avg,
+        "min_slope": lo,
+        "max_slope": hi,
+        "overall": overall,
+        "n_changes": n_changes,
+        "current_rate": current,
+        "current_since": since,
+        "residual_outliers": n_outliers,
+    })
+
+
+def analyze_batch_file(path, entity_col, **kwargs):
+    """:func:`analyze_batch` on a CSV, Parquet or Arrow/Feather file."""
+    return analyze_batch(read_table(path, [entity_col, PERIOD_COL, VALUE_COL]), entity_col, **kwargs)
@@ -0,0 +1,123 @@
+"""Bounded, content-addressed result cache.
+
+Streamlit reruns the whole script on every widget interaction; keeping the
+parsed frame, the MVT table and the rendered chart here keyed on a hash of
+the uploaded bytes lets a rerun skip straight to display.
+"""
+import hashlib
+import mmap
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def content_key(data, *params):
+    """Stable hex key for a payload plus any analysis parameters."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(data)
+    for p in params:
+        h.update(b"\0")
+        h.update(repr(p).encode("utf-8"))
+    return h.hexdigest()
+
+
+def approx_nbytes(value, _seen=None):
+    """Rough memory held by ``value``: arrays, frames, bytes and what contains them.
+
+    Arrays are counted by their base buffer, once however many views or
+    containers share it; memory-mapped files count as 0 (their pages
+    belong to the OS page cache).  Object arrays add a sampled size of
+    their elements.
+    """
+    seen = set() if _seen is None else _seen
+    if isinstance(value, np.ndarray):
+        base = value
+        while isinstance(base, np.ndarray) and base.base is not None:
+            base = base.base
+        if id(base) in seen or isinstance(base, (np.memmap, mmap.mmap)):
+            return 0
+        seen.add(id(base))
+        size = base.nbytes if isinstance(base, np.ndarray) else value.nbytes
+        if value.dtype == object and value.size:
+            sample = value.ravel()[:: max(1, value.size // 256)]
+            size += int(sum(sys.getsizeof(x) for x in sample) * value.size / len(sample))
+        return size
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, dict):
+        return sum(approx_nbytes(v, seen) for v in value.values())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sum(approx_nbytes(v, seen) for v in value)
+    if hasattr(value, "__dict__"):
+        return approx_nbytes(vars(value), seen)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """Thread-safe mapping bounded by entry count and, optionally, bytes.
+
+    The least recently used entry is evicted first; ``get`` counts as a use.
+    With ``maxbytes`` the entries' :func:`approx_nbytes` must also fit;
+    a value larger than the whole budget is not cached at all.
+    """
+
+    def __init__(self, maxsize=16, maxbytes=None):
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self._data = OrderedDict()
+        self._sizes = {}
+        self.nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = approx_nbytes(value) if self.maxbytes is not None else 0
+        with self._lock:
+            self._pop(key)
+            if self.maxbytes is not None and size > self.maxbytes:
+                return
+            self._data[key] = value
+            self._sizes[key] = size
+            self.nbytes += size
+            while len(self._data) > self.maxsize or (self.maxbytes is not None and self.nbytes > self.maxbytes):
+                self._pop(next(iter(self._data)))
+
+    def _pop(self, key):
+        if key in self._data:
+            del self._data[key]
+            self.nbytes -= self._sizes.pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.nbytes = 0
+
@@ -0,0 +1,370 @@
+"""Online detection of rate shifts and MVT residual outliers.
+
+:class:`ChangeDetector` reads the per-segment slopes (and MVT residuals)
+once, in order, in as many chunks as convenient:
+
+- the noise scale is sigma^2 ≈ mean((s_i - s_{i-1})^2) / 2 over the slopes
+  seen so far; a level shift adds only one large difference, so sigma
+  stays the short-term noise rather than the spread between regimes;
+- z_i = (s_i - m_i) / sigma, with m_i the running mean of the current
+  regime, clipped to ±``clip`` so one spike cannot raise an alarm alone;
+- a two-sided CUSUM S+ = max(0, S+ + z - drift), S- = max(0, S- - z - drift)
+  raises an alarm when either side exceeds ``threshold``.  The new regime
+  starts where that side last left zero (where the shift began), not at
+  the alarm, and a regime needs ``min_size`` segments before it can end;
+- a segment whose residual |f'(c) - slope| exceeds ``outlier`` x sigma is
+  flagged: its endpoint derivatives cannot explain the secant slope even
+  allowing for noise.  The test starts once ``min_size`` differences have
+  been seen, and sigma is never taken below ``atol + rtol * |slope|``, so
+  rounding noise on an exactly linear series is not an outlier.
+
+Both recursions are evaluated a span at a time with cumulative sums
+(S_i = D_i - min(0, min_{j<=i} D_j) for D = S_0 + cumsum(z - drift)); spans
+restart short after an alarm and double while none is raised, so the cost
+stays linear however many shifts there are.  Between calls the
+state is a handful of scalars plus the regimes found, so chunks from the
+stream reader or thousands of series can be fed without keeping slopes.
+"""
+import numpy as np
+import pandas as pd
+
+from . import engine
+
+DEFAULT_THRESHOLD = 8.0
+DEFAULT_DRIFT = 0.5
+DEFAULT_MIN_SIZE = 8
+DEFAULT_OUTLIER = 6.0
+DEFAULT_CLIP = 3.0
+# sàn cho sigma: dưới mức này chỉ còn là sai số làm tròn
+DEFAULT_ATOL = 1e-12
+DEFAULT_RTOL = 1e-8
+# số đoạn mỗi khối, và đoạn quét đầu tiên sau một cảnh báo (nhân đôi khi không có cảnh báo)
+BLOCK_SEGMENTS = 1 << 14
+MIN_SPAN = 256
+# series_changes: chuỗi tới độ dài này chạy song song theo vị trí đoạn (<= BLOCK_SEGMENTS)
+LOCKSTEP_SEGMENTS = 1024
+
+
+class ChangeDetector:
+    """Two-sided CUSUM over a slope series fed chunk by chunk.
+
+    Segment indices in the results are global (counted over every chunk
+    fed so far).  :meth:`regimes` includes the still open last regime.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, drift=DEFAULT_DRIFT, min_size=DEFAULT_MIN_SIZE,
+                 outlier=DEFAULT_OUTLIER, clip=DEFAULT_CLIP, atol=DEFAULT_ATOL, rtol=DEFAULT_RTOL):
+        if threshold <= 0 or drift < 0 or min_size < 1 or clip <= 0:
+            raise ValueError("threshold and clip must be > 0, drift >= 0 and min_size >= 1")
+        self.threshold = threshold
+        self.drift = drift
+        self.min_size = min_size
+        self.outlier = outlier
+        self.clip = clip
+        self.atol = atol
+        self.rtol = rtol
+        self.n = 0
+        self._prev = np.nan  # slope cuối cùng đã đọc
+        self._dsq = 0.0
+        self._ndiff = 0
+        self._regime = (0, 0, 0.0)  # (đoạn đầu, số đoạn, tổng slope) của chế độ đang mở
+        # mỗi phía: (giá trị S, số đoạn và tổng slope của chế độ tại lần S = 0 gần nhất)
+        self._sides = {1: (0.0, 0, 0.0), -1: (0.0, 0, 0.0)}
+        self._closed = []
+        self._changes = []
+        self._outliers = []
+
+    def update(self, slopes, residual=None):
+        """Read the next segments; returns ``(changes, outliers)`` found in them.
+
+        ``changes`` is a list of ``(segment, detected_at, direction)``
+        tuples, ``outliers`` an array of segment indices.
+        """
+        slopes = np.asarray(slopes, dtype=float)
+        residual = None if residual is None else np.asarray(residual, dtype=float)
+        n_changes, n_outliers = len(self._changes), len(self._outliers)
+        for lo in range(0, len(slopes), BLOCK_SEGMENTS):
+            hi = lo + BLOCK_SEGMENTS
+            self._block(slopes[lo:hi], None if residual is None else residual[lo:hi])
+        found = self._outliers[n_outliers:]
+        return self._changes[n_changes:], np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def _block(self, v, r):
+        g0, m = self.n, len(v)
+        # sigma trước mỗi đoạn: chỉ từ các hiệu giữa những slope đã đọc trước nó
+        d = np.diff(np.concatenate([[self._prev], v]))
+        seen = ~np.isnan(d)
+        dsq = np.where(seen, d * d, 0.0)
+        csq = self._dsq + np.concatenate([[0.0], np.cumsum(dsq)[:-1]])
+        cnt = self._ndiff + np.concatenate([[0], np.cumsum(seen)[:-1]])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sigma = np.fmax(np.sqrt(csq / (2.0 * cnt)), self.atol + self.rtol * np.abs(v))
+        self._dsq += float(dsq.sum())
+        self._ndiff += int(seen.sum())
+        self._prev = v[-1] if m else self._prev
+
+        if r is not None and self.outlier is not None:
+            with np.errstate(invalid="ignore"):
+                bad = np.flatnonzero((r > self.outlier * sigma) & (cnt >= self.min_size))
+            if len(bad):
+                self._outliers.append(g0 + bad)
+
+        i, span = 0, MIN_SPAN
+        while i < m:
+            used, alarmed = self._scan(v[i:i + span], sigma[i:i + span], g0 + i)
+            i += used
+            span = MIN_SPAN if alarmed else 2 * span
+        self.n += m
+
+    def _scan(self, w, sigma, g0):
+        """CUSUM over ``w`` up to the first alarm; returns ``(segments used, alarmed)``."""
+        start, n0, s0 = self._regime
+        m = len(w)
+        total = s0 + np.cumsum(w)  # tổng slope của chế độ, tính cả đoạn k
+        count = n0 + np.arange(1, m + 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # độ lệch so với trung bình của count - 1 đoạn trước: phương sai sigma^2 (1 + 1/(count - 1))
+            z = (w - (total - w) / (count - 1)) / (sigma * np.sqrt(1 + 1 / (count - 1)))
+        z = np.clip(np.nan_to_num(z, nan=0.0), -self.clip, self.clip)
+        z[count - 1 < self.min_size] = 0.0  # chế độ còn quá ngắn để có trung bình
+
+        paths, alarm, side = {}, m, None
+        for sign in (1, -1):
+            D = self._sides[sign][0] + np.cumsum(sign * z - self.drift)
+            S = D - np.minimum(0.0, np.minimum.accumulate(D))
+            paths[sign] = S
+            hit = np.flatnonzero(S > self.threshold)
+            if len(hit) and (hit[0] < alarm or (hit[0] == alarm and S[alarm] > paths[side][alarm])):
+                alarm, side = int(hit[0]), sign
+
+        if side is None:
+            self._regime = (start, int(count[-1]), float(total[-1]))
+            for sign, S in paths.items():
+                zeros = np.flatnonzero(S == 0)
+                _, zn, zs = self._sides[sign]
+                if len(zeros):
+                    zn, zs = int(count[zeros[-1]]), float(total[zeros[-1]])
+                self._sides[sign] = (float(S[-1]), zn, zs)
+            return m, False
+
+        # chế độ mới bắt đầu ngay sau lần cuối phía báo động còn bằng 0
+        zeros = np.flatnonzero(paths[side][:alarm] == 0)
+        _, zn, zs = self._sides[side]
+        if len(zeros):
+            zn, zs = int(count[zeros[-1]]), float(total[zeros[-1]])
+        n_now, s_now = int(count[alarm]), float(total[alarm])
+        if zn > 0:
+            self._closed.append((start, zn, zs))
+            self._changes.append((start + zn, g0 + alarm, side))
+            self._regime = (start + zn, n_now - zn, s_now - zs)
+        else:
+            self._regime = (start, n_now, s_now)
+        n_new, s_new = self._regime[1:]
+        self._sides = {1: (0.0, n_new, s_new), -1: (0.0, n_new, s_new)}
+        return alarm + 1, True
+
+    @property
+    def current(self):
+        """``(start, n_segments, avg_slope)`` of the still open regime."""
+        start, n, total = self._regime
+        return start, n, total / n if n else np.nan
+
+    @property
+    def outliers(self):
+        """Segment indices flagged as MVT residual outliers so far."""
+        return np.concatenate(self._outliers) if self._outliers else np.empty(0, dtype=np.int64)
+
+    def regimes(self):
+        """One row per regime: ``start``, ``stop`` (segments, stop exclusive), rate and comment."""
+        rows = self._closed + ([self._regime] if self._regime[1] else [])
+        start = np.array([r[0] for r in rows], dtype=np.int64)
+        n = np.array([r[1] for r in rows], dtype=np.int64)
+        avg = np.array([r[2] for r in rows], dtype=float) / np.maximum(n, 1)
+        return pd.DataFrame({
+            "start": start,
+            "stop": start + n,
+            "n_segments": n,
+            "avg_slope": avg,
+            "comment": engine.classify_slopes(avg),
+        })
+
+    def changes(self):
+        """One row per detected shift, with the average rate before and after."""
+        regimes = self.regimes()
+        seg = np.array([c[0] for c in self._changes], dtype=np.int64)
+        after = np.searchsorted(regimes["start"].to_numpy(), seg)
+        rate = regimes["avg_slope"].to_numpy()
+        detected = np.array([c[1] for c in self._changes], dtype=np.int64)
+        return pd.DataFrame({
+            "segment": seg,
+            "detected_at": detected,
+            "delay": detected - seg,
+            "direction": np.array([c[2] for c in self._changes], dtype=np.int8),
+            "rate_before": rate[after - 1] if len(seg) else np.empty(0),
+            "rate_after": rate[after] if len(seg) else np.empty(0),
+        })
+
+    def result(self):
+        return {"regimes": self.regimes(), "changes": self.changes(), "outliers": self.outliers}
+
+
+def detect_changes(slopes, residual=None, **options):
+    """Run a :class:`ChangeDetector` over a whole series.
+
+    Returns a dict with ``regimes`` and ``changes`` (DataFrames) and
+    ``outliers`` (segment indices); ``options`` go to the detector.
+    """
+    detector = ChangeDetector(**options)
+    detector.update(slopes, residual)
+    return detector.result()
+
+
+def segment_regimes(regimes, n_segments):
+    """Regime number of every segment, from a :meth:`ChangeDetector.regimes` frame."""
+    return np.repeat(np.arange(len(regimes)), regimes["n_segments"].to_numpy())[:n_segments]
+
+
+def series_changes(slopes, residual, seg_counts, **options):
+    """Per-series summary for series stored back to back (``seg_counts`` segments each).
+
+    Returns arrays ``n_changes``, ``current_rate`` (mean slope of the last
+    regime), ``current_start`` (its first segment, within the series) and
+    ``n_outliers``, the same as a :class:`ChangeDetector` per series.
+    Series of up to ``LOCKSTEP_SEGMENTS`` segments are run together, one
+    segment position at a time across all of them, so thousands of short
+    series cost a few dozen vector steps rather than a detector each.
+    """
+    seg_counts = np.asarray(seg_counts, dtype=np.int64)
+    k = len(seg_counts)
+    n_changes = np.zeros(k, dtype=np.int64)
+    n_outliers = np.zeros(k, dtype=np.int64)
+    current_rate = np.full(k, np.nan)
+    current_start = np.zeros(k, dtype=np.int64)
+    out = (n_changes, current_rate, current_start, n_outliers)
+    slopes = np.asarray(slopes, dtype=float)
+    residual = None if residual is None else np.asarray(residual, dtype=float)
+    lo = np.cumsum(seg_counts) - seg_counts
+    params = ChangeDetector(**options)
+
+    for i in np.flatnonzero(seg_counts > LOCKSTEP_SEGMENTS).tolist():
+        detector = ChangeDetector(**options)
+        sl = slice(lo[i], lo[i] + seg_counts[i])
+        changes, outliers = detector.update(slopes[sl], None if residual is None else residual[sl])
+        current_start[i], _, current_rate[i] = detector.current
+        n_changes[i], n_outliers[i] = len(changes), len(outliers)
+
+    short = (seg_counts > 0) & (seg_counts <= LOCKSTEP_SEGMENTS)
+    ids = np.flatnonzero(short)
+    ids = ids[np.argsort(-seg_counts[ids], kind="stable")]  # dài trước: các chuỗi còn chạy là một tiền tố
+    if len(ids):
+        result = _lockstep(slopes, residual, lo[ids], seg_counts[ids], params)
+        for dst, src in zip(out, result):
+            dst[ids] = src
+    return out
+
+
+def _lockstep(slopes, residual, lo, m, p):
+    """:meth:`ChangeDetector.update` over many short series at once.
+
+    Runs the same arithmetic in the same order (running sums restarted at
+    the same span boundaries), so the results match a detector per series
+    exactly.  ``m`` must be sorted in decreasing order.
+    """
+    k = len(lo)
+    prev = np.full(k, np.nan)
+    csq = np.zeros(k)
+    cnt = np.zeros(k, dtype=np.int64)
+    n_out = np.zeros(k, dtype=np.int64)
+    n_chg = np.zeros(k, dtype=np.int64)
+    # chế độ đang mở và tổng tích lũy của đoạn quét hiện tại
+    start = np.zeros(k, dtype=np.int64)
+    n0 = np.zeros(k, dtype=np.int64)
+    s0 = np.zeros(k)
+    csum = np.zeros(k)
+    cur_n = np.zeros(k, dtype=np.int64)
+    cur_s = np.zeros(k)
+    pos = np.zeros(k, dtype=np.int64)
+    span = np.full(k, MIN_SPAN, dtype=np.int64)
+    # mỗi phía: S đầu đoạn quét, tổng tích lũy, min tích lũy, số đoạn/tổng tại lần S = 0 gần nhất
+    side = {sign: [np.zeros(k), np.zeros(k), np.full(k, np.inf), np.zeros(k, dtype=np.int64), np.zeros(k)]
+            for sign in (1, -1)}
+    active = k
+    for j in range(int(m[0])):
+        while active and m[active - 1] <= j:
+            active -= 1
+        a = slice(0, active)
+        v = slopes[lo[:active] + j]
+
+        d = v - prev[a]
+        seen = ~np.isnan(d)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sigma = np.fmax(np.sqrt(csq[a] / (2.0 * cnt[a])), p.atol + p.rtol * np.abs(v))
+        if residual is not None and p.outlier is not None:
+            with np.errstate(invalid="ignore"):
+                n_out[a] += (residual[lo[:active] + j] > p.outlier * sigma) & (cnt[a] >= p.min_size)
+        csq[a] += np.where(seen, d * d, 0.0)
+        cnt[a] += seen
+        prev[a] = v
+
+        csum[a] += v
+        total = s0[a] + csum[a]
+        count = n0[a] + pos[a] + 1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = (v - (total - v) / (count - 1)) / (sigma * np.sqrt(1 + 1 / (count - 1)))
+        z = np.clip(np.nan_to_num(z, nan=0.0), -p.clip, p.clip)
+        z[count - 1 < p.min_size] = 0.0
+
+        S = {}
+        for sign, (S0, cx, low, zn, zs) in side.items():
+            cx[a] += sign * z - p.drift
+            D = S0[a] + cx[a]
+            low[a] = np.minimum(low[a], D)
+            S[sign] = D - np.minimum(0.0, low[a])
+            zero = S[sign] == 0
+            zn[a] = np.where(zero, count, zn[a])
+            zs[a] = np.where(zero, total, zs[a])
+        up, down = S[1] > p.threshold, S[-1] > p.threshold
+        alarm = up | down
+        cur_n[a], cur_s[a] = count, total
+        pos[a] += 1
+
+        if alarm.any():
+            hit = np.flatnonzero(alarm)
+            use_up = up[hit] & ~(down[hit] & (S[-1][hit] > S[1][hit]))
+            zn = np.where(use_up, side[1][3][hit], side[-1][3][hit])
+            zs = np.where(use_up, side[1][4][hit], side[-1][4][hit])
+            n_now, s_now = count[hit], total[hit]
+            closed = zn > 0
+            n_chg[hit] += closed
+            start[hit] += np.where(closed, zn, 0)
+            n_new = np.where(closed, n_now - zn, n_now)
+            s_new = np.where(closed, s_now - zs, s_now)
+            cur_n[hit], cur_s[hit] = n_new, s_new
+            span[hit] = MIN_SPAN
+            _rebase(hit, n_new, s_new, np.zeros(len(hit)), n0, s0, csum, pos, side)
+            for sign in side:
+                side[sign][3][hit], side[sign][4][hit] = n_new, s_new
+
+        # đoạn quét kết thúc không có cảnh báo: bắt đầu đoạn mới dài gấp đôi
+        full = np.flatnonzero(~alarm & (pos[a] == span[a]))
+        if len(full):
+            span[full] *= 2
+            for sign in side:
+                side[sign][0][full] = S[sign][full]
+            _rebase(full, count[full], total[full], None, n0, s0, csum, pos, side)
+
+    with np.errstate(invalid="ignore"):
+        rate = np.where(cur_n > 0, cur_s / np.maximum(cur_n, 1), np.nan)
+    return n_chg, rate, start, n_out
+
+
+def _rebase(rows, n, total, S, n0, s0, csum, pos, side):
+    """Start a new scan span for ``rows`` from a regime of ``n`` segments summing to ``total``."""
+    n0[rows], s0[rows] = n, total
+    csum[rows] = 0.0
+    pos[rows] = 0
+    for S0, cx, low, _, _ in side.values():
+        if S is not None:
+            S0[rows] = S
+        cx[rows] = 0.0
+        low[rows] = np.inf
@@ -0,0 +1,183 @@
+"""Headless command line entry point (``python -m mvt_analyzer``).
+
+Runs the same analysis as the Streamlit app without importing streamlit;
+matplotlib is only imported when a chart is requested.
+
+    python -m mvt_analyzer doanh_thu.csv -o mvt.parquet
+    python -m mvt_analyzer sales.parquet --entity store -o mvt.csv --summary stores.json
+    python -m mvt_analyzer history.csv -o mvt.parquet --save-dataset history.mvtds
+    python -m mvt_analyzer history.mvtds -o mvt.parquet
+"""
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from .changepoint import segment_regimes
+from .dataset import is_dataset, open_dataset, save_dataset
+from .derivatives import DEFAULT_WINDOW, ESTIMATORS
+from .engine import SOLVERS, analyze, classify_slopes
+from .ingest import PERIOD_COL, VALUE_COL, read_table, sanitize_frame, table_format
+from .metrics import Metrics, stage
+from .timeaxis import UNIT_DAYS, resolve_time_axis
+
+FORMATS = ("csv", "parquet", "json")
+
+
+def build_parser():
+    p = argparse.ArgumentParser(
+        prog="python -m mvt_analyzer",
+        description="Phân tích MVT (slope, đạo hàm xấp xỉ, điểm c) cho file CSV/Parquet/Arrow.",
+    )
+    p.add_argument(
+        "input",
+        help="file CSV, Parquet hoặc Arrow/Feather có cột 'Kỳ' và 'Giá trị', hoặc thư mục do --save-dataset tạo",
+    )
+    p.add_argument("-o", "--output", required=True, help="file kết quả (bảng MVT theo đoạn); '-' = stdout")
+    p.add_argument("-f", "--format", choices=FORMATS, help="định dạng kết quả (mặc định: theo đuôi file, hoặc csv)")
+    p.add_argument("--summary", help="ghi tóm tắt (avg_slope, nhận xét, thay đổi tốc độ) ra file; đuôi quyết định định dạng")
+    p.add_argument("--entity", help="cột thực thể cho dữ liệu dạng dài (nhiều chuỗi)")
+    p.add_argument("--time-axis", choices=["auto", *UNIT_DAYS], help="dùng thời gian thực từ cột 'Kỳ'")
+    p.add_argument("--solver", choices=SOLVERS, default="linear", help="cách tìm điểm c")
+    p.add_argument("--derivative", choices=ESTIMATORS, default="central", help="cách ước lượng đạo hàm f'")
+    p.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="độ rộng cửa sổ (lẻ) cho --derivative savgol/local")
+    p.add_argument("--workers", type=int, help="số tiến trình cho --entity (mặc định: số CPU)")
+    p.add_argument("--chunksize", type=int, help="đọc CSV theo từng phần với số dòng này")
+    p.add_argument("--chart", help="lưu biểu đồ PNG (chỉ cho một chuỗi)")
+    p.add_argument("--save-dataset", help="lưu dữ liệu đã làm sạch vào thư mục nhị phân (mở lại nhanh, map vào bộ nhớ)")
+    p.add_argument("--metrics", help="ghi thời gian/số dòng từng bước vào file JSON-lines (nối thêm)")
+    return p
+
+
+def output_format(path, fmt=None):
+    if fmt:
+        return fmt
+    lower = str(path).lower()
+    if lower.endswith((".parquet", ".pq")):
+        return "parquet"
+    if lower.endswith(".json"):
+        return "json"
+    return "csv"
+
+
+def write_frame(df, path, fmt=None):
+    """Write ``df`` as CSV, Parquet or JSON records ('-' = stdout)."""
+    fmt = output_format(path, fmt)
+    target = sys.stdout if path == "-" else path
+    if fmt == "parquet":
+        if path == "-":
+            raise ValueError("Parquet output needs a file path")
+        df.to_parquet(path, index=False)
+    elif fmt == "json":
+        df.to_json(target, orient="records", force_ascii=False, indent=None)
+    else:
+        df.to_csv(target, index=False)
+
+
+def run_single(args):
+    if is_dataset(args.input):
+        dataset = open_dataset(args.input)
+        if len(dataset) < 2:
+            raise ValueError("Cần ít nhất 2 kỳ để phân tích.")
+        labels, y, dropped = dataset.labels, dataset.values, dataset.dropped
+        t = dataset.time_axis(args.time_axis)
+        result = analyze(labels, y, t, args.solver, args.derivative, args.window)
+    elif args.chunksize and table_format(args.input) == "csv":
+        from .stream import analyze_csv_stream
+
+        result = analyze_csv_stream(args.input, args.chunksize, args.time_axis, args.solver)
+        labels, y = result["labels"], result["values"]
+        dropped = result["dropped"].count
+        t = result["t"] if args.time_axis else None
+    else:
+        df, dropped = sanitize_frame(read_table(args.input, [PERIOD_COL, VALUE_COL]))
+        if len(df) < 2:
+            raise ValueError("Cần ít nhất 2 kỳ để phân tích.")
+        labels = df[PERIOD_COL].to_numpy(dtype=object)
+        y = df[VALUE_COL].to_numpy(dtype=float)
+        t = resolve_time_axis(labels, args.time_axis)
+        result = analyze(labels, y, t, args.solver, args.derivative, args.window)
+    if args.save_dataset:
+        save_dataset(args.save_dataset, labels, y, dropped)
+
+    table = result["mvt"].to_frame()
+    table["comment"] = result["mvt"]["comment"]
+    changes = result["changes"]
+    regimes = changes["regimes"]
+    table["regime"] = segment_regimes(regimes, len(table))
+    table["regime_rate"] = regimes["avg_slope"].to_numpy()[table["regime"].to_numpy()]
+    table["residual_outlier"] = np.isin(np.arange(len(table)), changes["outliers"])
+    current = regimes.iloc[-1]
+    summary = {
+        "n_periods": int(len(y)),
+        "dropped_rows": int(dropped),
+        "avg_slope": result["avg_slope"],
+        "overall": result["overall"],
+        "n_changes": int(len(changes["changes"])),
+        "current_rate": float(current["avg_slope"]),
+        "current_since": labels[int(current["start"])],
+        "residual_outliers": int(len(changes["outliers"])),
+    }
+    if args.chart:
+        from .plotting import plot_mvt  # matplotlib chỉ nạp khi cần
+
+        with stage("chart", rows=len(y)):
+            plot_mvt(labels, y, table, t).savefig(args.chart, bbox_inches="tight")
+    return table, summary
+
+
+def run_batch(args):
+    from .batch import analyze_batch_file
+
+    table, summary = analyze_batch_file(
+        args.input, args.entity, time_axis=args.time_axis,
+        solver=args.solver, workers=args.workers,
+    )
+    table["comment"] = classify_slopes(table["slope"].to_numpy())
+    return table, summary
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.entity and args.chart:
+        build_parser().error("--chart chỉ dùng cho một chuỗi (không dùng với --entity)")
+    if args.entity and args.save_dataset:
+        build_parser().error("--save-dataset chỉ dùng cho một chuỗi (không dùng với --entity)")
+    if args.derivative != "central" and (args.entity or args.chunksize):
+        build_parser().error("--derivative khác central chưa dùng được với --entity/--chunksize")
+    metrics = Metrics()
+    try:
+        with metrics:
+            table, summary = run_batch(args) if args.entity else run_single(args)
+            with stage("write", rows=len(table)):
+                write_frame(table, args.output, args.format)
+    except (ValueError, OSError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    if args.metrics:
+        metrics.write(
+            args.metrics, input=args.input, solver=args.solver,
+            derivative=args.derivative, time_axis=args.time_axis,
+        )
+
+    if args.entity:
+        if args.summary:
+            write_frame(summary, args.summary)
+        verdicts = summary["overall"].value_counts().to_dict()
+        shifted = int((summary["n_changes"] > 0).sum())
+        print(json.dumps({"entities": len(summary), "verdicts": verdicts, "with_rate_changes": shifted},
+                         ensure_ascii=False), file=sys.stderr)
+    else:
+        if args.summary:
+            import pandas as pd
+
+            write_frame(pd.DataFrame([summary]), args.summary)
+        print(json.dumps(summary, ensure_ascii=False, default=_json_default), file=sys.stderr)
+    return 0
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(type(value).__name__)
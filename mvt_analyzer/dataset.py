@@ -0,0 +1,217 @@
+"""Binary, memory-mapped cache of a sanitized (Kỳ, Giá trị) series.
+
+A dataset is a directory of plain ``.npy`` files written once after
+parsing and sanitizing:
+
+- ``values.npy``: "Giá trị" as float64;
+- ``label_offsets.npy`` / ``label_bytes.npy``: "Kỳ" as UTF-8 bytes plus
+  int64 start offsets (n + 1 of them);
+- ``meta.json``: row count and number of dropped rows;
+- ``t_<axis>.npy``: resolved time axes, added the first time each is used.
+
+:func:`open_dataset` maps the files read-only (``np.load(mmap_mode="r")``),
+so opening costs a few system calls whatever the length and the pages are
+shared by every process that opens the same dataset.  Labels stay encoded
+in the mapping; :class:`Labels` decodes only the rows that are indexed.
+"""
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from .ingest import PERIOD_COL, VALUE_COL
+from .metrics import stage
+from .timeaxis import resolve_time_axis
+
+SUFFIX = ".mvtds"
+FORMAT_VERSION = 1
+
+
+class Labels:
+    """Read-only "Kỳ" column stored as UTF-8 bytes plus offsets.
+
+    Slices and integer/boolean index arrays return object arrays of just
+    those labels; ``np.asarray(labels)`` decodes all of them.
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_strings(cls, labels):
+        encoded = [str(s).encode("utf-8") for s in labels]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _decode(self, idx):
+        out = np.empty(len(idx), dtype=object)
+        raw = self.data
+        starts, ends = self.offsets[idx].tolist(), self.offsets[idx + 1].tolist()
+        for j, (s, e) in enumerate(zip(starts, ends)):
+            out[j] = raw[s:e].tobytes().decode("utf-8")
+        return out
+
+    def __getitem__(self, key):
+        n = len(self)
+        if isinstance(key, slice):
+            return self._decode(np.arange(*key.indices(n)))
+        if np.ndim(key) == 0:
+            i = range(n)[int(key)]
+            return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+        idx = np.asarray(key)
+        if idx.dtype == bool:
+            idx = np.flatnonzero(idx)
+        idx = np.where(idx < 0, idx + n, idx)
+        if len(idx) and (idx.min() < 0 or idx.max() >= n):
+            raise IndexError("label index out of range")
+        return self._decode(idx)
+
+    def __iter__(self):
+        step = 1 << 16
+        for lo in range(0, len(self), step):
+            yield from self[lo:lo + step]
+
+    def __array__(self, dtype=None, copy=None):
+        out = self[:]
+        return out if dtype is None else out.astype(dtype)
+
+
+def as_labels(labels):
+    """``labels`` as something sliceable into object arrays, without copying :class:`Labels`."""
+    return labels if isinstance(labels, Labels) else np.asarray(labels, dtype=object)
+
+
+class Dataset:
+    """An opened dataset: ``labels`` (:class:`Labels`), ``values`` and ``dropped``."""
+
+    def __init__(self, path, labels, values, dropped=0):
+        self.path = path
+        self.labels = labels
+        self.values = values
+        self.dropped = dropped
+
+    def __len__(self):
+        return len(self.values)
+
+    def time_axis(self, time_axis=None):
+        """:func:`resolve_time_axis` for this series, cached next to the data."""
+        if time_axis is None:
+            return None
+        name = os.path.join(self.path, f"t_{time_axis}.npy")
+        if os.path.exists(name):
+            return np.asarray(np.load(name, mmap_mode="r"))
+        t = resolve_time_axis(self.labels, time_axis)
+        _save_npy(self.path, f"t_{time_axis}.npy", t)
+        return t
+
+
+def _save_npy(directory, name, array):
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as fh:
+        np.save(fh, array)
+    os.replace(tmp, os.path.join(directory, name))
+
+
+def save_dataset(path, labels, values, dropped=0):
+    """Write a sanitized series to the dataset directory ``path``.
+
+    The files are written to a temporary directory and renamed into place,
+    so concurrent readers see either no dataset or a complete one.
+    """
+    path = os.fspath(path)
+    values = np.asarray(values, dtype=float)
+    if len(labels) != len(values):
+        raise ValueError("labels and values must have the same length")
+    lab = labels if isinstance(labels, Labels) else Labels.from_strings(labels)
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    with stage("save_dataset", rows=len(values)):
+        tmp = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+        try:
+            np.save(os.path.join(tmp, "values.npy"), values)
+            np.save(os.path.join(tmp, "label_offsets.npy"), lab.offsets)
+            np.save(os.path.join(tmp, "label_bytes.npy"), lab.data)
+            meta = {"version": FORMAT_VERSION, "rows": len(values), "dropped": int(dropped),
+                    "columns": [PERIOD_COL, VALUE_COL]}
+            with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as fh:
+                json.dump(meta, fh, ensure_ascii=False)
+            try:
+                os.rename(tmp, path)
+            except OSError:
+                if not is_dataset(path):
+                    raise
+                shutil.rmtree(tmp)  # tiến trình khác đã ghi cùng dữ liệu trước
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+    return open_dataset(path)
+
+
+def is_dataset(path):
+    return os.path.isfile(os.path.join(os.fspath(path), "meta.json"))
+
+
+def open_dataset(path):
+    """Memory-map a dataset written by :func:`save_dataset`."""
+    path = os.fspath(path)
+    if not is_dataset(path):
+        raise ValueError(f"{path} is not an MVT dataset directory")
+    with stage("open_dataset") as rec:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as fh:
+            meta = json.load(fh)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"unsupported dataset version {meta.get('version')!r} in {path}")
+        load = lambda name: np.asarray(np.load(os.path.join(path, name), mmap_mode="r"))
+        labels = Labels(load("label_offsets.npy"), load("label_bytes.npy"))
+        values = load("values.npy")
+        rec["rows"] = len(values)
+    return Dataset(path, labels, values, meta["dropped"])
+
+
+class DatasetStore:
+    """Directory of datasets keyed by content hash, pruned to ``max_entries``.
+
+    ``get(key)`` opens ``<key>.mvtds`` (or returns None) and ``put`` saves a
+    series under a key.  Several processes may share one directory.
+    """
+
+    def __init__(self, directory, max_entries=32):
+        self.directory = os.fspath(directory)
+        self.max_entries = max_entries
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key):
+        path = self.path(key)
+        if not is_dataset(path):
+            return None
+        os.utime(path)  # đánh dấu vừa dùng, để không bị dọn trước
+        return open_dataset(path)
+
+    def put(self, key, labels, values, dropped=0):
+        dataset = save_dataset(self.path(key), labels, values, dropped)
+        self.prune()
+        return dataset
+
+    def prune(self):
+        """Remove the least recently used datasets beyond ``max_entries``."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(SUFFIX):
+                full = os.path.join(self.directory, name)
+                try:
+                    entries.append((os.path.getmtime(full), full))
+                except OSError:
+                    continue
+        entries.sort(reverse=True)
+        for _, full in entries[self.max_entries:]:
+            # trên POSIX, tiến trình đang map file vẫn đọc được sau khi xóa
+            shutil.rmtree(full, ignore_errors=True)
@@ -0,0 +1,330 @@
+"""Vectorized Mean Value Theorem analysis engine.
+
+Everything here works on whole NumPy arrays: the slope between consecutive
+periods, the forward/backward/central derivative estimates and the per
+segment search for the MVT point c.  The results match the original
+row-by-row loop in app.py, including its NaN and equal-derivative branches.
+
+Every function takes an optional time axis ``t``; without it each period
+counts as one unit (the original ``t = np.arange(n)``).
+
+``estimate_derivatives`` defaults to the original differences; the
+smoothed estimators of :mod:`mvt_analyzer.derivatives` can be chosen
+with ``derivative=`` for noisy, high-frequency series.
+
+Two solvers locate c: ``"linear"`` interpolates between the endpoint
+derivative estimates (the original method) and ``"spline"`` solves
+f'(c) = slope exactly on a cubic spline (see :mod:`mvt_analyzer.spline`).
+
+:func:`analyze` also splits the slope series into regimes and flags
+residual outliers with :mod:`mvt_analyzer.changepoint`.
+"""
+import numpy as np
+import pandas as pd
+
+from . import changepoint, derivatives, spline
+from .dataset import as_labels
+from .metrics import stage
+from .result import (
+    METHOD_INTERP,
+    METHOD_LEFT,
+    METHOD_MIDPOINT,
+    METHOD_RIGHT,
+    METHOD_SPLINE,
+    METHOD_SPLINE_FLAT,
+    METHODS,
+    RECORD_COLUMNS,
+    SPLINE_COLUMNS,
+    MVTResult,
+    comment_text,
+    location_text,
+    segment_text,
+)
+from .timeaxis import check_increasing
+
+SOLVERS = ("linear", "spline")
+
+# nhận xét tổng thể theo dấu của slope trung bình
+VERDICTS = {
+    1: "✅ Doanh nghiệp đang tăng trưởng trung bình ổn định.",
+    -1: "⚠️ Doanh nghiệp có xu hướng suy giảm nhẹ trong giai đoạn này.",
+    0: "ℹ️ Doanh nghiệp ổn định, không thay đổi đáng kể.",
+}
+
+EQUAL_TOL = 1e-9
+
+
+def compute_slopes(y, t=None):
+    """Average rate of change between consecutive periods."""
+    y = np.asarray(y, dtype=float)
+    if t is None:
+        return np.diff(y)  # dt = 1 -> chỉ là diff
+    return np.diff(y) / np.diff(np.asarray(t, dtype=float))
+
+
+def estimate_derivatives(y, t=None, method="central", window=derivatives.DEFAULT_WINDOW):
+    """Forward/backward differences at the ends, central difference inside.
+
+    ``method`` picks another estimator from
+    :mod:`mvt_analyzer.derivatives`; ``window`` (odd, in periods) applies
+    to ``"savgol"`` and ``"local"``.
+    """
+    if method == "stencil":
+        return derivatives.stencil_derivative(y, t)
+    if method == "savgol":
+        return derivatives.savgol_derivative(y, t, window)
+    if method == "local":
+        return derivatives.local_regression_derivative(y, t, window)
+    if method != "central":
+        raise ValueError(f"unknown derivative estimator {method!r}; expected one of {derivatives.ESTIMATORS}")
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n < 2:
+        raise ValueError("need at least 2 points to estimate derivatives")
+    if t is None:
+        t = np.arange(n, dtype=float)
+    t = np.asarray(t, dtype=float)
+    deriv = np.empty(n)
+    if n == 2:
+        # trivial: forward/backward same
+        deriv[:] = (y[1] - y[0]) / (t[1] - t[0])
+        return deriv
+    deriv[0] = (y[1] - y[0]) / (t[1] - t[0])  # forward diff
+    deriv[-1] = (y[-1] - y[-2]) / (t[-1] - t[-2])  # backward diff
+    deriv[1:-1] = (y[2:] - y[:-2]) / (t[2:] - t[:-2])  # central difference
+    return deriv
+
+
+def locate_mvt_points(slopes, deriv):
+    """Find c for every segment at once.
+
+    Returns ``(bracket, c_frac, method_code)``; ``c_frac`` is the position
+    of c within its segment (0 at a, 1 at b), whatever the segment's real
+    length (f' is interpolated linearly over the segment either way).  The
+    period index is ``i + c_frac``; it is only formed for display, so a
+    large index never costs the fraction its precision.
+    """
+    slopes = np.asarray(slopes, dtype=float)
+    deriv = np.asarray(deriv, dtype=float)
+    da, db = deriv[:-1], deriv[1:]
+
+    # B3: slope nằm giữa deriv_a và deriv_b? (NaN -> False như bản gốc)
+    bracket = _bracket(slopes, da, db)
+
+    interp = bracket & (db != da)
+    midpoint = bracket & (db == da) & (np.abs(da - slopes) < EQUAL_TOL)
+    fallback = ~(interp | midpoint)
+    left = fallback & (np.abs(da - slopes) <= np.abs(db - slopes))
+
+    method = np.full(len(slopes), METHOD_RIGHT, dtype=np.int8)
+    method[left] = METHOD_LEFT
+    method[midpoint] = METHOD_MIDPOINT
+    method[interp] = METHOD_INTERP
+
+    frac = np.where(method == METHOD_RIGHT, 1.0, 0.0)
+    frac[midpoint] = 0.5
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frac[interp] = (slopes[interp] - da[interp]) / (db[interp] - da[interp])
+    return bracket, frac, method
+
+
+def _bracket(slopes, da, db):
+    return (np.minimum(da, db) <= slopes) & (slopes <= np.maximum(da, db))
+
+
+def locate_mvt_points_spline(y, slopes, deriv, t=None):
+    """Spline counterpart of :func:`locate_mvt_points`.
+
+    Returns ``(bracket, c_frac, method_code, y_c, deriv_c, extra)`` where
+    ``extra`` holds ``n_roots``, ``c_frac_2`` and the second-root
+    ``y_c_2``/``residual_2``.  Segments without a finite root fall back to
+    the linear method.
+    """
+    slopes = np.asarray(slopes, dtype=float)
+    deriv = np.asarray(deriv, dtype=float)
+    da, db = deriv[:-1], deriv[1:]
+    sol = spline.solve_mvt(y, deriv, t)
+    s1, s2 = sol["s1"], sol["s2"]
+
+    method = np.where(sol["flat"], METHOD_SPLINE_FLAT, METHOD_SPLINE).astype(np.int8)
+    y_c, deriv_c = spline.evaluate(sol["coef"], s1)
+    y_c2, deriv_c2 = spline.evaluate(sol["coef"], s2)
+
+    missing = sol["n_roots"] == 0
+    if missing.any():
+        _, frac, m_lin = locate_mvt_points(slopes, deriv)
+        s1 = np.where(missing, frac, s1)
+        method = np.where(missing, m_lin, method)
+        y = np.asarray(y, dtype=float)
+        y_c = np.where(missing, y[:-1] + frac * np.diff(y), y_c)
+        deriv_c = np.where(missing, da + frac * (db - da), deriv_c)
+
+    extra = {
+        "n_roots": sol["n_roots"],
+        "c_frac_2": s2,
+        "y_c_2": y_c2,
+        "residual_2": np.abs(deriv_c2 - slopes),
+    }
+    return _bracket(slopes, da, db), s1, method, y_c, deriv_c, extra
+
+
+def mvt_columns(y, slopes=None, deriv=None, start=0, t=None, solver="linear"):
+    """Numeric per-segment MVT columns (no labels or display text).
+
+    Keys: ``slope``, ``deriv_a``, ``deriv_b``, ``bracket``, ``c_frac``,
+    ``c_pos``, ``c_time``, ``y_c``, ``deriv_c``, ``residual``, ``method``
+    (an index into ``METHODS``) and, for the spline solver,
+    ``SPLINE_COLUMNS`` plus ``c_frac_2``.  ``c_frac`` is the position of c
+    within its segment and everything else is computed from it;
+    ``c_pos = start + i + c_frac`` is there for display.  ``slopes``/
+    ``deriv`` are computed when omitted; ``start`` is the index of the
+    first segment when working on a slice of a longer series.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"unknown solver {solver!r}; expected one of {SOLVERS}")
+    y = np.asarray(y, dtype=float)
+    if slopes is None:
+        slopes = compute_slopes(y, t)
+    if deriv is None:
+        deriv = estimate_derivatives(y, t)
+    slopes = np.asarray(slopes, dtype=float)
+    deriv = np.asarray(deriv, dtype=float)
+    if t is not None:
+        t = np.asarray(t, dtype=float)
+
+    idx = np.arange(start, start + len(slopes))
+    da, db = deriv[:-1], deriv[1:]
+
+    extra = {}
+    if solver == "spline":
+        bracket, frac, method, y_c, deriv_c, extra = locate_mvt_points_spline(y, slopes, deriv, t)
+        extra["c_pos_2"] = idx + extra["c_frac_2"]
+        extra["c_time_2"] = _to_time(extra["c_frac_2"], idx, t)
+    else:
+        bracket, frac, method = locate_mvt_points(slopes, deriv)
+        y_c = y[:-1] + frac * (y[1:] - y[:-1])
+        deriv_c = da + frac * (db - da)
+
+    return {
+        "slope": slopes,
+        "deriv_a": da,
+        "deriv_b": db,
+        "bracket": bracket,
+        "c_frac": frac,
+        "c_pos": idx + frac,
+        "c_time": _to_time(frac, idx, t),
+        "y_c": y_c,
+        "deriv_c": deriv_c,
+        "residual": np.abs(deriv_c - slopes),
+        "method": method,
+        **({"c_frac_2": extra["c_frac_2"]} if extra else {}),
+        **{col: extra[col] for col in SPLINE_COLUMNS if col in extra},
+    }
+
+
+def mvt_records(labels, y, slopes=None, deriv=None, start=0, t=None, solver="linear"):
+    """Columnar version of the per-segment ``records`` table.
+
+    Returns a dict of arrays keyed like the old ``records`` dicts, one
+    element per segment: the :func:`mvt_columns` output (with ``method``
+    as text) plus the label and display-text columns.
+    """
+    y = np.asarray(y, dtype=float)
+    labels = np.asarray(labels, dtype=object)
+    cols = mvt_columns(y, slopes, deriv, start, t, solver)
+    a_label, b_label = labels[:-1], labels[1:]
+    c_loc_text = location_text(a_label, b_label, cols["c_pos"], cols["c_frac"])
+
+    return {
+        "Segment": segment_text(a_label, b_label),
+        "a_label": a_label,
+        "b_label": b_label,
+        "a_val": y[:-1],
+        "b_val": y[1:],
+        "slope": cols["slope"],
+        "deriv_a": cols["deriv_a"],
+        "deriv_b": cols["deriv_b"],
+        "bracket": cols["bracket"],
+        "c_pos": cols["c_pos"],
+        "c_time": cols["c_time"],
+        "c_loc_text": c_loc_text,
+        "y_c": cols["y_c"],
+        "deriv_c": cols["deriv_c"],
+        "residual": cols["residual"],
+        "method": METHODS[cols["method"]],
+        **{col: cols[col] for col in SPLINE_COLUMNS if col in cols},
+    }
+
+
+def _to_time(frac, idx, t):
+    """Map positions within each segment onto the ``t`` axis (or period indices)."""
+    if t is None:
+        return idx + frac
+    return t[:-1] + frac * np.diff(t)
+
+
+def mvt_table(labels, y, slopes=None, deriv=None, t=None, solver="linear"):
+    """``mvt_records`` as a DataFrame."""
+    return pd.DataFrame(mvt_records(labels, y, slopes, deriv, t=t, solver=solver))
+
+
+def mvt_result(labels, y, slopes=None, deriv=None, t=None, solver="linear"):
+    """The MVT table as a compact :class:`MVTResult` (text built lazily)."""
+    y = np.asarray(y, dtype=float)
+    if deriv is None:
+        deriv = estimate_derivatives(y, t)
+    deriv = np.asarray(deriv, dtype=float)
+    t = None if t is None else np.asarray(t, dtype=float)
+    cols = mvt_columns(y, slopes, deriv, t=t, solver=solver)
+    return MVTResult.from_columns(as_labels(labels), y, deriv, cols, t)
+
+
+def classify_slopes(slopes):
+    """Tăng trưởng / Suy giảm / Ổn định comment for each slope.
+
+    Builds one string object per slope; :class:`MVTResult` derives its
+    ``comment`` column on access instead of keeping these.
+    """
+    return comment_text(slopes)
+
+
+def overall_verdict(avg_slope):
+    """Qualitative summary of the whole series from the mean slope."""
+    if avg_slope > 0:
+        return VERDICTS[1]
+    elif avg_slope < 0:
+        return VERDICTS[-1]
+    return VERDICTS[0]
+
+
+def analyze(labels, y, t=None, solver="linear", derivative="central", window=derivatives.DEFAULT_WINDOW):
+    """Run the full pipeline once and return every intermediate result.
+
+    ``avg_slope`` is the mean of the per-segment slopes, as before, also
+    when segments have different lengths.  ``derivative`` and ``window``
+    are passed to :func:`estimate_derivatives`.  ``changes`` holds the
+    regimes, shifts and residual outliers of
+    :func:`mvt_analyzer.changepoint.detect_changes`.
+    """
+    y = np.asarray(y, dtype=float)
+    if t is not None:
+        t = check_increasing(t)
+    n = len(y)
+    with stage("slope", rows=n):
+        slopes = compute_slopes(y, t)
+    with stage("derivative", rows=n):
+        deriv = estimate_derivatives(y, t, derivative, window)
+    with stage("mvt_table", rows=n - 1):
+        result = mvt_result(labels, y, slopes, deriv, t, solver)
+    with stage("changepoints", rows=n - 1):
+        changes = changepoint.detect_changes(slopes, result["residual"])
+    avg_slope = float(np.mean(slopes))
+    return {
+        "t": np.arange(n, dtype=float) if t is None else t,
+        "slopes": slopes,
+        "deriv": deriv,
+        "mvt": result,
+        "changes": changes,
+        "avg_slope": avg_slope,
+        "overall": overall_verdict(avg_slope),
+    }
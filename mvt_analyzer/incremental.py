@@ -0,0 +1,213 @@
+"""Incremental MVT analysis for series that grow one period at a time.
+
+Appending a point adds one slope, turns the old last derivative from a
+backward into a central difference, adds a new backward difference, and
+so touches only the last two MVT segments.  :class:`IncrementalAnalysis`
+recomputes exactly those rows (amortised O(1) per appended point) and
+keeps a running slope sum for ``avg_slope`` and the overall verdict.
+State can be saved to and loaded from an ``.npz`` file between runs.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from .engine import METHODS, SOLVERS, estimate_derivatives, mvt_columns, overall_verdict
+from .timeaxis import resolve_time_axis, time_axis_style, time_unit
+
+_STATE_VERSION = 1
+
+
+class IncrementalAnalysis:
+    """MVT results for a growing series.
+
+    ``time_axis`` and ``solver`` are as in :func:`mvt_analyzer.analyze`;
+    with a time axis every appended label must parse to a time later than
+    the previous one, read in the style (``time_style``) of the first
+    labels added.
+    """
+
+    def __init__(self, time_axis=None, solver="linear"):
+        if solver not in SOLVERS:
+            raise ValueError(f"unknown solver {solver!r}; expected one of {SOLVERS}")
+        self.time_axis = time_axis
+        self.time_style = None
+        self.solver = solver
+        self.n = 0
+        self.slope_sum = 0.0
+        self._labels = np.empty(0, dtype=object)
+        self._y = np.empty(0)
+        self._t = np.empty(0)
+        self._deriv = np.empty(0)
+        self._seg = {}
+
+    # --- cập nhật ---
+
+    def append(self, label, value):
+        """Add one period; returns the ``range`` of MVT rows that changed."""
+        return self.extend([label], [value])
+
+    def extend(self, labels, values):
+        """Add several periods at once; returns the changed MVT rows.
+
+        The result is a ``range`` of segment indices; pass it to
+        :meth:`rows` for the corresponding part of the table.
+        """
+        labels = np.asarray(labels, dtype=object)
+        values = np.asarray(values, dtype=float)
+        if labels.shape != values.shape:
+            raise ValueError("labels and values must have the same length")
+        k = len(values)
+        if k == 0:
+            return range(0)
+        style = self.time_style
+        if self.time_axis is not None and style is None:
+            style = time_axis_style(labels, time_unit(self.time_axis))
+        t_new = resolve_time_axis(labels, self.time_axis, style)
+        if t_new is not None and self.n and not t_new[0] > self._t[self.n - 1]:
+            raise ValueError("Các 'Kỳ' phải tăng dần và không trùng nhau.")
+
+        n_old, n = self.n, self.n + k
+        self._reserve(n)
+        self.time_style = style
+        self._labels[n_old:n] = labels
+        self._y[n_old:n] = values
+        if t_new is not None:
+            self._t[n_old:n] = t_new
+        self.n = n
+        if n < 2:
+            return range(0)
+
+        y, t = self._y[:n], self._t_view()
+        # đạo hàm: điểm cuối cũ (backward -> central) và các điểm mới
+        lo = max(0, n_old - 2)
+        d = estimate_derivatives(y[lo:], None if t is None else t[lo:])
+        j0 = max(0, n_old - 1)
+        self._deriv[j0:n] = d[j0 - lo:]
+
+        # đoạn cuối cũ (deriv_b đổi) và các đoạn mới
+        s0 = max(0, n_old - 2)
+        n_seg_old = max(0, n_old - 1)
+        cols = mvt_columns(
+            y[s0:], None, self._deriv[s0:n], start=s0,
+            t=None if t is None else t[s0:], solver=self.solver,
+        )
+        self.slope_sum += float(cols["slope"][n_seg_old - s0:].sum())
+        for name, values in cols.items():
+            self._seg_column(name, values.dtype)[s0:n - 1] = values
+        return range(s0, n - 1)
+
+    # --- kết quả ---
+
+    @property
+    def avg_slope(self):
+        return self.slope_sum / (self.n - 1) if self.n >= 2 else float("nan")
+
+    @property
+    def overall(self):
+        return overall_verdict(self.avg_slope)
+
+    @property
+    def slopes(self):
+        return self._seg["slope"][:self.n - 1] if self.n >= 2 else np.empty(0)
+
+    @property
+    def deriv(self):
+        return self._deriv[:self.n]
+
+    def mvt_table(self):
+        """The full MVT table for the current series."""
+        return self.rows(range(max(self.n - 1, 0)))
+
+    def rows(self, rows):
+        """MVT table rows for a ``range`` of segments (e.g. from ``extend``)."""
+        rows = slice(rows.start, rows.stop)
+        idx = np.arange(self.n)[rows]
+        a_label, b_label = self._labels[idx], self._labels[idx + 1]
+        frame = {
+            "Segment": a_label + " → " + b_label,
+            "a_label": a_label,
+            "b_label": b_label,
+            "a_val": self._y[idx],
+            "b_val": self._y[idx + 1],
+        }
+        for name, values in self._seg.items():
+            frame[name] = METHODS[values[rows]] if name == "method" else values[rows]
+        return pd.DataFrame(frame, index=idx)
+
+    # --- bộ nhớ ---
+
+    def _t_view(self):
+        return None if self.time_axis is None else self._t[:self.n]
+
+    def _reserve(self, n):
+        cap = len(self._y)
+        if n <= cap:
+            return
+        cap = max(n, 2 * cap, 16)
+        self._labels = _grow(self._labels, cap)
+        self._y = _grow(self._y, cap)
+        self._t = _grow(self._t, cap)
+        self._deriv = _grow(self._deriv, cap)
+        self._seg = {name: _grow(values, cap) for name, values in self._seg.items()}
+
+    def _seg_column(self, name, dtype):
+        if name not in self._seg:
+            self._seg[name] = np.zeros(len(self._y), dtype=dtype)
+        return self._seg[name]
+
+    # --- lưu / nạp trạng thái ---
+
+    def save(self, path):
+        """Write the state to ``path`` (NumPy ``.npz``, no pickling)."""
+        n = self.n
+        meta = {
+            "version": _STATE_VERSION,
+            "time_axis": self.time_axis,
+            "time_style": self.time_style,
+            "solver": self.solver,
+            "slope_sum": self.slope_sum,
+        }
+        arrays = {
+            "meta": np.array(json.dumps(meta)),
+            "labels": self._labels[:n].astype(str),
+            "y": self._y[:n],
+            "t": self._t[:n],
+            "deriv": self._deriv[:n],
+        }
+        for name, values in self._seg.items():
+            arrays["seg_" + name] = values[:max(n - 1, 0)]
+        with open(path, "wb") as fh:
+            np.savez(fh, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Restore an analysis written by :meth:`save`."""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("version") != _STATE_VERSION:
+                raise ValueError(f"unsupported state version {meta.get('version')!r}")
+            self = cls(meta["time_axis"], meta["solver"])
+            n = len(data["y"])
+            self._reserve(n)
+            self.n = n
+            self.slope_sum = meta["slope_sum"]
+            self._labels[:n] = data["labels"].astype(object)
+            self.time_style = meta.get("time_style")
+            if self.time_axis is not None and self.time_style is None and n:
+                # trạng thái cũ chưa lưu cách đọc "Kỳ": suy ra từ các nhãn đã lưu
+                self.time_style = time_axis_style(self._labels[:n], time_unit(self.time_axis))
+            self._y[:n] = data["y"]
+            self._t[:n] = data["t"]
+            self._deriv[:n] = data["deriv"]
+            for key in data.files:
+                if key.startswith("seg_"):
+                    values = data[key]
+                    self._seg_column(key[4:], values.dtype)[:len(values)] = values
+        return self
+
+
+def _grow(arr, cap):
+    out = np.zeros(cap, dtype=arr.dtype) if arr.dtype != object else np.empty(cap, dtype=object)
+    out[:len(arr)] = arr
+    return out
@@ -0,0 +1,159 @@
+"""Loading and sanitizing (Kỳ, Giá trị) input tables."""
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from .metrics import stage
+
+PERIOD_COL = "Kỳ"
+VALUE_COL = "Giá trị"
+
+
+def sanitize_frame(df):
+    """Validate the two required columns and drop non-numeric values.
+
+    Returns ``(df, dropped)`` where ``dropped`` is the number of rows whose
+    "Giá trị" could not be parsed as a number.  Raises ``ValueError`` when
+    a required column is missing.
+    """
+    if VALUE_COL not in df.columns or PERIOD_COL not in df.columns:
+        raise ValueError("CSV phải có cột 'Kỳ' và 'Giá trị'.")
+    with stage("sanitize", rows=len(df)):
+        df = df.copy()
+        df[PERIOD_COL] = df[PERIOD_COL].astype(str)
+        df[VALUE_COL] = pd.to_numeric(df[VALUE_COL], errors="coerce")
+        bad = df[VALUE_COL].isna()
+        dropped = int(bad.sum())
+        if dropped:
+            df = df[~bad].reset_index(drop=True)
+    return df, dropped
+
+
+def read_csv_bytes(data):
+    """Parse an uploaded CSV payload and sanitize it."""
+    with stage("csv_parse") as rec:
+        df = pd.read_csv(io.BytesIO(data))
+        rec["rows"] = len(df)
+    return sanitize_frame(df)
+
+
+class DroppedRows:
+    """Tally of rows whose "Giá trị" was not numeric.
+
+    Only the count and the first ``keep`` row numbers (0-based, data rows)
+    are retained, never the offending text itself.
+    """
+
+    def __init__(self, keep=20):
+        self.keep = keep
+        self.count = 0
+        self.rows = []
+
+    def add(self, positions):
+        self.count += len(positions)
+        room = self.keep - len(self.rows)
+        if room > 0:
+            self.rows.extend(int(p) for p in positions[:room])
+
+
+def iter_csv_chunks(source, chunksize=1_000_000, dropped=None):
+    """Yield ``(labels, values)`` array pairs from a CSV, one chunk at a time.
+
+    Only the two required columns are parsed.  "Kỳ" is read as ``str``;
+    "Giá trị" is left to the C parser so clean chunks arrive as float64
+    directly and only chunks containing junk take the ``to_numeric`` path.
+    Non-numeric rows are dropped and tallied in ``dropped``
+    (a :class:`DroppedRows`) when one is given.
+    """
+    try:
+        reader = pd.read_csv(
+            source,
+            usecols=[PERIOD_COL, VALUE_COL],
+            dtype={PERIOD_COL: str},
+            chunksize=chunksize,
+        )
+    except ValueError as exc:  # usecols không khớp header
+        raise ValueError("CSV phải có cột 'Kỳ' và 'Giá trị'.") from exc
+    row0 = 0
+    with reader:
+        while True:
+            with stage("csv_parse") as rec:
+                chunk = next(reader, None)
+                rec["rows"] = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                break
+            with stage("sanitize", rows=len(chunk)):
+                values = chunk[VALUE_COL]
+                if values.dtype.kind not in "fiu":
+                    values = pd.to_numeric(values, errors="coerce")
+                values = values.to_numpy(dtype=float)
+                labels = chunk[PERIOD_COL].astype(str).to_numpy(dtype=object)
+                bad = np.isnan(values)
+                if bad.any():
+                    if dropped is not None:
+                        dropped.add(row0 + np.flatnonzero(bad))
+                    keep = ~bad
+                    values, labels = values[keep], labels[keep]
+            row0 += len(chunk)
+            if len(values):
+                yield labels, values
+
+
+# đuôi file -> định dạng; Feather v2 chính là file Arrow IPC
+TABLE_FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "arrow",
+    ".arrow": "arrow",
+    ".ipc": "arrow",
+}
+
+
+def table_format(name):
+    """"csv", "parquet" or "arrow" from a file name (CSV when unknown)."""
+    return TABLE_FORMATS.get(os.path.splitext(str(name).lower())[1], "csv")
+
+
+def read_table(path, columns=None):
+    """Read a CSV, Parquet or Arrow/Feather file (by extension) into a DataFrame.
+
+    Columnar formats are read column-selectively and keep their binary
+    dtypes, so there is no text parsing.
+    """
+    path = str(path)
+    fmt = table_format(path)
+    with stage("read_file") as rec:
+        if fmt == "parquet":
+            df = pd.read_parquet(path, columns=columns)
+        elif fmt == "arrow":
+            df = pd.read_feather(path, columns=columns)
+        else:
+            df = pd.read_csv(path, usecols=columns)
+        rec["rows"] = len(df)
+    return df
+
+
+def read_table_bytes(data, fmt):
+    """Read the required columns of an in-memory Parquet or Arrow/Feather file."""
+    with stage("read_file") as rec:
+        columns = [PERIOD_COL, VALUE_COL]
+        if fmt == "parquet":
+            df = pd.read_parquet(io.BytesIO(data), columns=columns)
+        else:
+            df = pd.read_feather(io.BytesIO(data), columns=columns)
+        rec["rows"] = len(df)
+    return df
+
+
+def read_upload(data, fmt="csv"):
+    """Parse an uploaded payload in format ``fmt`` (see :func:`table_format`) and sanitize it."""
+    if fmt == "csv":
+        return read_csv_bytes(data)
+    try:
+        df = read_table_bytes(data, fmt)
+    except (KeyError, ValueError) as exc:  # thiếu cột
+        raise ValueError("File phải có cột 'Kỳ' và 'Giá trị'.") from exc
+    return sanitize_frame(df)
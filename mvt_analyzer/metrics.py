@@ -0,0 +1,153 @@
+"""Per-stage timing, allocation and row-count instrumentation.
+
+Library code marks its stages with :func:`stage`; that is a no-op unless
+a :class:`Metrics` collector is active in the current context, so the
+hooks cost one context-variable lookup when nobody is measuring.
+Collectors are per thread/context, so concurrent app sessions do not see
+each other's stages.
+
+    with Metrics(memory=True) as m:
+        result = analyze(labels, y)
+    m.log(source="upload")
+"""
+import contextvars
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("mvt_metrics", default=None)
+
+# tracemalloc dùng chung cả tiến trình: chỉ tắt khi collector cuối cùng (đã bật nó) thoát
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+
+def _start_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+class Metrics:
+    """Collects one record per stage run: seconds, peak bytes, rows.
+
+    With ``memory=True`` allocations are traced with ``tracemalloc``
+    and ``peak_bytes`` is the peak of traced memory above the level at
+    the start of the stage.  Tracing slows Python-heavy stages noticeably,
+    so it is off by default.  tracemalloc is process-wide: collectors
+    share it through a reference count, so it is started by the first
+    one and stopped only when the last one exits (and never if it was
+    already on).  With several threads measuring at once, a stage's peak
+    also includes the other threads' allocations, and the
+    ``tracemalloc.reset_peak()`` at the start of one stage resets the
+    peak of stages running elsewhere too, so theirs can come out low.
+    """
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.records = []
+        self.current = None  # bước đang chạy (để báo tiến độ)
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        if self.memory:
+            _start_tracing()
+        return self
+
+    def __exit__(self, *exc):
+        _current.reset(self._token)
+        if self.memory:
+            _stop_tracing()
+        return False
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        rec = {"stage": name, "seconds": None, "peak_bytes": None, "rows": rows}
+        tracing = self.memory and tracemalloc.is_tracing()
+        if tracing:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        outer, self.current = self.current, name
+        start = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            self.current = outer
+            rec["seconds"] = time.perf_counter() - start
+            if tracing:
+                rec["peak_bytes"] = max(0, tracemalloc.get_traced_memory()[1] - base)
+            self.records.append(rec)
+
+    @property
+    def total_seconds(self):
+        return sum(r["seconds"] for r in self.records)
+
+    def summary(self):
+        """One row per stage name (chunked stages are summed), in first-run order."""
+        columns = ["stage", "calls", "seconds", "peak_bytes", "rows"]
+        if not self.records:
+            return pd.DataFrame(columns=columns)
+        df = pd.DataFrame(self.records)
+        df["rows"] = pd.to_numeric(df["rows"]).fillna(0).astype(int)
+        df["peak_bytes"] = pd.to_numeric(df["peak_bytes"])
+        return df.groupby("stage", sort=False).agg(
+            calls=("seconds", "size"),
+            seconds=("seconds", "sum"),
+            peak_bytes=("peak_bytes", "max"),
+            rows=("rows", "sum"),
+        ).reset_index()[columns]
+
+    def to_json(self, **context):
+        """One JSON object (a single line) with ``context`` and every stage."""
+        payload = {"time": time.time(), **context, "total_seconds": self.total_seconds, "stages": self.records}
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+    def log(self, **context):
+        """Emit the record on the ``mvt_analyzer.metrics`` logger."""
+        logger.info(self.to_json(**context))
+
+    def write(self, path, **context):
+        """Append the record as one line to a JSON-lines metrics file."""
+        with open(path, "a", encoding="utf-8") as fh:
+            fh.write(self.to_json(**context) + "\n")
+
+
+@contextmanager
+def stage(name, rows=None):
+    """Record a stage on the active :class:`Metrics`, if any.
+
+    Yields a dict; set ``rec["rows"]`` inside the block when the row
+    count is only known afterwards.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield {}
+        return
+    with metrics.stage(name, rows) as rec:
+        yield rec
+
+
+def active():
+    """The :class:`Metrics` collecting in the current context, or None."""
+    return _current.get()
@@ -0,0 +1,141 @@
+"""Chart rendering for the MVT analysis (matplotlib, object-oriented API).
+
+Short series get the detailed chart: every secant, every tangent and a
+legend entry per segment.  Long series switch to a chart whose cost does
+not grow with n: the line is min/max-decimated, and only the ``top_k``
+segments with the steepest slopes get their secant, tangent and c label,
+each group drawn as a single collection.
+"""
+import io
+
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+from .dataset import as_labels
+
+COLORS = ["orange", "red", "green", "purple", "brown", "cyan"]
+
+# trên ngưỡng này dùng biểu đồ rút gọn
+DETAILED_MAX_POINTS = 60
+
+
+def plot_mvt(labels, y, table, t=None, max_points=2000, top_k=20):
+    """Series, secant lines, MVT points and their estimated tangents.
+
+    With a time axis ``t`` points sit at their real positions and the
+    tangent spans scale with each segment's length.  Series longer than
+    ``DETAILED_MAX_POINTS`` are drawn by :func:`plot_mvt_large`.
+    """
+    if len(y) > DETAILED_MAX_POINTS:
+        return plot_mvt_large(labels, y, table, t, max_points, top_k)
+    n = len(y)
+    fig = Figure(figsize=(10, 4))
+    ax = fig.subplots()
+    x = np.arange(n, dtype=float) if t is None else np.asarray(t, dtype=float)
+    dx = np.diff(x)
+    ax.plot(x, y, marker="o", linestyle="-", label="Giá trị thực tế")
+    # vẽ các secant line
+    for i in range(n-1):
+        ax.plot([x[i], x[i+1]], [y[i], y[i+1]], color="gray", linestyle="--", alpha=0.6)
+    # đánh dấu các điểm c và vẽ tiếp tuyến (tangent) ước lượng
+    c_pos = np.asarray(table["c_pos"], dtype=float)
+    plot_mvt_points = zip(table["c_time"], table["y_c"], table["slope"], range(n - 1))
+    for idx, (c, y_c, slope, seg_i) in enumerate(plot_mvt_points):
+        color = COLORS[idx % len(COLORS)]
+        ax.scatter(c, y_c, color=color, s=80, zorder=5)
+        # vẽ tiếp tuyến khoảng nhỏ quanh c
+        half = 0.8 * dx[seg_i]
+        x_line = np.linspace(max(x[0], c-half), min(x[-1], c+half), 50)
+        y_line = y_c + slope * (x_line - c)
+        ax.plot(x_line, y_line, color=color, linestyle='-', linewidth=1.5, alpha=0.8,
+                label=f"Tangent approx seg {seg_i} ({slope:+.2f})")
+        # chú thích
+        ax.text(c, y_c, f" c≈{c_pos[seg_i]:.2f}", fontsize=8, verticalalignment="bottom")
+
+    ax.set_xticks(x)
+    ax.set_xticklabels(labels, rotation=30)
+    ax.set_xlabel("Kỳ")
+    ax.set_ylabel("Giá trị")
+    ax.set_title("Dữ liệu & các điểm MVT ước lượng (với các tiếp tuyến ước lượng)")
+    ax.legend(loc='upper left', bbox_to_anchor=(1.02, 1))
+    return fig
+
+
+def plot_mvt_large(labels, y, table, t=None, max_points=2000, top_k=20):
+    """Chart for long series; render time is roughly independent of n."""
+    y = np.asarray(y, dtype=float)
+    labels = as_labels(labels)
+    n = len(y)
+    x = np.arange(n, dtype=float) if t is None else np.asarray(t, dtype=float)
+    fig = Figure(figsize=(10, 4))
+    ax = fig.subplots()
+
+    keep = minmax_downsample(y, max(max_points // 2, 1))
+    ax.plot(x[keep], y[keep], linestyle="-", linewidth=1, label="Giá trị thực tế")
+
+    slopes = np.asarray(table["slope"], dtype=float)
+    top = top_segments(slopes, top_k)
+    if len(top):
+        c = np.asarray(table["c_time"], dtype=float)[top]
+        y_c = np.asarray(table["y_c"], dtype=float)[top]
+        s = slopes[top]
+        half = 0.8 * (x[top + 1] - x[top])
+        secants = np.stack([np.column_stack([x[top], y[top]]),
+                            np.column_stack([x[top + 1], y[top + 1]])], axis=1)
+        tangents = np.stack([np.column_stack([c - half, y_c - s * half]),
+                             np.column_stack([c + half, y_c + s * half])], axis=1)
+        ax.add_collection(LineCollection(secants, colors="gray", linestyles="--", alpha=0.6))
+        ax.add_collection(LineCollection(tangents, colors="orange", linewidths=1.5, alpha=0.8,
+                                         label=f"Tiếp tuyến tại c (top {len(top)} |slope|)"))
+        ax.scatter(c, y_c, color="red", s=30, zorder=5)
+        c_pos = np.asarray(table["c_pos"], dtype=float)[top]
+        for xi, yi, ci in zip(c, y_c, c_pos):
+            ax.text(xi, yi, f" c≈{ci:.2f}", fontsize=7, verticalalignment="bottom")
+
+    ticks = np.unique(np.linspace(0, n - 1, min(n, 10)).round().astype(int))
+    ax.set_xticks(x[ticks])
+    ax.set_xticklabels(labels[ticks], rotation=30)
+    ax.set_xlabel("Kỳ")
+    ax.set_ylabel("Giá trị")
+    ax.set_title(f"Dữ liệu ({n} kỳ, hiển thị rút gọn) & các điểm MVT nổi bật")
+    ax.legend(loc='upper left', bbox_to_anchor=(1.02, 1))
+    return fig
+
+
+def minmax_downsample(y, n_buckets):
+    """Indices keeping the min and max of each of ``n_buckets`` buckets.
+
+    Preserves the visual envelope of the line (spikes survive) and always
+    includes the first and last point.  NaNs are ignored.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+    size = -(-n // n_buckets)
+    rows = -(-n // size)
+    padded = np.full(rows * size, np.nan)
+    padded[:n] = y
+    grid = padded.reshape(rows, size)
+    filled = ~np.isnan(grid).all(axis=1)
+    base = np.arange(rows)[filled] * size
+    lo = base + np.nanargmin(grid[filled], axis=1)
+    hi = base + np.nanargmax(grid[filled], axis=1)
+    return np.unique(np.concatenate([[0], lo, hi, [n - 1]]))
+
+
+def top_segments(slopes, k):
+    """Indices of the ``k`` segments with the largest |slope|, in order."""
+    mag = np.abs(np.asarray(slopes, dtype=float))
+    mag = np.where(np.isnan(mag), -np.inf, mag)
+    if k >= len(mag):
+        return np.arange(len(mag))
+    return np.sort(np.argpartition(-mag, k)[:k])
+
+
+def figure_to_png(fig, dpi=100):
+    """Render a figure to PNG bytes (cheap to cache and re-send)."""
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight")
+    return buf.getvalue()
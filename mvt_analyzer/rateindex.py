@@ -0,0 +1,122 @@
+"""Index over the derivative estimates for "when was f'(t) = v?" queries.
+
+Between two periods f' is taken as linear from ``deriv[i]`` to
+``deriv[i + 1]`` (the same model the linear MVT solver interpolates on),
+so segment i can reach rate v exactly when v lies in
+[min(deriv[i], deriv[i+1]), max(...)].  :class:`RateIndex` stores these
+intervals in a centred interval tree built once per series; a query
+walks one root-to-leaf path and binary-searches the sorted lists at each
+node, so it costs O(log n + k) for k matching segments.
+"""
+import numpy as np
+import pandas as pd
+
+from .dataset import as_labels
+
+LEAF_SIZE = 64
+
+
+class RateIndex:
+    """Interval tree over the per-segment ranges of ``deriv``.
+
+    ``t``, ``y`` and ``labels`` are optional and only used to fill the
+    time, value and label columns of :meth:`crossings`.
+    """
+
+    def __init__(self, deriv, t=None, y=None, labels=None, leaf_size=LEAF_SIZE):
+        d = np.asarray(deriv, dtype=float)
+        if len(d) < 2:
+            raise ValueError("Cần ít nhất 2 kỳ để phân tích.")
+        self.deriv = d
+        self.t = None if t is None else np.asarray(t, dtype=float)
+        self.y = None if y is None else np.asarray(y, dtype=float)
+        self.labels = None if labels is None else as_labels(labels)
+        self.leaf_size = leaf_size
+        self._lo = np.minimum(d[:-1], d[1:])
+        self._hi = np.maximum(d[:-1], d[1:])
+        ids = np.flatnonzero(~(np.isnan(self._lo) | np.isnan(self._hi)))
+        # mảng đã sắp xếp cho count(): O(log n) không cần duyệt cây
+        self._lo_sorted = np.sort(self._lo[ids])
+        self._hi_sorted = np.sort(self._hi[ids])
+        self._nodes = []
+        self._build(ids)
+
+    def __len__(self):
+        return len(self.deriv) - 1
+
+    def count(self, v):
+        """Number of segments whose derivative range contains ``v``."""
+        return int(np.searchsorted(self._lo_sorted, v, "right") - np.searchsorted(self._hi_sorted, v, "left"))
+
+    def segments(self, v):
+        """Sorted indices of the segments whose derivative range contains ``v``."""
+        v = float(v)
+        found = []
+        node = -1 if np.isnan(v) else 0
+        while node >= 0:
+            center, by_lo, lo, by_hi, neg_hi, left, right = self._nodes[node]
+            if center is None:
+                keep = (lo <= v) & (self._hi[by_lo] >= v)
+                found.append(by_lo[keep])
+                break
+            if v < center:
+                # các khoảng ở nút này đều có hi >= center > v
+                found.append(by_lo[:np.searchsorted(lo, v, "right")])
+                node = left
+            elif v > center:
+                found.append(by_hi[:np.searchsorted(neg_hi, -v, "right")])
+                node = right
+            else:
+                found.append(by_lo)
+                break
+        return np.sort(np.concatenate(found)) if found else np.empty(0, dtype=np.intp)
+
+    def crossings(self, v):
+        """Every point c with f'(c) = v, one row per matching segment.
+
+        ``c_pos`` is the fractional period index; on a segment where f' is
+        constant at v every point qualifies and the midpoint is reported
+        with ``flat`` set.  A crossing exactly at a period is reported once.
+        """
+        seg = self.segments(v)
+        d0, d1 = self.deriv[seg], self.deriv[seg + 1]
+        flat = d0 == d1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            frac = np.where(flat, 0.5, (v - d0) / (d1 - d0))
+        c = seg + frac
+        # điểm đúng tại một kỳ thuộc cả hai đoạn kề nhau
+        keep = np.ones(len(c), dtype=bool)
+        keep[1:] = c[1:] != c[:-1]
+        seg, frac, c, flat = seg[keep], frac[keep], c[keep], flat[keep]
+
+        frame = {"segment": seg}
+        if self.labels is not None:
+            frame["a_label"] = self.labels[seg]
+            frame["b_label"] = self.labels[seg + 1]
+        frame["c_pos"] = c
+        if self.t is not None:
+            frame["c_time"] = self.t[seg] + frac * (self.t[seg + 1] - self.t[seg])
+        if self.y is not None:
+            frame["y_c"] = self.y[seg] + frac * (self.y[seg + 1] - self.y[seg])
+        frame["flat"] = flat
+        return pd.DataFrame(frame)
+
+    def _build(self, ids):
+        node = len(self._nodes)
+        self._nodes.append(None)
+        lo, hi = self._lo[ids], self._hi[ids]
+        if len(ids) <= self.leaf_size:
+            order = np.argsort(lo, kind="stable")
+            self._nodes[node] = (None, ids[order], lo[order], None, None, -1, -1)
+            return node
+        # trung vị các đầu mút: mỗi nhánh con giữ nhiều nhất một nửa số khoảng
+        center = float(np.median(np.concatenate([lo, hi])))
+        here = (lo <= center) & (hi >= center)
+        by_lo = ids[here][np.argsort(lo[here], kind="stable")]
+        by_hi = ids[here][np.argsort(-hi[here], kind="stable")]
+        left = self._build(ids[hi < center])
+        right = self._build(ids[lo > center])
+        self._nodes[node] = (
+            center, by_lo, self._lo[by_lo], by_hi, -self._hi[by_hi], left, right,
+        )
+        return node
@@ -0,0 +1,206 @@
+"""Compact columnar container for per-segment MVT results.
+
+:class:`MVTResult` keeps only typed NumPy columns per segment (float64
+numbers, a bool ``bracket`` and an int8 ``method`` code) and shares the
+series arrays (``labels``, ``y``, ``deriv``, ``t``) instead of copying
+them into every row: segment i is simply periods ``start + i`` and
+``start + i + 1``.  Label pairs, ``Segment``/``c_loc_text``/``comment`` strings and
+the method text are built only when a column is asked for, and only for
+the rows of the (possibly sliced) view.  Slicing returns views; exports
+hand the same buffers to pandas/Arrow where they can.
+"""
+import numpy as np
+import pandas as pd
+
+# B4: cách chọn c cho mỗi đoạn (mã số -> mô tả)
+METHOD_INTERP = 0
+METHOD_MIDPOINT = 1
+METHOD_LEFT = 2
+METHOD_RIGHT = 3
+METHOD_SPLINE = 4
+METHOD_SPLINE_FLAT = 5
+METHODS = np.array([
+    "internal linear interpolation between derivative estimates",
+    "derivatives equal to slope (any point works) -> choose midpoint",
+    "no sign change -> choose left endpoint (closest derivative)",
+    "no sign change -> choose right endpoint (closest derivative)",
+    "cubic spline: solved f'(c) = slope",
+    "cubic spline with constant derivative (any point works) -> choose midpoint",
+], dtype=object)
+
+RECORD_COLUMNS = [
+    "Segment", "a_label", "b_label", "a_val", "b_val", "slope",
+    "deriv_a", "deriv_b", "bracket", "c_pos", "c_time", "c_loc_text",
+    "y_c", "deriv_c", "residual", "method",
+]
+# thêm vào bảng khi solver="spline": nghiệm thứ hai (nếu có) của f'(c) = slope
+SPLINE_COLUMNS = ["n_roots", "c_pos_2", "c_time_2", "y_c_2", "residual_2"]
+
+
+# nhận xét theo dấu của slope: giảm / ổn định / tăng
+COMMENTS = np.array(["🔻 Suy giảm", "⏸ Ổn định", "🔼 Tăng trưởng"], dtype=object)
+
+
+def comment_text(slopes):
+    """Tăng trưởng / Suy giảm / Ổn định comment for each slope (NaN counts as flat)."""
+    sign = np.sign(np.nan_to_num(np.asarray(slopes, dtype=float), nan=0.0))
+    return COMMENTS[sign.astype(np.int8) + 1]
+
+
+def segment_text(a_label, b_label):
+    return a_label + " → " + b_label
+
+
+def location_text(a_label, b_label, c, frac):
+    """``c_loc_text`` as in the original table ("exact index" when trunc(c) == i).
+
+    The test is made on ``frac`` (c's position within the segment), which
+    keeps its precision however large the period index ``c`` is.
+    """
+    c_text = np.char.mod("%.3f", c).astype(object)
+    return np.where(
+        (frac >= 0) & (frac < 1),
+        a_label + " (exact index)",
+        a_label + " -- " + b_label + " (c ≈ " + c_text + ")",
+    )
+
+
+class MVTResult:
+    """Per-segment MVT results for one series (or a slice of it).
+
+    ``data`` maps column name to a per-segment array: the numeric output
+    of :func:`mvt_analyzer.engine.mvt_columns` with ``method`` as an int8
+    code into ``METHODS``.  ``result[name]`` returns any column of the
+    classic table (text columns are built on demand), ``result[i:j]`` a
+    zero-copy view, :meth:`record` one row as a dict and
+    :meth:`to_frame` / :meth:`to_arrow` a table.
+    """
+
+    def __init__(self, labels, y, deriv, data, t=None, start=0):
+        self.labels = labels
+        self.y = y
+        self.deriv = deriv
+        self.t = t
+        self.data = data
+        self.start = start
+
+    @classmethod
+    def from_columns(cls, labels, y, deriv, columns, t=None):
+        """Wrap :func:`mvt_columns` output, dropping what can be re-derived.
+
+        Endpoint derivatives and times always come from the series; for the
+        linear solver ``y_c``, ``deriv_c`` and ``residual`` are interpolated
+        from ``c_frac`` on access (the same arithmetic, so the same values),
+        and ``c_pos`` is ``start + i + c_frac``.
+        """
+        drop = {"deriv_a", "deriv_b", "c_pos", "c_pos_2", "c_time", "c_time_2"}
+        if "n_roots" not in columns:
+            drop |= {"y_c", "deriv_c", "residual"}
+        data = {name: values for name, values in columns.items() if name not in drop}
+        return cls(labels, y, deriv, data, t)
+
+    def __len__(self):
+        return len(self.data["slope"])
+
+    @property
+    def columns(self):
+        return RECORD_COLUMNS + (SPLINE_COLUMNS if "n_roots" in self.data else [])
+
+    @property
+    def nbytes(self):
+        """Bytes held by the per-segment columns (series arrays are shared)."""
+        return sum(v.nbytes for v in self.data.values())
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            lo, hi, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("MVTResult slices must be contiguous")
+            hi = max(lo, hi)
+            data = {name: values[lo:hi] for name, values in self.data.items()}
+            return MVTResult(self.labels, self.y, self.deriv, data, self.t, self.start + lo)
+        if key in self.data:
+            return self.data[key] if key != "method" else METHODS[self.data["method"]]
+        return self._derived(key)
+
+    def _derived(self, name):
+        lo, hi = self.start, self.start + len(self)
+        if name == "a_label":
+            return self.labels[lo:hi]
+        if name == "b_label":
+            return self.labels[lo + 1:hi + 1]
+        if name == "a_val":
+            return self.y[lo:hi]
+        if name == "b_val":
+            return self.y[lo + 1:hi + 1]
+        if name == "deriv_a":
+            return self.deriv[lo:hi]
+        if name == "deriv_b":
+            return self.deriv[lo + 1:hi + 1]
+        if name == "comment":
+            return comment_text(self.data["slope"])
+        if name == "Segment":
+            return segment_text(self["a_label"], self["b_label"])
+        if name == "c_loc_text":
+            return location_text(self["a_label"], self["b_label"], self["c_pos"], self.data["c_frac"])
+        if name in ("c_pos", "c_pos_2"):
+            return np.arange(lo, hi) + self.data[name.replace("pos", "frac")]
+        if name in ("y_c", "deriv_c", "residual"):
+            frac = self.data["c_frac"]
+            if name == "y_c":
+                return self.y[lo:hi] + frac * (self.y[lo + 1:hi + 1] - self.y[lo:hi])
+            deriv_c = self.deriv[lo:hi] + frac * (self.deriv[lo + 1:hi + 1] - self.deriv[lo:hi])
+            return deriv_c if name == "deriv_c" else np.abs(deriv_c - self.data["slope"])
+        if name in ("c_time", "c_time_2"):
+            frac = self.data[name.replace("time", "frac")]
+            if self.t is None:
+                return np.arange(lo, hi) + frac
+            t = self.t
+            return t[lo:hi] + frac * (t[lo + 1:hi + 1] - t[lo:hi])
+        raise KeyError(name)
+
+    def record(self, i):
+        """Row ``i`` as a dict of Python scalars (for the explanation), plus ``c_frac``."""
+        i = range(len(self))[i]
+        row = self[i:i + 1]
+        return {name: row[name][0] for name in self.columns + ["c_frac"]}
+
+    def to_frame(self, text=True):
+        """The classic MVT table for this view.
+
+        Numeric columns are passed to pandas without copying; ``method``
+        becomes a categorical over ``METHODS``.  ``text=False`` leaves out
+        ``Segment`` and ``c_loc_text``.
+        """
+        frame = {}
+        for name in self.columns:
+            if name == "method":
+                frame[name] = pd.Categorical.from_codes(self.data["method"], METHODS)
+            elif text or name not in ("Segment", "c_loc_text"):
+                frame[name] = self[name]
+        return pd.DataFrame(frame, copy=False)
+
+    def to_arrow(self):
+        """A ``pyarrow.Table``; labels and method are dictionary-encoded.
+
+        Numeric buffers are shared with NumPy; label columns are indices
+        into one dictionary holding the view's "Kỳ" values.
+        """
+        import pyarrow as pa
+
+        lo, hi = self.start, self.start + len(self)
+        labels = pa.array(self.labels[lo:hi + 1], type=pa.string())
+        idx = np.arange(hi - lo + 1, dtype=np.int32)
+        columns = {}
+        for name in self.columns:
+            if name == "a_label":
+                columns[name] = pa.DictionaryArray.from_arrays(idx[:-1], labels)
+            elif name == "b_label":
+                columns[name] = pa.DictionaryArray.from_arrays(idx[1:], labels)
+            elif name == "method":
+                columns[name] = pa.DictionaryArray.from_arrays(
+                    self.data["method"], pa.array(METHODS, type=pa.string())
+                )
+            elif name not in ("Segment", "c_loc_text"):
+                columns[name] = pa.array(self[name])
+        return pa.table(columns)
@@ -0,0 +1,157 @@
+"""Chunk-at-a-time MVT analysis for series too large to load at once.
+
+Segment i depends on y[i-1] .. y[i+2] (the central differences at both of
+its ends), so each chunk is analysed together with the last few points of
+the previous one and segments are emitted as soon as their right-hand
+derivative is known.  The final segment is emitted by :meth:`finish`, once
+the backward difference at the last point is available.
+
+With a real time axis the ``t`` values of each chunk travel alongside the
+values and are carried across boundaries the same way.
+"""
+import numpy as np
+
+from .changepoint import ChangeDetector
+from .engine import mvt_columns, overall_verdict
+from .ingest import DroppedRows, iter_csv_chunks
+from .metrics import stage
+from .result import MVTResult
+from .timeaxis import check_increasing, resolve_time_axis, time_axis_style, time_unit
+
+
+class ChunkedAnalyzer:
+    """Feed chunks of values in order; get MVT columns back.
+
+    ``feed`` and ``finish`` return the numeric columns (see
+    :func:`mvt_columns`) for the segments completed by that call, or
+    ``None`` when nothing new is complete.  Concatenated, they equal the
+    columns of the whole series.  Pass ``t`` with every chunk or with none.
+    """
+
+    def __init__(self, solver="linear"):
+        self.solver = solver
+        self._y = np.empty(0)
+        self._t = None
+        self._off = 0  # global index of self._y[0]
+        self._seg_done = 0
+        self.n = 0
+
+    def feed(self, values, t=None):
+        values = np.asarray(values, dtype=float)
+        self.n += len(values)
+        y = np.concatenate([self._y, values])
+        if t is not None:
+            prev = np.empty(0) if self._t is None else self._t
+            t = check_increasing(np.concatenate([prev, np.asarray(t, dtype=float)]))
+        out = None
+
+        m = len(y)
+        p0 = self._seg_done - self._off
+        p1 = m - 2  # segments p0 .. p1-1 have both end derivatives
+        if p1 > p0:
+            deriv = np.full(m, np.nan)
+            deriv[1:-1] = (y[2:] - y[:-2]) / _span(t, 2)  # central difference
+            if self._off == 0:
+                deriv[0] = (y[1] - y[0]) / _span(t, 1, 0)  # forward diff
+            sl = slice(p0, p1 + 1)
+            out = self._emit(y[sl], deriv[sl], self._off + p0, _part(t, sl))
+
+        # giữ lại điểm cần cho đạo hàm trung tâm của đoạn chưa xong
+        keep = max(0, self._seg_done - 1 - self._off)
+        self._y, self._t = y[keep:], _part(t, slice(keep, None))
+        self._off += keep
+        return out
+
+    def finish(self):
+        y, t = self._y, self._t
+        if self.n < 2:
+            raise ValueError("Cần ít nhất 2 kỳ để phân tích.")
+        m = len(y)
+        p0 = self._seg_done - self._off
+        deriv = np.full(m, np.nan)
+        deriv[1:-1] = (y[2:] - y[:-2]) / _span(t, 2)
+        deriv[-1] = (y[-1] - y[-2]) / _span(t, 1, -1)  # backward diff
+        if self._off == 0:
+            deriv[0] = (y[1] - y[0]) / _span(t, 1, 0)
+        sl = slice(p0, None)
+        return self._emit(y[sl], deriv[sl], self._off + p0, _part(t, sl))
+
+    def _emit(self, y, deriv, start, t):
+        slopes = np.diff(y) if t is None else np.diff(y) / np.diff(t)
+        self._seg_done = start + len(slopes)
+        return mvt_columns(y, slopes, deriv, start, t, self.solver)
+
+
+def _span(t, k, at=None):
+    """t[i+k] - t[i] (all i, or just i = ``at``); 1 per step without t."""
+    if t is None:
+        return float(k)
+    if at is None:
+        return t[k:] - t[:-k]
+    if at < 0:
+        return t[at] - t[at - k]
+    return t[at + k] - t[at]
+
+
+def _part(t, sl):
+    return None if t is None else t[sl]
+
+
+def analyze_csv_stream(source, chunksize=1_000_000, time_axis=None, solver="linear"):
+    """Chunked equivalent of :func:`mvt_analyzer.analyze` for a CSV source.
+
+    ``source`` is anything ``pd.read_csv`` accepts; ``time_axis`` is as in
+    :func:`mvt_analyzer.timeaxis.resolve_time_axis`, read in the style
+    of the first chunk, and ``solver`` as in
+    :func:`mvt_analyzer.analyze`.  Besides the usual
+    results the dict carries ``labels``/``values`` (the sanitized series)
+    and ``dropped`` (a :class:`DroppedRows` tally).  Change points are
+    detected chunk by chunk as the segments complete.
+    """
+    dropped = DroppedRows()
+    analyzer = ChunkedAnalyzer(solver)
+    detector = ChangeDetector()
+    parts, labels, values, times = [], [], [], []
+    style = None
+    for lab, val in iter_csv_chunks(source, chunksize, dropped):
+        labels.append(lab)
+        values.append(val)
+        if time_axis is not None:
+            with stage("time_axis", rows=len(lab)):
+                # cách đọc "Kỳ" (số, quý hay ngày) lấy từ khối đầu tiên cho cả chuỗi
+                style = style or time_axis_style(lab, time_unit(time_axis))
+                t = resolve_time_axis(lab, time_axis, style)
+            times.append(t)
+        else:
+            t = None
+        with stage("mvt_table", rows=len(val)):
+            part = analyzer.feed(val, t)
+        if part is not None:
+            parts.append(part)
+            with stage("changepoints", rows=len(part["slope"])):
+                detector.update(part["slope"], part["residual"])
+    with stage("mvt_table"):
+        parts.append(analyzer.finish())
+    with stage("changepoints", rows=len(parts[-1]["slope"])):
+        detector.update(parts[-1]["slope"], parts[-1]["residual"])
+
+    with stage("assemble", rows=analyzer.n):
+        data = {col: np.concatenate([p[col] for p in parts]) for col in parts[0]}
+        deriv = np.append(data["deriv_a"], data["deriv_b"][-1])
+        labels, y = np.concatenate(labels), np.concatenate(values)
+        t = np.concatenate(times) if times else None
+        result = MVTResult.from_columns(labels, y, deriv, data, t)
+    slopes = data["slope"]
+    avg_slope = float(np.mean(slopes))
+    return {
+        "t": np.arange(analyzer.n, dtype=float) if t is None else t,
+        "labels": labels,
+        "values": y,
+        "dropped": dropped,
+        "slopes": slopes,
+        "deriv": deriv,
+        "mvt": result,
+        "changes": detector.result(),
+        "avg_slope": avg_slope,
+        "overall": overall_verdict(avg_slope),
+    }
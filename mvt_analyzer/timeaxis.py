@@ -0,0 +1,129 @@
+"""Turn "Kỳ" labels into a numeric time axis.
+
+Three label styles are understood, all parsed column-wise:
+
+- numeric offsets ("0", "1.5", "12") are used as-is;
+- quarter strings ("Q1 2024", "2024Q1", "2024-Q1") become quarter numbers;
+- anything else is parsed as a date and measured in days.
+
+A series that mixes quarters with dates, or any series when ``unit`` is
+given, is converted through timestamps instead.  Values are absolute (not
+relative to the first period) so chunks of one series can be parsed
+independently, once the first chunk has fixed the style
+(:func:`time_axis_style`) the others are read with.
+"""
+import numpy as np
+import pandas as pd
+
+DAYS_PER_YEAR = 365.2425
+UNIT_DAYS = {
+    "D": 1.0,
+    "W": 7.0,
+    "M": DAYS_PER_YEAR / 12,
+    "Q": DAYS_PER_YEAR / 4,
+    "Y": DAYS_PER_YEAR,
+}
+
+_QUARTER_RE = (
+    r"^\s*(?:[Qq](?P<q1>[1-4])[\s\-/]*(?P<y1>\d{4})"
+    r"|(?P<y2>\d{4})[\s\-/]*[Qq](?P<q2>[1-4]))\s*$"
+)
+
+
+def parse_time_axis(labels, unit=None, style=None):
+    """Numeric time for each label; raises ``ValueError`` if any fail.
+
+    ``unit`` ("D", "W", "M", "Q" or "Y") fixes the unit for date-like
+    labels; by default pure quarter series are measured in quarters and
+    dates in days.  Numeric labels ignore ``unit``.  ``style`` (see
+    :func:`time_axis_style`) fixes how the labels are read instead of
+    inferring it from them, so later chunks of a series share the scale
+    of the first.
+    """
+    s, numeric = _read_labels(labels, unit)
+    if style is None and np.isfinite(numeric).all():
+        style = "numeric"
+    if style == "numeric":
+        _check_parsed(s, np.isfinite(numeric))
+        return numeric
+    is_quarter, year, quarter = _quarters(s)
+    style = style or _quarter_style(is_quarter, unit)
+    if style == "quarter":
+        _check_parsed(s, is_quarter)
+        return year.astype(int).to_numpy() * 4.0 + quarter.astype(int).to_numpy() - 1
+
+    stamps = pd.to_datetime(s.where(~is_quarter), errors="coerce", format="ISO8601")
+    retry = stamps.isna() & ~is_quarter
+    if retry.any():
+        stamps[retry] = pd.to_datetime(s[retry], errors="coerce", format="mixed")
+    if is_quarter.any():
+        q_start = pd.to_datetime(
+            {"year": year[is_quarter].astype(int),
+             "month": (quarter[is_quarter].astype(int) - 1) * 3 + 1,
+             "day": 1}
+        )
+        stamps[is_quarter] = q_start
+    _check_parsed(s, ~stamps.isna().to_numpy())
+    days = stamps.to_numpy(dtype="datetime64[s]").astype(np.int64) / 86400.0
+    return days / UNIT_DAYS[unit or "D"]
+
+
+def time_axis_style(labels, unit=None):
+    """How :func:`parse_time_axis` reads these labels: "numeric", "quarter" or "date"."""
+    s, numeric = _read_labels(labels, unit)
+    if np.isfinite(numeric).all():
+        return "numeric"
+    return _quarter_style(_quarters(s)[0], unit)
+
+
+def _read_labels(labels, unit):
+    s = pd.Series(np.asarray(labels, dtype=object)).astype(str)
+    if unit is not None and unit not in UNIT_DAYS:
+        raise ValueError(f"unknown time unit {unit!r}")
+    return s, pd.to_numeric(s, errors="coerce").to_numpy(dtype=float)
+
+
+def _quarters(s):
+    parts = s.str.extract(_QUARTER_RE)
+    year = parts["y1"].fillna(parts["y2"])
+    quarter = parts["q1"].fillna(parts["q2"])
+    return year.notna().to_numpy(), year, quarter
+
+
+def _quarter_style(is_quarter, unit):
+    return "quarter" if is_quarter.all() and unit in (None, "Q") else "date"
+
+
+def _check_parsed(s, ok):
+    bad = ~ok
+    if bad.any():
+        raise ValueError(
+            f"Không đọc được {int(bad.sum())} giá trị 'Kỳ' thành thời gian "
+            f"(ví dụ: {s[bad].iloc[0]!r})."
+        )
+
+
+def check_increasing(t):
+    """Raise ``ValueError`` unless ``t`` is strictly increasing."""
+    t = np.asarray(t, dtype=float)
+    if len(t) > 1 and not (np.diff(t) > 0).all():
+        raise ValueError("Các 'Kỳ' phải tăng dần và không trùng nhau.")
+    return t
+
+
+def resolve_time_axis(labels, time_axis=None, style=None):
+    """Time axis for an analysis call.
+
+    ``time_axis`` is ``None`` for the classic one-unit-per-period index
+    (returns ``None``), ``"auto"`` to parse labels with default units, or
+    one of the ``UNIT_DAYS`` keys to parse them in that unit.  ``style``
+    is passed on to :func:`parse_time_axis`.
+    """
+    if time_axis is None:
+        return None
+    return check_increasing(parse_time_axis(labels, time_unit(time_axis), style))
+
+
+def time_unit(time_axis):
+    """The ``unit`` for :func:`parse_time_axis` from a ``time_axis`` option."""
+    return None if time_axis == "auto" else time_axis
@@ -0,0 +1,268 @@
+"""MVT over spans wider than one period: rolling windows and any (a, b).
+
+For a window [a, b] the secant slope is (y_b - y_a) / (t_b - t_a), one
+strided difference for all windows of a given width.  A prefix sum of the
+trapezoid integral of the derivative estimates gives the mean of f' over
+any window in O(1) as well.  c is located the same way as for adjacent
+periods: the first segment inside the window whose endpoint derivatives
+bracket the slope, with linear interpolation between them; when no
+segment brackets it, the point whose derivative is closest.
+
+For a window [a, b] the first bracketing segment ends at the first
+point after a whose derivative lies on the other side of the slope (or on
+it), so a query only needs "first index in a range with a value >=
+threshold".  A tree of block maxima (``TREE_FANOUT`` wide) answers that
+for any batch of windows at once in O(log n) vectorized steps per
+window, and the nearest point of a window without a bracket is found the
+same way after a range maximum (or minimum) over the same tree; a table
+of every window of width k, or any list of (a, b) pairs, costs
+O(log n) per window whatever the widths are.
+"""
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .dataset import as_labels
+from .engine import estimate_derivatives
+
+# số phần tử tối đa của một khối (số cửa sổ x độ rộng) khi tìm c
+BLOCK_ELEMENTS = 1 << 20
+# số nhánh của cây max dùng để tìm chỉ số đầu tiên vượt ngưỡng
+TREE_FANOUT = 8
+
+
+class WindowAnalysis:
+    """Precomputed derivatives and prefix sums for window/interval queries."""
+
+    def __init__(self, y, t=None, deriv=None, labels=None):
+        self.y = np.asarray(y, dtype=float)
+        n = len(self.y)
+        if n < 2:
+            raise ValueError("Cần ít nhất 2 kỳ để phân tích.")
+        self.t = np.arange(n, dtype=float) if t is None else np.asarray(t, dtype=float)
+        self.deriv = estimate_derivatives(self.y, t) if deriv is None else np.asarray(deriv, dtype=float)
+        self.labels = None if labels is None else as_labels(labels)
+        # tích phân hình thang của f' cộng dồn: ∫ f' trên [a, b] = F[b] - F[a]
+        area = 0.5 * (self.deriv[1:] + self.deriv[:-1]) * np.diff(self.t)
+        self._F = np.concatenate([[0.0], np.cumsum(area)])
+        self._trees = None
+
+    def __len__(self):
+        return len(self.y)
+
+    def windows(self, k):
+        """MVT for every window [i, i + k]; one row per window."""
+        n = len(self.y)
+        if not 1 <= k < n:
+            raise ValueError(f"window width must be between 1 and {n - 1}")
+        a = np.arange(n - k)
+        return self._table(a, a + k)
+
+    def interval(self, a, b):
+        """MVT for one arbitrary window [a, b] (period indices, a < b)."""
+        return self.intervals([a], [b]).iloc[0]
+
+    def intervals(self, a, b):
+        """MVT for many arbitrary windows [a_i, b_i] at once; returns a DataFrame."""
+        a, b = np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64)
+        n = len(self.y)
+        if a.shape != b.shape or not ((0 <= a) & (a < b) & (b < n)).all():
+            raise ValueError(f"need 0 <= a < b < {n}")
+        return self._table(a, b)
+
+    # --- nội bộ ---
+
+    def _table(self, a, b):
+        cols = self._secants(a, b)
+        found, c, y_c, deriv_c = self._locate_ranges(a, b, cols["slope"])
+        return self._frame(a, b, cols, found, c, y_c, deriv_c)
+
+    def _secants(self, a, b):
+        dt = self.t[b] - self.t[a]
+        return {
+            "slope": (self.y[b] - self.y[a]) / dt,
+            "avg_deriv": (self._F[b] - self._F[a]) / dt,
+        }
+
+    def _locate_ranges(self, a, b, slopes):
+        if not np.isfinite(self.deriv).all():
+            return self._locate_dense(a, b, slopes)
+        if self._trees is None:
+            # f' >= ngưỡng và -f' >= -ngưỡng (tức f' <= ngưỡng)
+            self._trees = (max_tree(self.deriv), max_tree(-self.deriv))
+        up, down = self._trees
+        d, n = self.deriv, len(self.y)
+        lo, hi = a + 1, b + 1
+        # điểm đầu tiên sau a nằm ở phía bên kia slope (hoặc trên slope)
+        first = np.full(len(a), -1)
+        below, above = d[a] < slopes, d[a] > slopes
+        first[below] = first_at_least(up, lo[below], hi[below], slopes[below])
+        first[above] = first_at_least(down, lo[above], hi[above], -slopes[above])
+        found = (first >= 0) | (d[a] == slopes)
+        g = np.where(d[a] == slopes, a, first - 1)
+
+        # không có đoạn nào bao slope: cả cửa sổ ở một phía, f' gần nhất là min (hoặc max)
+        miss = np.flatnonzero(~found)
+        if len(miss):
+            over = above[miss]
+            for tree, sel in ((down, miss[over]), (up, miss[~over])):
+                lo_m, hi_m = a[sel], b[sel] + 1
+                g[sel] = first_at_least(tree, lo_m, hi_m, range_max(tree, lo_m, hi_m))
+
+        g1 = np.minimum(g + 1, n - 1)
+        d0, d1 = d[g], d[g1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            frac = np.where(d1 != d0, (slopes - d0) / (d1 - d0), 0.5)
+        frac = np.where(found, frac, 0.0)
+        y_c = self.y[g] + frac * (self.y[g1] - self.y[g])
+        deriv_c = d0 + frac * (d1 - d0)
+        return found, g + frac, y_c, deriv_c
+
+    def _locate_dense(self, a, b, slopes):
+        """Scan every window in full (derivatives with NaN gaps), one width at a time."""
+        out = [np.zeros(len(a), dtype=bool), np.zeros(len(a)), np.zeros(len(a)), np.zeros(len(a))]
+        width = b - a
+        for k in np.unique(width).tolist():
+            rows = np.flatnonzero(width == k)
+            view = sliding_window_view(self.deriv, k + 1)
+            step = max(1, BLOCK_ELEMENTS // (k + 1))
+            for i in range(0, len(rows), step):
+                sel = rows[i:i + step]
+                for dst, src in zip(out, self._locate(view[a[sel]], slopes[sel], a[sel])):
+                    dst[sel] = src
+        return tuple(out)
+
+    def _locate(self, D, s, a):
+        """First bracketing segment per row of ``D`` (derivs over a window)."""
+        s = s[:, None]
+        lo, hi = D[:, :-1], D[:, 1:]
+        cross = (np.minimum(lo, hi) <= s) & (s <= np.maximum(lo, hi))
+        found = cross.any(axis=1)
+        j = cross.argmax(axis=1)
+        rows = np.arange(len(D))
+        d0, d1 = lo[rows, j], hi[rows, j]
+        s = s[:, 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            frac = np.where(d1 != d0, (s - d0) / (d1 - d0), 0.5)
+        # không có đoạn nào bao slope: chọn điểm có f' gần nhất
+        gap = np.abs(D - s[:, None])
+        gap = np.where(np.isnan(gap), np.inf, gap)
+        nearest = gap.argmin(axis=1)
+        j = np.where(found, j, nearest)
+        frac = np.where(found, frac, 0.0)
+
+        g = a + j
+        g1 = np.minimum(g + 1, len(self.y) - 1)
+        c = g + frac
+        y_c = self.y[g] + frac * (self.y[g1] - self.y[g])
+        deriv_c = self.deriv[g] + frac * (self.deriv[g1] - self.deriv[g])
+        return found, c, y_c, deriv_c
+
+    def _frame(self, a, b, cols, found, c, y_c, deriv_c):
+        g = np.floor(c).astype(int).clip(0, len(self.y) - 2)
+        c_time = self.t[g] + (c - g) * (self.t[g + 1] - self.t[g])
+        frame = {"a": a, "b": b}
+        if self.labels is not None:
+            frame["a_label"] = self.labels[a]
+            frame["b_label"] = self.labels[b]
+        frame.update({
+            "slope": cols["slope"],
+            "avg_deriv": cols["avg_deriv"],
+            "bracket": found,
+            "c_pos": c,
+            "c_time": c_time,
+            "y_c": y_c,
+            "deriv_c": deriv_c,
+            "residual": np.abs(deriv_c - cols["slope"]),
+        })
+        return pd.DataFrame(frame)
+
+
+def max_tree(values, fanout=TREE_FANOUT):
+    """``values`` plus levels of block maxima, ``fanout`` wide, up to one block."""
+    levels = [np.asarray(values, dtype=float)]
+    while len(levels[-1]) > fanout:
+        v = levels[-1]
+        pad = -len(v) % fanout
+        if pad:
+            v = np.concatenate([v, np.full(pad, -np.inf)])
+        levels.append(v.reshape(-1, fanout).max(axis=1))
+    return levels
+
+
+def _scan(level, start, stop, thr, fanout):
+    """First j in [start, stop) (at most ``fanout`` apart) with level[j] >= thr, else -1."""
+    idx = start[:, None] + np.arange(fanout)
+    hit = (idx < stop[:, None]) & (level[np.minimum(idx, len(level) - 1)] >= thr[:, None])
+    return np.where(hit.any(axis=1), start + hit.argmax(axis=1), -1)
+
+
+def first_at_least(tree, lo, hi, thr, fanout=TREE_FANOUT):
+    """Per query, the first i in [lo, hi) with values[i] >= thr (-1 if none).
+
+    ``tree`` comes from :func:`max_tree`.  Each query climbs from ``lo``
+    through whole blocks, finishes the part before ``hi`` on the way down
+    and then descends into the first block whose maximum reaches ``thr``:
+    O(fanout x levels) work per query.
+    """
+    lo, hi = np.asarray(lo, dtype=np.int64), np.asarray(hi, dtype=np.int64)
+    thr = np.asarray(thr, dtype=float)
+    q, depth = len(lo), len(tree)
+    hit_level = np.full(q, -1)
+    hit_idx = np.full(q, -1, dtype=np.int64)
+    tail_level = np.full(q, -1)
+    cur = lo.copy()
+    active = np.arange(q)
+    for level_no, level in enumerate(tree):  # đi lên qua các khối trọn vẹn
+        if not len(active):
+            break
+        c = cur[active]
+        h = hi[active] // fanout ** level_no
+        bound = (c // fanout + 1) * fanout
+        j = _scan(level, c, np.minimum(bound, h), thr[active], fanout)
+        got = j >= 0
+        hit_level[active[got]], hit_idx[active[got]] = level_no, j[got]
+        end = ~got & (bound >= h)
+        tail_level[active[end]] = level_no
+        move = ~got & ~end
+        cur[active[move]] = bound[move] // fanout
+        active = active[move]
+    for level_no in range(depth - 2, -1, -1):  # phần lẻ trước hi, từ trái sang phải
+        sel = np.flatnonzero((tail_level > level_no) & (hit_level < 0))
+        start = hi[sel] // fanout ** (level_no + 1) * fanout
+        j = _scan(tree[level_no], start, hi[sel] // fanout ** level_no, thr[sel], fanout)
+        got = j >= 0
+        hit_level[sel[got]], hit_idx[sel[got]] = level_no, j[got]
+    for level_no in range(depth - 1, 0, -1):  # đi xuống trong khối đầu tiên đạt ngưỡng
+        sel = np.flatnonzero(hit_level == level_no)
+        below = tree[level_no - 1]
+        start = hit_idx[sel] * fanout
+        hit_idx[sel] = _scan(below, start, np.minimum(start + fanout, len(below)), thr[sel], fanout)
+        hit_level[sel] = level_no - 1
+    return np.where(hit_level == 0, hit_idx, -1)
+
+
+def range_max(tree, lo, hi, fanout=TREE_FANOUT):
+    """Per query, the maximum of values[lo:hi] (non-empty ranges); ``tree`` from :func:`max_tree`.
+
+    Each level adds the partial blocks at both ends and passes the whole
+    blocks between them up: O(fanout x levels) work per query.
+    """
+    lo, hi = np.asarray(lo, dtype=np.int64), np.asarray(hi, dtype=np.int64)
+    out = np.full(len(lo), -np.inf)
+    for level_no, level in enumerate(tree):
+        if level_no == len(tree) - 1:  # mức trên cùng: còn ít hơn một khối
+            return np.maximum(out, _scan_max(level, lo, hi, fanout))
+        left = np.minimum(-(-lo // fanout) * fanout, hi)
+        right = np.maximum(hi // fanout * fanout, left)
+        out = np.maximum(out, _scan_max(level, lo, left, fanout))
+        out = np.maximum(out, _scan_max(level, right, hi, fanout))
+        lo, hi = left // fanout, right // fanout
+    return out
+
+
+def _scan_max(level, start, stop, fanout):
+    """Max of level[start:stop] (at most ``fanout`` apart), -inf when empty."""
+    idx = start[:, None] + np.arange(fanout)
+    vals = level[np.minimum(idx, len(level) - 1)]
+    return np.where(idx < stop[:, None], vals, -np.inf).max(axis=1, initial=-np.inf)
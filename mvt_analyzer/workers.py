@@ -0,0 +1,180 @@
+"""Bounded, deduplicating compute pool shared by all app sessions.
+
+Streamlit runs every session's script in its own thread, so without a
+pool each session parses, analyses and draws its upload itself: N users
+opening the same file do the work N times, and a huge upload competes
+with everybody's reruns.  :class:`ComputePool` runs those jobs on a fixed
+set of worker threads instead:
+
+- jobs are keyed (content hash + options); a key that is already cached
+  returns at once, and one that is queued or running is joined instead
+  of being started again;
+- large jobs (``size >= heavy_size``) go to a separate lane with fewer
+  workers, so big uploads queue behind each other and never occupy every
+  worker;
+- each lane holds at most ``max_pending`` unfinished jobs; beyond that
+  :meth:`ComputePool.submit` raises :class:`PoolBusy` (backpressure)
+  rather than piling up more work;
+- every job runs inside its own :class:`~mvt_analyzer.metrics.Metrics`,
+  so the library's stage hooks double as progress reports; the number of
+  stages the last successful run of the same function recorded is the
+  estimate of how many to expect;
+- the result cache is bounded by bytes as well as entries, so a few huge
+  uploads cannot pin unbounded memory.
+
+Threads rather than processes: the heavy stages are NumPy/pandas code that
+releases the GIL, results are shared by reference instead of pickled
+across processes, and charts are drawn with the object-oriented Figure API
+(:mod:`mvt_analyzer.plotting`), which keeps no global pyplot state.
+"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+
+from .cache import LRUCache
+from .metrics import Metrics
+
+_MISSING = object()
+
+
+def _name(fn):
+    return getattr(fn, "__qualname__", repr(fn))
+
+
+class PoolBusy(RuntimeError):
+    """A lane of the :class:`ComputePool` already has ``max_pending`` jobs."""
+
+
+class Job:
+    """One keyed computation, shared by every caller that asked for it.
+
+    ``state`` is "queued", "running" or "done"; ``metrics`` collects the
+    stages run so far; ``expected_stages`` is the pool's estimate (or None).
+    """
+
+    def __init__(self, key, lane, memory=False, expected_stages=None):
+        self.key = key
+        self.lane = lane
+        self.expected_stages = expected_stages
+        self.metrics = Metrics(memory=memory)
+        self.state = "queued"
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.future = Future()
+
+    @classmethod
+    def finished(cls, key, value):
+        job = cls(key, None)
+        job.state = "done"
+        job.future.set_result(value)
+        return job
+
+    def done(self):
+        return self.future.done()
+
+    def wait(self, timeout=None):
+        """Block up to ``timeout`` seconds; True once the job has finished."""
+        wait_futures([self.future], timeout)
+        return self.future.done()
+
+    def result(self, timeout=None):
+        """The job's value; re-raises the exception it failed with."""
+        return self.future.result(timeout)
+
+    def progress(self, expected_stages=None):
+        """State, current stage and elapsed time, for a progress display.
+
+        ``fraction`` is the share of ``expected_stages`` (default: the
+        job's own estimate) finished, kept below 1 until the job is done,
+        or None without an estimate.
+        """
+        expected_stages = expected_stages or self.expected_stages
+        now = time.perf_counter()
+        done = len(self.metrics.records)
+        fraction = None
+        if self.state == "done":
+            fraction = 1.0
+        elif expected_stages:
+            fraction = min(done / expected_stages, 0.99)
+        return {
+            "state": self.state,
+            "stage": self.metrics.current,
+            "stages_done": done,
+            "fraction": fraction,
+            "waited": (self.started or now) - self.submitted,
+            "running": 0.0 if self.started is None else now - self.started,
+        }
+
+
+class ComputePool:
+    """Keyed jobs on two bounded thread lanes, with a shared result cache.
+
+    ``submit(key, fn, *args, size=...)`` returns ``(job, created)``;
+    ``created`` is False when the value came from the cache or an
+    identical job was already in flight.  Finished values are kept in an
+    :class:`~mvt_analyzer.cache.LRUCache` of ``cache_size`` entries and
+    ``cache_bytes`` bytes (None = no byte limit); failed jobs are not
+    cached, so the next submit tries again.
+    """
+
+    def __init__(self, workers=2, heavy_workers=1, heavy_size=8 << 20, max_pending=8,
+                 cache_size=16, cache_bytes=None, memory=False):
+        if workers < 1 or heavy_workers < 1 or max_pending < 1:
+            raise ValueError("workers, heavy_workers and max_pending must be >= 1")
+        self.heavy_size = heavy_size
+        self.max_pending = max_pending
+        self.memory = memory
+        self.cache = LRUCache(cache_size, cache_bytes)
+        self._executors = {
+            "light": ThreadPoolExecutor(workers, thread_name_prefix="mvt-light"),
+            "heavy": ThreadPoolExecutor(heavy_workers, thread_name_prefix="mvt-heavy"),
+        }
+        self._jobs = {}  # key -> Job chưa xong
+        self._stages = {}  # tên hàm -> số bước lần chạy thành công gần nhất
+        self._lock = threading.Lock()
+
+    def lane(self, size):
+        return "heavy" if size >= self.heavy_size else "light"
+
+    def submit(self, key, fn, *args, size=0):
+        """Run ``fn(*args)`` once for ``key``; see the class docstring."""
+        with self._lock:
+            value = self.cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return Job.finished(key, value), False
+            job = self._jobs.get(key)
+            if job is not None:
+                return job, False
+            lane = self.lane(size)
+            if sum(j.lane == lane for j in self._jobs.values()) >= self.max_pending:
+                raise PoolBusy(f"{lane} lane is full ({self.max_pending} jobs pending)")
+            job = Job(key, lane, self.memory, self._stages.get(_name(fn)))
+            self._jobs[key] = job
+            self._executors[lane].submit(self._run, job, fn, args)
+        return job, True
+
+    def _run(self, job, fn, args):
+        job.started = time.perf_counter()
+        job.state = "running"
+        try:
+            with job.metrics:
+                value = fn(*args)
+        except BaseException as exc:
+            with self._lock:
+                del self._jobs[job.key]
+            job.state = "done"
+            job.future.set_exception(exc)
+            return
+        # vào cache trước khi rời danh sách đang chạy: lần submit sau luôn thấy một trong hai
+        self.cache.put(job.key, value)
+        with self._lock:
+            del self._jobs[job.key]
+            self._stages[_name(fn)] = len(job.metrics.records)
+        job.state = "done"
+        job.future.set_result(value)
+
+    def shutdown(self, wait=True):
+        """Stop both lanes; with ``wait`` let queued and running jobs finish first."""
+        for executor in self._executors.values():
+            executor.shutdown(wait=wait)
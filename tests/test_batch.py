@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mvt_analyzer import batch
+from mvt_analyzer.engine import mvt_table
+
+
+def _frame(n_entities=60, seed=0):
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(2, 40, size=n_entities)
+    ids = np.repeat(np.arange(n_entities), counts)
+    periods = np.concatenate([np.arange(c) for c in counts])
+    return pd.DataFrame({
+        "id": ids,
+        "Kỳ": periods.astype(str),
+        "Giá trị": rng.normal(size=len(ids)).cumsum(),
+    })
+
+
+@pytest.mark.parametrize("solver", ["linear", "spline"])
+def test_pool_matches_inline(monkeypatch, solver):
+    df = _frame()
+    inline, inline_summary = batch.analyze_batch(df, "id", solver=solver, workers=1)
+    monkeypatch.setattr(batch, "INLINE_ROWS", 0)
+    pooled, pooled_summary = batch.analyze_batch(df, "id", solver=solver, workers=2)
+    pd.testing.assert_frame_equal(pooled, inline)
+    pd.testing.assert_frame_equal(pooled_summary, inline_summary)
+
+
+@pytest.mark.parametrize("solver", ["linear", "spline"])
+def test_positions_match_single_series(solver):
+    df = _frame(n_entities=20, seed=1)
+    table, _ = batch.analyze_batch(df, "id", solver=solver, workers=1)
+    for key, part in df.groupby("id", sort=False):
+        single = mvt_table(part["Kỳ"].to_numpy(object), part["Giá trị"].to_numpy(), solver=solver)
+        rows = table[table["id"] == key]
+        np.testing.assert_array_equal(rows["c_pos"].to_numpy(), single["c_pos"].to_numpy())
+        if solver == "spline":
+            np.testing.assert_array_equal(rows["c_pos_2"].to_numpy(), single["c_pos_2"].to_numpy())
@@ -0,0 +1,31 @@
+import numpy as np
+
+from mvt_analyzer import analyze
+from mvt_analyzer.cache import LRUCache, approx_nbytes, content_key
+
+
+def test_content_key_depends_on_params():
+    assert content_key(b"x", 1) == content_key(b"x", 1)
+    assert content_key(b"x", 1) != content_key(b"x", 2)
+
+
+def test_approx_nbytes_counts_shared_buffers_once():
+    a = np.zeros(1000)
+    assert approx_nbytes(a) == 8000
+    assert approx_nbytes({"a": a, "view": a[10:], "again": [a]}) == 8000
+    result = analyze([f"K{i}" for i in range(500)], np.arange(500.0) ** 2)
+    assert approx_nbytes(result) > result["mvt"].nbytes
+
+
+def test_lru_evicts_by_count_and_bytes():
+    cache = LRUCache(maxsize=3, maxbytes=10_000)
+    for key in "abc":
+        cache.put(key, np.zeros(100))  # 800 B
+    cache.get("a")
+    cache.put("d", np.zeros(100))
+    assert "b" not in cache and "a" in cache and len(cache) == 3
+    cache.put("big", np.zeros(1000))  # 8000 B: các mục cũ nhất phải nhường chỗ
+    assert "big" in cache and cache.nbytes <= 10_000
+    assert "c" not in cache
+    cache.put("huge", np.zeros(2000))  # lớn hơn cả ngân sách: không giữ
+    assert "huge" not in cache and cache.nbytes <= 10_000
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from mvt_analyzer import analyze
+from mvt_analyzer.changepoint import ChangeDetector, detect_changes, series_changes
+
+
+def shifted(levels=(1.0, 4.0, -1.0), size=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.concatenate([lv + rng.normal(0, 0.5, size) for lv in levels])
+
+
+def test_finds_level_shifts_and_regime_rates():
+    out = detect_changes(shifted())
+    changes = out["changes"]
+    assert len(changes) >= 2
+    for boundary in (300, 600):
+        assert np.abs(changes["segment"] - boundary).min() <= 5
+    assert out["regimes"]["avg_slope"].iloc[-1] == pytest.approx(-1.0, abs=0.1)
+
+
+def test_chunked_equals_whole():
+    s = shifted()
+    r = np.abs(np.random.default_rng(1).normal(0, 0.3, len(s)))
+    whole = detect_changes(s, r)
+    det = ChangeDetector()
+    for lo in range(0, len(s), 37):
+        det.update(s[lo:lo + 37], r[lo:lo + 37])
+    np.testing.assert_allclose(det.regimes()[["start", "stop", "avg_slope"]], whole["regimes"][["start", "stop", "avg_slope"]])
+    np.testing.assert_array_equal(det.outliers, whole["outliers"])
+
+
+def test_residual_spike_is_outlier():
+    s = shifted(levels=(1.0,), size=500)
+    r = np.abs(np.random.default_rng(2).normal(0, 0.1, len(s)))
+    r[[100, 400]] = 10.0
+    np.testing.assert_array_equal(detect_changes(s, r)["outliers"], [100, 400])
+
+
+def test_no_early_outliers_on_random_walks():
+    rng = np.random.default_rng(3)
+    flagged = 0
+    for _ in range(300):
+        y = np.cumsum(rng.normal(size=60))
+        flagged += len(analyze(list(range(60)), y)["changes"]["outliers"]) > 0
+    assert flagged <= 3
+
+
+def test_exactly_linear_series_is_quiet():
+    changes = analyze(list(range(1000)), 0.1 * np.arange(1000))["changes"]
+    assert len(changes["changes"]) == 0
+    assert len(changes["outliers"]) == 0
+
+
+def test_series_changes_per_entity():
+    a, b = shifted(levels=(1.0, 3.0), size=200), shifted(levels=(-1.0,), size=150, seed=5)
+    n_changes, rate, start, n_outliers = series_changes(np.concatenate([a, b]), None, [400, 0, 150])
+    for i, s in ((0, a), (2, b)):
+        det = ChangeDetector()
+        changes, _ = det.update(s)
+        assert n_changes[i] == len(changes)
+        assert (start[i], rate[i]) == (det.current[0], pytest.approx(det.current[2]))
+    assert n_changes[1] == 0 and np.isnan(rate[1])
+    assert abs(start[0] - 200) <= 5 and rate[0] == pytest.approx(3.0, abs=0.15)
+
+
+def test_series_changes_matches_a_detector_per_series():
+    rng = np.random.default_rng(3)
+    counts = np.concatenate([rng.integers(0, 60, 300), [1, 2, 300, 700, 1100]])
+    rng.shuffle(counts)
+    parts = []
+    for c in counts:
+        level = np.repeat(rng.normal(0, 3, 4), -(-c // 4))[:c]
+        parts.append(level + rng.normal(size=c))
+    slopes = np.concatenate(parts)
+    slopes[rng.integers(0, len(slopes), 10)] = np.nan
+    residual = np.abs(rng.standard_cauchy(len(slopes)))
+    got = series_changes(slopes, residual, counts)
+    assert got[0].sum() > 0 and got[3].sum() > 0
+    lo = np.cumsum(counts) - counts
+    for i, c in enumerate(counts):
+        det = ChangeDetector()
+        changes, outliers = det.update(slopes[lo[i]:lo[i] + c], residual[lo[i]:lo[i] + c])
+        start, _, rate = det.current
+        assert (got[0][i], got[2][i], got[3][i]) == (len(changes), start, len(outliers))
+        np.testing.assert_array_equal(got[1][i], rate)
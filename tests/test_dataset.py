@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pytest
+
+from mvt_analyzer.dataset import DatasetStore, Labels, is_dataset, open_dataset, save_dataset
+
+
+def test_labels_index_like_an_object_array():
+    strings = ["Q1 2024", "Quý 2/2024", "", "Q4 2024"]
+    labels = Labels.from_strings(strings)
+    expected = np.array(strings, dtype=object)
+    assert len(labels) == 4
+    assert labels[1] == "Quý 2/2024"
+    assert labels[-1] == "Q4 2024"
+    assert list(labels[1:3]) == list(expected[1:3])
+    assert list(labels[np.array([3, -4])]) == ["Q4 2024", "Q1 2024"]
+    assert list(labels[np.array([True, False, True, False])]) == ["Q1 2024", ""]
+    assert list(labels) == strings
+    assert list(np.asarray(labels)) == strings
+    with pytest.raises(IndexError):
+        labels[np.array([4])]
+
+
+def test_save_and_open_round_trip(tmp_path):
+    path = tmp_path / "s.mvtds"
+    save_dataset(path, ["2024-01", "2024-02", "2024-03"], [1.0, 2.5, 4.0], dropped=2)
+    assert is_dataset(path)
+    dataset = open_dataset(path)
+    assert len(dataset) == 3
+    assert dataset.dropped == 2
+    assert list(dataset.labels) == ["2024-01", "2024-02", "2024-03"]
+    np.testing.assert_array_equal(dataset.values, [1.0, 2.5, 4.0])
+    with pytest.raises(ValueError):
+        dataset.values[0] = 0.0  # map chỉ đọc
+
+
+def test_time_axis_is_cached_next_to_the_data(tmp_path):
+    dataset = save_dataset(tmp_path / "s.mvtds", ["2024-01-01", "2024-01-03", "2024-01-04"], [1.0, 2.0, 3.0])
+    assert dataset.time_axis() is None
+    t = dataset.time_axis("auto")
+    np.testing.assert_array_equal(np.diff(t), [2.0, 1.0])
+    assert os.path.exists(os.path.join(dataset.path, "t_auto.npy"))
+    np.testing.assert_array_equal(open_dataset(dataset.path).time_axis("auto"), t)
+
+
+def test_open_rejects_other_directories(tmp_path):
+    with pytest.raises(ValueError):
+        open_dataset(tmp_path)
+
+
+def test_store_get_put_and_prune(tmp_path):
+    store = DatasetStore(tmp_path, max_entries=2)
+    assert store.get("a") is None
+    for i, key in enumerate("abc"):
+        store.put(key, ["x", "y"], [float(i), 1.0])
+        os.utime(store.path(key), (i, i))  # thứ tự dùng gần nhất: a < b < c
+    store.put("d", ["x", "y"], [3.0, 1.0])
+    assert store.get("a") is None and store.get("b") is None
+    assert store.get("c").values[0] == 2.0
+    assert store.get("d").values[0] == 3.0
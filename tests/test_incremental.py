@@ -0,0 +1,39 @@
+import json
+
+import numpy as np
+
+from mvt_analyzer.incremental import IncrementalAnalysis
+
+
+def test_appends_are_read_in_the_style_of_the_first_labels(tmp_path):
+    inc = IncrementalAnalysis(time_axis="auto")
+    inc.extend(["2024-01-01", "2024-01-08"], [1.0, 2.0])
+    assert inc.time_style == "date"
+    inc.append("20240115", 3.0)  # một mình là số; ở đây là ngày tiếp theo
+    np.testing.assert_array_equal(np.diff(inc._t_view()), [7.0, 7.0])
+
+    path = tmp_path / "state.npz"
+    inc.save(path)
+    restored = IncrementalAnalysis.load(path)
+    assert restored.time_style == "date"
+    restored.append("20240122", 4.0)
+    np.testing.assert_array_equal(np.diff(restored._t_view()), [7.0, 7.0, 7.0])
+
+
+def test_state_without_a_style_infers_it_from_the_saved_labels(tmp_path):
+    inc = IncrementalAnalysis(time_axis="auto")
+    inc.extend(["Q1 2024", "Q2 2024", "Q3 2024"], [1.0, 2.0, 4.0])
+    path = tmp_path / "state.npz"
+    inc.save(path)
+    with np.load(path) as data:
+        arrays = dict(data)
+    meta = json.loads(str(arrays["meta"]))
+    del meta["time_style"]
+    arrays["meta"] = np.array(json.dumps(meta))
+    np.savez(path, **arrays)
+
+    restored = IncrementalAnalysis.load(path)
+    assert restored.time_style == "quarter"
+    restored.append("Q4 2024", 5.0)
+    np.testing.assert_array_equal(np.diff(restored._t_view()), [1.0, 1.0, 1.0])
+    np.testing.assert_array_equal(restored.slopes, [1.0, 2.0, 1.0])
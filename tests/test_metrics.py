@@ -0,0 +1,45 @@
+import threading
+import tracemalloc
+
+import numpy as np
+
+from mvt_analyzer.metrics import Metrics, stage
+
+
+def test_tracing_outlives_a_collector_that_exits_first():
+    assert not tracemalloc.is_tracing()
+    a_entered, b_entered, a_exited = threading.Event(), threading.Event(), threading.Event()
+    b_metrics = Metrics(memory=True)
+
+    def thread_a():
+        with Metrics(memory=True):  # A bật tracemalloc
+            a_entered.set()
+            b_entered.wait(5)
+        a_exited.set()
+
+    def thread_b():
+        a_entered.wait(5)
+        with b_metrics:
+            b_entered.set()
+            with stage("alloc"):
+                a_exited.wait(5)
+                block = np.ones(10_000_000)  # 80 MB
+                del block
+
+    threads = [threading.Thread(target=thread_a), threading.Thread(target=thread_b)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert b_metrics.records[0]["peak_bytes"] > 70_000_000
+    assert not tracemalloc.is_tracing()
+
+
+def test_tracing_started_elsewhere_is_left_on():
+    tracemalloc.start()
+    try:
+        with Metrics(memory=True):
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
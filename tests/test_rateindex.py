@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from mvt_analyzer.rateindex import RateIndex
+
+
+def _brute(deriv, v):
+    lo = np.minimum(deriv[:-1], deriv[1:])
+    hi = np.maximum(deriv[:-1], deriv[1:])
+    return np.flatnonzero((lo <= v) & (v <= hi))
+
+
+@pytest.mark.parametrize("leaf_size", [1, 4, 64])
+def test_segments_match_brute_force(leaf_size):
+    rng = np.random.default_rng(0)
+    deriv = rng.normal(size=500).round(1)  # nhiều giá trị trùng và khoảng suy biến
+    deriv[[17, 200]] = np.nan
+    index = RateIndex(deriv, leaf_size=leaf_size)
+    for v in np.concatenate([rng.normal(size=50), [-5.0, 5.0, 0.0, deriv[3]]]):
+        expected = _brute(deriv, v)
+        np.testing.assert_array_equal(index.segments(v), expected)
+        assert index.count(v) == len(expected)
+    assert len(index.segments(np.nan)) == 0
+
+
+def test_crossings_interpolate_within_the_segment():
+    deriv = np.array([0.0, 2.0, 2.0, 4.0])
+    y = np.array([10.0, 12.0, 15.0, 20.0])
+    t = np.array([0.0, 1.0, 3.0, 4.0])
+    index = RateIndex(deriv, t=t, y=y, labels=["a", "b", "c", "d"])
+    rows = index.crossings(1.0)
+    assert list(rows["segment"]) == [0]
+    assert rows["c_pos"][0] == 0.5
+    assert rows["c_time"][0] == 0.5
+    assert rows["y_c"][0] == 11.0
+    assert list(rows["a_label"]) == ["a"]
+
+
+def test_crossing_at_a_period_is_reported_once_and_flat_segments_use_the_midpoint():
+    index = RateIndex([0.0, 2.0, 2.0, 4.0])
+    rows = index.crossings(2.0)
+    # f' = 2 đúng tại kỳ 1, trên cả đoạn 1 (phẳng) và tại kỳ 2
+    assert list(rows["c_pos"]) == [1.0, 1.5, 2.0]
+    assert list(rows["flat"]) == [False, True, False]
+
+
+def test_needs_two_periods():
+    with pytest.raises(ValueError):
+        RateIndex([1.0])
@@ -0,0 +1,41 @@
+import numpy as np
+
+from mvt_analyzer import mvt_result
+
+
+def test_comment_is_derived_from_slope_sign():
+    res = mvt_result(["a", "b", "c", "d"], [1.0, 2.0, 2.0, 0.0])
+    assert "comment" not in res.data
+    assert list(res["comment"]) == ["🔼 Tăng trưởng", "⏸ Ổn định", "🔻 Suy giảm"]
+    assert list(res[1:]["comment"]) == ["⏸ Ổn định", "🔻 Suy giảm"]
+
+
+def test_nan_slope_is_flat():
+    from mvt_analyzer.result import comment_text
+
+    assert list(comment_text(np.array([np.nan]))) == ["⏸ Ổn định"]
+
+
+def test_fraction_does_not_depend_on_the_period_index():
+    from mvt_analyzer.engine import mvt_columns
+
+    y = np.random.default_rng(0).normal(size=200).cumsum()
+    near = mvt_columns(y)
+    far = mvt_columns(y, start=2**45)
+    # c_pos = 2**45 + i + frac only keeps ~1e-3 of frac; everything else uses frac itself
+    np.testing.assert_array_equal(far["c_frac"], near["c_frac"])
+    np.testing.assert_array_equal(far["y_c"], near["y_c"])
+    np.testing.assert_array_equal(far["deriv_c"], near["deriv_c"])
+
+
+def test_derived_columns_match_mvt_columns():
+    from mvt_analyzer.engine import mvt_columns
+
+    y = np.random.default_rng(1).normal(size=100).cumsum()
+    t = np.cumsum(np.random.default_rng(2).uniform(0.5, 2.0, size=100))
+    cols = mvt_columns(y, t=t)
+    res = mvt_result([str(i) for i in range(100)], y, t=t)
+    assert "c_pos" not in res.data
+    for name in ("c_pos", "c_time", "y_c", "deriv_c", "residual"):
+        np.testing.assert_array_equal(res[name], cols[name])
+        np.testing.assert_array_equal(res[40:60][name], cols[name][40:60])
@@ -0,0 +1,34 @@
+import io
+
+import numpy as np
+import pytest
+
+from mvt_analyzer.stream import analyze_csv_stream
+from mvt_analyzer.timeaxis import parse_time_axis, resolve_time_axis, time_axis_style
+
+
+def test_style_of_labels():
+    assert time_axis_style(["0", "1.5", "3"]) == "numeric"
+    assert time_axis_style(["Q1 2024", "2024Q2"]) == "quarter"
+    assert time_axis_style(["Q1 2024", "2024Q2"], "M") == "date"
+    assert time_axis_style(["Q1 2024", "2024-05-01"]) == "date"
+
+
+def test_forced_style_keeps_the_scale():
+    # "20240201" alone is a number; read as a date it continues the series
+    np.testing.assert_array_equal(
+        parse_time_axis(["20240201", "20240301"], style="date"),
+        parse_time_axis(["2024-02-01", "2024-03-01"]),
+    )
+    with pytest.raises(ValueError):
+        parse_time_axis(["Q1 2024", "2024-05-01"], style="quarter")
+    with pytest.raises(ValueError):
+        parse_time_axis(["1", "Q1 2024"], style="numeric")
+
+
+def test_stream_reads_every_chunk_like_the_first():
+    labels = ["2024-01-01", "2024-01-08", "2024-01-15", "20240122", "20240129", "20240205"]
+    csv = "Kỳ,Giá trị\n" + "".join(f"{lab},{i}\n" for i, lab in enumerate(labels))
+    result = analyze_csv_stream(io.StringIO(csv), chunksize=3, time_axis="auto")
+    np.testing.assert_array_equal(result["t"], resolve_time_axis(labels, "auto"))
+    np.testing.assert_array_equal(np.diff(result["t"]), 7.0)
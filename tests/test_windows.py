@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from mvt_analyzer.windows import WindowAnalysis, first_at_least, max_tree, range_max
+
+
+def test_first_at_least_matches_scan():
+    rng = np.random.default_rng(0)
+    for n in (1, 7, 8, 9, 65, 300):
+        v = rng.normal(size=n)
+        lo = rng.integers(0, n, 64)
+        hi = np.minimum(n, lo + rng.integers(0, n + 1, 64))
+        thr = rng.normal(size=64)
+        expected = []
+        for a, b, x in zip(lo, hi, thr):
+            idx = np.flatnonzero(v[a:b] >= x)
+            expected.append(a + idx[0] if len(idx) else -1)
+        np.testing.assert_array_equal(first_at_least(max_tree(v), lo, hi, thr), expected)
+
+
+def test_range_max_matches_scan():
+    rng = np.random.default_rng(1)
+    for n in (1, 7, 8, 9, 64, 65, 300):
+        v = rng.normal(size=n)
+        lo = rng.integers(0, n, 64)
+        hi = lo + 1 + rng.integers(0, n - lo)
+        expected = [v[a:b].max() for a, b in zip(lo, hi)]
+        np.testing.assert_array_equal(range_max(max_tree(v), lo, hi), expected)
+
+
+@pytest.mark.parametrize("series", [
+    np.cumsum(np.random.default_rng(2).normal(size=200)),
+    np.round(np.random.default_rng(3).normal(size=200)),  # nhiều f' bằng nhau
+    np.arange(200.0) ** 2,
+])
+@pytest.mark.parametrize("k", [1, 2, 17, 199])
+def test_windows_match_dense_scan(series, k):
+    wa = WindowAnalysis(series)
+    n = len(series)
+    a, b = np.arange(n - k), np.arange(k, n)
+    slopes = wa._secants(a, b)["slope"]
+    for fast, dense in zip(wa._locate_ranges(a, b, slopes), wa._locate_dense(a, b, slopes)):
+        np.testing.assert_allclose(fast, dense)
+
+
+def test_interval_matches_window_row():
+    y = np.cumsum(np.random.default_rng(4).normal(size=40))
+    wa = WindowAnalysis(y)
+    row = wa.windows(5).iloc[10]
+    rec = wa.interval(10, 15)
+    assert rec["c_pos"] == pytest.approx(row["c_pos"])
+    assert rec["bracket"] == row["bracket"]
+
+
+def test_intervals_match_dense_scan():
+    rng = np.random.default_rng(5)
+    y = np.round(np.cumsum(rng.normal(size=500)))
+    wa = WindowAnalysis(y)
+    a = rng.integers(0, 499, 300)
+    b = a + 1 + rng.integers(0, 499 - a)
+    table = wa.intervals(a, b)
+    found, c, y_c, _ = wa._locate_dense(a, b, wa._secants(a, b)["slope"])
+    np.testing.assert_array_equal(table["bracket"], found)
+    np.testing.assert_allclose(table["c_pos"], c)
+    np.testing.assert_allclose(table["y_c"], y_c)
+    with pytest.raises(ValueError):
+        wa.intervals([3], [3])
+
+
+def test_intervals_with_nan_derivatives():
+    deriv = np.array([1.0, np.nan, 3.0, 2.0, 0.0, 1.0])
+    wa = WindowAnalysis(np.arange(6.0) ** 2 / 4, deriv=deriv)
+    table = wa.intervals([0, 2, 1], [3, 5, 5])
+    assert list(table["bracket"]) == [False, True, True]
+    assert table["c_pos"].iloc[1] == pytest.approx(3.125)  # slope 1.75 giữa f(3) = 2 và f(4) = 0
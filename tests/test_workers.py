@@ -0,0 +1,102 @@
+import threading
+
+import numpy as np
+import pytest
+
+from mvt_analyzer.metrics import stage
+from mvt_analyzer.workers import ComputePool, PoolBusy
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(**options):
+        pool = ComputePool(**options)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.shutdown()
+
+
+def _blocked(release, calls, value=1):
+    def fn():
+        calls.append(value)
+        release.wait(5)
+        return value
+    return fn
+
+
+def test_identical_jobs_run_once(make_pool):
+    pool = make_pool()
+    release, calls = threading.Event(), []
+    fn = _blocked(release, calls)
+    first, created = pool.submit("k", fn)
+    second, again = pool.submit("k", fn)
+    assert created and not again
+    assert second is first
+    release.set()
+    assert first.result(5) == 1
+    cached, created = pool.submit("k", fn)
+    assert not created and cached.done() and cached.result() == 1
+    assert calls == [1]
+
+
+def test_full_lane_raises_pool_busy(make_pool):
+    pool = make_pool(workers=1, heavy_workers=1, heavy_size=100, max_pending=1)
+    release, calls = threading.Event(), []
+    job, _ = pool.submit("a", _blocked(release, calls))
+    with pytest.raises(PoolBusy):
+        pool.submit("b", _blocked(release, calls))
+    # làn lớn có hàng chờ riêng
+    heavy, created = pool.submit("c", lambda: 3, size=100)
+    assert created and heavy.lane == "heavy" and heavy.result(5) == 3
+    release.set()
+    job.result(5)
+    assert pool.submit("b", lambda: 2)[0].result(5) == 2
+
+
+def test_failed_jobs_are_not_cached(make_pool):
+    pool = make_pool()
+
+    def fail():
+        raise ValueError("boom")
+
+    job, _ = pool.submit("k", fail)
+    with pytest.raises(ValueError):
+        job.result(5)
+    job, created = pool.submit("k", lambda: 1)
+    assert created and job.result(5) == 1
+
+
+def test_cache_evicts_by_count_and_bytes(make_pool):
+    pool = make_pool(cache_size=2)
+    for key in "abc":
+        pool.submit(key, lambda: key)[0].result(5)
+    assert pool.submit("a", lambda: "a")[1]  # đã bị loại khỏi cache: tính lại
+    assert not pool.submit("c", lambda: "c")[1]
+
+    pool = make_pool(cache_size=16, cache_bytes=3 * 8000)
+    for key in "abcd":
+        pool.submit(key, lambda: np.zeros(1000))[0].result(5)
+    assert len(pool.cache) == 3 and pool.cache.nbytes <= 3 * 8000
+    assert "a" not in pool.cache
+
+
+def test_progress_estimate_from_previous_run(make_pool):
+    pool = make_pool()
+
+    def work(n):
+        for i in range(n):
+            with stage(f"step{i}"):
+                pass
+        return n
+
+    job, _ = pool.submit("first", work, 3)
+    assert job.expected_stages is None
+    job.result(5)
+    assert job.progress()["fraction"] == 1.0
+    job, _ = pool.submit("second", work, 3)
+    assert job.expected_stages == 3